@@ -0,0 +1,84 @@
+import dataclasses
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+
+from synthetic.catalog.cache import CatalogCache
+from synthetic.conf import global_conf
+from synthetic.database.schemas import Base, DriverMetaSchema
+from synthetic.user.constants import SyntheticUserType
+from synthetic.user.factory import create_random_user
+from synthetic.utils.database import create_db_session
+
+logger = logging.getLogger(__name__)
+
+
+def measure_users(driver_meta_id: int, profile_name: str, user_count: int, days: int) -> float:
+    """Generates the days of `user_count` separate session engagement users of the profile, and returns the seconds"""
+
+    users = [create_random_user(driver_meta_id, global_conf.start_ts, profile_name) for _ in range(0, user_count)]
+
+    start_time = time.perf_counter()
+    event_count = sum(
+        [len(user.generate_events(global_conf.start_ts + timedelta(days=days)).log_events) for user in users]
+    )
+    duration = time.perf_counter() - start_time
+
+    logger.info("Generated %s events for %s users in %.2fs", event_count, user_count, duration)
+    return duration
+
+
+def measure_cohort(driver_meta_id: int, profile_name: str, days: int) -> float:
+    """Generates the days of a single cohort of the profile, and returns the seconds it took"""
+
+    cohort = create_random_user(driver_meta_id, global_conf.start_ts, profile_name)
+
+    start_time = time.perf_counter()
+    events = cohort.generate_events(global_conf.start_ts + timedelta(days=days))
+    duration = time.perf_counter() - start_time
+
+    logger.info(
+        "Generated %s events for a cohort of %s in %.2fs", len(events.log_batch), cohort.get_member_count(), duration
+    )
+    return duration
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) != 4:
+        raise RuntimeError("Usage: cohort_benchmark.py <yaml_config_filename> <cohort_profile_name> <days>")
+
+    config_filename, cohort_profile_name, day_count = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    global_conf.load_from_yaml(config_filename)
+
+    cohort_profile = global_conf.profiles[cohort_profile_name]
+    if cohort_profile.user_type != SyntheticUserType.SESSION_ENGAGEMENT_COHORT:
+        raise ValueError(f"Profile {cohort_profile_name} is not a cohort profile")
+
+    # The members of the cohort, generated one by one as users of their own
+    user_profile_name = f"{cohort_profile_name}_users"
+    global_conf.profiles[user_profile_name] = dataclasses.replace(
+        cohort_profile, user_type=SyntheticUserType.SESSION_ENGAGEMENT
+    )
+
+    # The users of the benchmark go to a database of their own, which is thrown away once it is done
+    with tempfile.TemporaryDirectory() as temp_dirname:
+        global_conf.db_uri = "sqlite:///%s" % (os.path.join(temp_dirname, "benchmark.sqlite"),)
+        Base.metadata.create_all(create_engine(global_conf.db_uri))
+
+        with create_db_session() as db:
+            driver_meta = DriverMetaSchema(organisation=global_conf.organisation, project=global_conf.project)
+            db.add(driver_meta)
+            db.commit()
+            CatalogCache.warm_up(db)
+
+            cohort_seconds = measure_cohort(driver_meta.id, cohort_profile_name, day_count)
+            user_seconds = measure_users(driver_meta.id, user_profile_name, cohort_profile.cohort_size, day_count)
+
+    logger.info("The cohort generated its members %.1fx faster than separate users", user_seconds / cohort_seconds)
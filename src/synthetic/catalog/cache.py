@@ -1,29 +1,38 @@
+import heapq
 import logging
 import random
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, MutableMapping, Optional, Tuple
 
 from synthetic.conf import global_conf
 from synthetic.database.db_cache import DatabaseCache
 from synthetic.database.db_session_wrapper import DBSessionWrapper
 from synthetic.database.schemas import CatalogEntrySchema
 from synthetic.constants import CatalogType
+from synthetic.catalog.snapshot import CatalogSnapshot, UNSNAPSHOTTED_CATALOG_TYPES
 from synthetic.event.catalog.catalog_base import CatalogEvent
 from synthetic.event.log.commerce.constants import ItemType
 
 from synthetic.utils.database import (
+    count_catalogs_in_db,
     populate_catalog_to_count_in_db,
 )
-from synthetic.utils.random import select_random_keys_from_dict
+from synthetic.utils.random import get_weighted_sampler, select_random_key_counts_from_dict
 
 logger = logging.getLogger(__name__)
 
 
 def clean_promo_catalogs(current_ts: datetime):
-    all_catalog_data = CatalogCache.cached_catalog[CatalogType.PROMO]
-    for uuid, catalog_data in all_catalog_data.copy().items():
-        if catalog_data['end_timestamp'] < current_ts.timestamp():
-            del all_catalog_data[uuid]
+    """Removes promotions that ended before the current timestamp, visiting only the expired ones"""
+
+    expiry_heap = CatalogCache.promotion_expiry_heap
+    all_catalog_data = CatalogCache.cached_catalog.get(CatalogType.PROMO, {})
+    while len(expiry_heap) > 0 and expiry_heap[0][0] < current_ts.timestamp():
+        end_timestamp, uuid = heapq.heappop(expiry_heap)
+        catalog_data = all_catalog_data.get(uuid, None)
+        # Entries for promotions that were since removed or replaced are stale, so just drop them
+        if catalog_data is not None and catalog_data['end_timestamp'] == end_timestamp:
+            CatalogCache.remove_catalog_for_uuid(CatalogType.PROMO, uuid)
 
 
 def clean_catalogs_in_db(db_session: DBSessionWrapper, driver_meta_id: int):
@@ -45,17 +54,44 @@ def clean_catalogs_in_db(db_session: DBSessionWrapper, driver_meta_id: int):
 
 
 class CatalogCache:
-    """Caches catalog data from the db and generates/persists new data as required"""
+    """Caches catalog data from the db and generates/persists new data as required
+
+    Types loaded from a snapshot decode their catalogs on first access, so random draws pick uuids first and only
+    look up the catalogs that were drawn.
+    """
 
-    cached_catalog: Dict[CatalogType, Dict[str, Any]] = {}
+    cached_catalog: Dict[CatalogType, MutableMapping[str, Any]] = {}
 
     # Map mapping item type to a dictionary of item uuids to applicable promotion ids with their cost ratio
     current_promotions: Dict[ItemType, Dict[str, List[Tuple[str, float]]]] = {}
 
+    # Min-heap of (end timestamp, promotion uuid) for the cached promotions, so expiry only visits expired ones
+    promotion_expiry_heap: List[Tuple[float, str]] = []
+
+    # Map of catalog type to property name to property value to the matching catalogs by uuid, built on first use
+    property_indexes: Dict[CatalogType, Dict[str, Dict[Any, Dict[str, Dict[str, Any]]]]] = {}
+
+    # Map of catalog type to a revision that goes up whenever its cached catalogs change, so data derived from them
+    # can be cached until the next change. Revisions are kept across clear so they never repeat.
+    catalog_revisions: Dict[CatalogType, int] = {}
+
     @staticmethod
     def clear():
+        for catalog_type in CatalogCache.cached_catalog:
+            CatalogCache._bump_revision(catalog_type)
+
         CatalogCache.cached_catalog = {}
         CatalogCache.current_promotions = {}
+        CatalogCache.promotion_expiry_heap = []
+        CatalogCache.property_indexes = {}
+
+    @staticmethod
+    def _bump_revision(catalog_type: CatalogType):
+        CatalogCache.catalog_revisions[catalog_type] = CatalogCache.catalog_revisions.get(catalog_type, 0) + 1
+
+    @staticmethod
+    def get_revision(catalog_type: CatalogType) -> int:
+        return CatalogCache.catalog_revisions.get(catalog_type, 0)
 
     @staticmethod
     def warm_up_for(
@@ -64,30 +100,54 @@ class CatalogCache:
         driver_meta_id: int,
         target_catalog_count: int,
         current_ts: datetime,
+        snapshot: Optional[CatalogSnapshot] = None,
     ) -> List[CatalogEvent]:
         assert isinstance(driver_meta_id, int)
         from synthetic.catalog.generator import logger, postprocess_catalog_data
 
+        if snapshot is not None and snapshot.can_serve(catalog_type, target_catalog_count):
+            logger.debug("Loading cache for %s from snapshot...", catalog_type)
+            CatalogCache.cached_catalog[catalog_type] = snapshot.load_catalogs(catalog_type)
+            CatalogCache.property_indexes.pop(catalog_type, None)
+            CatalogCache._bump_revision(catalog_type)
+            return []
+
         logger.debug("Populating cache for %s...", catalog_type)
+        existing_count = count_catalogs_in_db(db_session, driver_meta_id, catalog_type)
         new_catalog_events = populate_catalog_to_count_in_db(
             db_session=db_session,
             driver_meta_id=driver_meta_id,
             catalog_type=catalog_type,
             target_count=target_catalog_count,
             current_ts=current_ts,
+            existing_count=existing_count,
         )
 
-        all_catalog_data = db_session.query(CatalogEntrySchema).filter_by(
-            driver_meta_id=driver_meta_id, type=catalog_type.value
-        )
+        if existing_count == 0:
+            # Everything of this type was just generated, so there is no need to read it back from the db
+            CatalogCache.cached_catalog[catalog_type] = dict(
+                [
+                    (catalog.data["uuid"], postprocess_catalog_data(dict(catalog.data)))
+                    for catalog in new_catalog_events
+                    if catalog.catalog_type == catalog_type
+                ]
+            )
+        else:
+            all_catalog_data = db_session.query(CatalogEntrySchema).filter_by(
+                driver_meta_id=driver_meta_id, type=catalog_type.value
+            )
 
-        all_catalog_data_list: List[CatalogEntrySchema] = all_catalog_data.all()
+            all_catalog_data_list: List[CatalogEntrySchema] = all_catalog_data.all()
 
-        CatalogCache.cached_catalog[catalog_type] = dict(
-            [(data.platform_uuid, postprocess_catalog_data(data.data)) for data in all_catalog_data_list]
-        )
+            CatalogCache.cached_catalog[catalog_type] = dict(
+                [(data.platform_uuid, postprocess_catalog_data(data.data)) for data in all_catalog_data_list]
+            )
+
+        CatalogCache.property_indexes.pop(catalog_type, None)
+        CatalogCache._bump_revision(catalog_type)
 
         if catalog_type == CatalogType.PROMO:
+            CatalogCache.update_current_promotions()
             clean_promo_catalogs(current_ts)
 
         return new_catalog_events
@@ -116,6 +176,12 @@ class CatalogCache:
 
         clean_catalogs_in_db(db_session, driver_meta_id)
 
+        snapshot: Optional[CatalogSnapshot] = None
+        if global_conf.catalog_snapshot_dirname is not None:
+            snapshot = CatalogSnapshot.load_if_present(global_conf.catalog_snapshot_dirname, db_session, driver_meta_id)
+
+        snapshot_is_current = snapshot is not None
+        target_counts: Dict[CatalogType, int] = {}
         for catalog_type in CatalogType:
             if catalog_type == CatalogType.USER:
                 # We don't do users
@@ -125,12 +191,28 @@ class CatalogCache:
             if catalog_config is None:
                 continue
 
+            if catalog_type not in UNSNAPSHOTTED_CATALOG_TYPES and (
+                snapshot is None or not snapshot.can_serve(catalog_type, catalog_config.target_count)
+            ):
+                snapshot_is_current = False
+
+            target_counts[catalog_type] = catalog_config.target_count
             new_catalogs[catalog_type] = CatalogCache.warm_up_for(
                 catalog_type=catalog_type,
                 db_session=db_session,
                 driver_meta_id=driver_meta_id,
                 target_catalog_count=catalog_config.target_count,
                 current_ts=current_ts,
+                snapshot=snapshot,
+            )
+
+        if global_conf.catalog_snapshot_dirname is not None and not snapshot_is_current:
+            CatalogSnapshot.write(
+                global_conf.catalog_snapshot_dirname,
+                db_session,
+                driver_meta_id,
+                CatalogCache.cached_catalog,
+                target_counts,
             )
 
         return new_catalogs
@@ -140,12 +222,15 @@ class CatalogCache:
         if count == 0:
             return []
 
-        all_catalogs: List[Tuple[CatalogType, Dict[str, Any]]] = []
+        all_catalog_uuids: List[Tuple[CatalogType, str]] = []
         for item_type in list(ItemType):
             catalog_type = CatalogType(item_type.value)
-            all_catalogs.extend([(catalog_type, value) for value in CatalogCache.cached_catalog[catalog_type].values()])
+            all_catalog_uuids.extend([(catalog_type, uuid) for uuid in CatalogCache.cached_catalog[catalog_type]])
 
-        return random.sample(all_catalogs, k=count)
+        return [
+            (catalog_type, CatalogCache.cached_catalog[catalog_type][uuid])
+            for catalog_type, uuid in random.sample(all_catalog_uuids, k=count)
+        ]
 
     @staticmethod
     def get_random_unique_catalogs_for_type(catalog_type: CatalogType, count: int) -> List[Dict[str, Any]]:
@@ -154,25 +239,13 @@ class CatalogCache:
         if count <= 0:
             return []
 
-        return random.sample(list(CatalogCache.cached_catalog[catalog_type].values()), k=count)
+        catalogs = CatalogCache.cached_catalog[catalog_type]
+        return [catalogs[uuid] for uuid in random.sample(list(catalogs), k=count)]
 
     @staticmethod
-    def get_random_unique_catalogs_from_distribution(
-        catalog_probabilities: Dict[CatalogType, float], count: int
+    def get_random_unique_catalogs_for_counts(
+        catalog_counts: Dict[CatalogType, int]
     ) -> List[Tuple[CatalogType, Dict[str, Any]]]:
-        catalog_counts: Dict[CatalogType, int] = {}
-        for offset in range(0, count):
-            catalog_type: CatalogType = select_random_keys_from_dict(catalog_probabilities, count=1)[0]
-            if catalog_type not in catalog_counts:
-                catalog_counts[catalog_type] = 0
-
-            catalog_counts[catalog_type] += 1
-
-        for catalog_type in catalog_counts:
-            catalog_counts[catalog_type] = min(
-                catalog_counts[catalog_type], len(CatalogCache.cached_catalog[catalog_type])
-            )
-
         catalogs: List[Tuple[CatalogType, Dict[str, Any]]] = []
         for catalog_type, catalog_count in catalog_counts.items():
             catalogs_of_type = CatalogCache.get_random_unique_catalogs_for_type(catalog_type, count=catalog_count)
@@ -180,22 +253,30 @@ class CatalogCache:
 
         return catalogs
 
+    @staticmethod
+    def get_random_unique_catalogs_from_distribution(
+        catalog_probabilities: Dict[CatalogType, float], count: int
+    ) -> List[Tuple[CatalogType, Dict[str, Any]]]:
+        catalog_counts = select_random_key_counts_from_dict(catalog_probabilities, count=count)
+        return CatalogCache.get_random_unique_catalogs_for_counts(catalog_counts)
+
     @staticmethod
     def get_random_catalogs(catalog_type: CatalogType, count: int) -> List[Dict[str, Any]]:
         if count == 0:
             return []
 
-        return random.choices(list(CatalogCache.cached_catalog[catalog_type].values()), k=count)
+        catalogs = CatalogCache.cached_catalog[catalog_type]
+        return [catalogs[uuid] for uuid in random.choices(list(catalogs), k=count)]
 
     @staticmethod
     def get_random_catalog_of_type(catalog_type: CatalogType) -> Dict[str, Any]:
-        catalog_options = list(CatalogCache.cached_catalog[catalog_type].values())
-        assert len(catalog_options) > 0, "No catalogs for %s!" % (catalog_type.value,)
-        return random.choice(catalog_options)
+        catalogs = CatalogCache.cached_catalog[catalog_type]
+        assert len(catalogs) > 0, "No catalogs for %s!" % (catalog_type.value,)
+        return catalogs[random.choice(list(catalogs))]
 
     @classmethod
     def get_random_catalogs_from_distribution(cls, catalog_probabilities: Dict[CatalogType, float]) -> Dict[str, Any]:
-        catalog_type: CatalogType = select_random_keys_from_dict(catalog_probabilities, count=1)[0]
+        catalog_type: CatalogType = get_weighted_sampler(catalog_probabilities).sample()
         return cls.get_random_catalog_of_type(catalog_type)
 
     @staticmethod
@@ -206,18 +287,50 @@ class CatalogCache:
         return list(CatalogCache.cached_catalog[catalog_type].values())
 
     @staticmethod
-    def get_catalogs_by_properties(catalog_type: CatalogType, properties: Dict[str, Any]) -> List[Dict[str, Any]]:
-        matching_catalogs = []
-        for catalog_uuid, catalog in CatalogCache.cached_catalog[catalog_type].items():
-            all_match = True
-            for key, value in properties.items():
-                if catalog.get(key, None) != value:
-                    all_match = False
+    def _get_property_index(catalog_type: CatalogType, key: str) -> Dict[Any, Dict[str, Dict[str, Any]]]:
+        """Returns the index of property values to catalogs for the given type, building it if needed"""
 
-            if not all_match:
-                continue
+        type_indexes = CatalogCache.property_indexes.setdefault(catalog_type, {})
+        if key not in type_indexes:
+            property_index: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+            for catalog_uuid, catalog in CatalogCache.cached_catalog.get(catalog_type, {}).items():
+                property_index.setdefault(catalog.get(key, None), {})[catalog_uuid] = catalog
+            type_indexes[key] = property_index
+
+        return type_indexes[key]
 
-            matching_catalogs.append(catalog)
+    @staticmethod
+    def _index_catalog(catalog_type: CatalogType, uuid: str, catalog_data: Dict[str, Any]):
+        for key, property_index in CatalogCache.property_indexes.get(catalog_type, {}).items():
+            property_index.setdefault(catalog_data.get(key, None), {})[uuid] = catalog_data
+
+    @staticmethod
+    def _unindex_catalog(catalog_type: CatalogType, uuid: str, catalog_data: Dict[str, Any]):
+        for key, property_index in CatalogCache.property_indexes.get(catalog_type, {}).items():
+            value = catalog_data.get(key, None)
+            matching_catalogs = property_index.get(value, {})
+            matching_catalogs.pop(uuid, None)
+            if len(matching_catalogs) == 0:
+                property_index.pop(value, None)
+
+    @staticmethod
+    def get_catalogs_by_properties(catalog_type: CatalogType, properties: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if len(properties) == 0:
+            return CatalogCache.get_all_catalogs(catalog_type)
+
+        property_items = list(properties.items())
+        indexed_key, indexed_value = property_items[0]
+        candidates: MutableMapping[str, Dict[str, Any]]
+        try:
+            candidates = CatalogCache._get_property_index(catalog_type, indexed_key).get(indexed_value, {})
+        except TypeError:
+            # Unhashable property values can't be indexed, so fall back to a scan
+            candidates = CatalogCache.cached_catalog[catalog_type]
+
+        matching_catalogs = []
+        for catalog in candidates.values():
+            if all(catalog.get(key, None) == value for key, value in property_items):
+                matching_catalogs.append(catalog)
 
         return matching_catalogs
 
@@ -242,26 +355,85 @@ class CatalogCache:
         if catalog_type not in CatalogCache.cached_catalog:
             CatalogCache.cached_catalog[catalog_type] = {}
 
+        existing_catalog_data = CatalogCache.cached_catalog[catalog_type].get(uuid, None)
+        if existing_catalog_data is not None:
+            CatalogCache._unindex_catalog(catalog_type, uuid, existing_catalog_data)
+
+            if catalog_type == CatalogType.PROMO:
+                CatalogCache._remove_current_promotion(CatalogCache.current_promotions, existing_catalog_data)
+
         CatalogCache.cached_catalog[catalog_type][uuid] = catalog_data
+        CatalogCache._index_catalog(catalog_type, uuid, catalog_data)
+        CatalogCache._bump_revision(catalog_type)
+
+        if catalog_type == CatalogType.PROMO:
+            heapq.heappush(CatalogCache.promotion_expiry_heap, (catalog_data['end_timestamp'], uuid))
+            CatalogCache._add_current_promotion(CatalogCache.current_promotions, catalog_data)
+
+    @staticmethod
+    def remove_catalog_for_uuid(catalog_type: CatalogType, uuid: str):
+        catalog_data = CatalogCache.cached_catalog.get(catalog_type, {}).pop(uuid, None)
+        if catalog_data is not None:
+            CatalogCache._unindex_catalog(catalog_type, uuid, catalog_data)
+            CatalogCache._bump_revision(catalog_type)
+
+            if catalog_type == CatalogType.PROMO:
+                CatalogCache._remove_current_promotion(CatalogCache.current_promotions, catalog_data)
+
+    @staticmethod
+    def _add_current_promotion(
+        current_promotions: Dict[ItemType, Dict[str, List[Tuple[str, float]]]], promotion: Dict[str, Any]
+    ):
+        promotion_uuid = promotion['uuid']
+        cost_adjustment_ratio = promotion['cost_adjustment_ratio']
+        promoted_item_uuids = promotion['promoted_item_uuids']
+        promoted_item_types_strings = promotion['promoted_item_types']
+        promoted_item_types = [ItemType(item_type_str) for item_type_str in promoted_item_types_strings]
+        for promoted_item_uuid, promoted_item_type in zip(promoted_item_uuids, promoted_item_types):
+            if promoted_item_type not in current_promotions:
+                current_promotions[promoted_item_type] = {}
+
+            if promoted_item_uuid not in current_promotions[promoted_item_type]:
+                current_promotions[promoted_item_type][promoted_item_uuid] = []
+
+            current_promotions[promoted_item_type][promoted_item_uuid].append((promotion_uuid, cost_adjustment_ratio))
+
+    @staticmethod
+    def _remove_current_promotion(
+        current_promotions: Dict[ItemType, Dict[str, List[Tuple[str, float]]]], promotion: Dict[str, Any]
+    ):
+        promotion_uuid = promotion['uuid']
+        for promoted_item_uuid, promoted_item_type_str in zip(
+            promotion['promoted_item_uuids'], promotion['promoted_item_types']
+        ):
+            promoted_item_type = ItemType(promoted_item_type_str)
+            promotions_by_item = current_promotions.get(promoted_item_type, {})
+            if promoted_item_uuid not in promotions_by_item:
+                continue
+
+            remaining_promotions = [
+                promotion_tuple
+                for promotion_tuple in promotions_by_item[promoted_item_uuid]
+                if promotion_tuple[0] != promotion_uuid
+            ]
+            if len(remaining_promotions) > 0:
+                promotions_by_item[promoted_item_uuid] = remaining_promotions
+            else:
+                del promotions_by_item[promoted_item_uuid]
+
+            if len(promotions_by_item) == 0:
+                del current_promotions[promoted_item_type]
 
     @staticmethod
     def update_current_promotions():
+        """Rebuilds the promotion map and expiry heap from scratch - adding and removing promotions keeps them current"""
+
         current_promotions: Dict[ItemType, Dict[str, List[Tuple[str, float]]]] = {}
+        promotion_expiry_heap: List[Tuple[float, str]] = []
         for promotion in CatalogCache.get_all_catalogs(CatalogType.PROMO):
-            promotion_uuid = promotion['uuid']
-            cost_adjustment_ratio = promotion['cost_adjustment_ratio']
-            promoted_item_uuids = promotion['promoted_item_uuids']
-            promoted_item_types_strings = promotion['promoted_item_types']
-            promoted_item_types = [ItemType(item_type_str) for item_type_str in promoted_item_types_strings]
-            for promoted_item_uuid, promoted_item_type in zip(promoted_item_uuids, promoted_item_types):
-                if promoted_item_type not in current_promotions:
-                    current_promotions[promoted_item_type] = {}
-
-                if promoted_item_uuid not in current_promotions[promoted_item_type]:
-                    current_promotions[promoted_item_type][promoted_item_uuid] = []
-
-                current_promotions[promoted_item_type][promoted_item_uuid].append(
-                    (promotion_uuid, cost_adjustment_ratio)
-                )
+            CatalogCache._add_current_promotion(current_promotions, promotion)
+            promotion_expiry_heap.append((promotion['end_timestamp'], promotion['uuid']))
 
+        heapq.heapify(promotion_expiry_heap)
         CatalogCache.current_promotions = current_promotions
+        CatalogCache.promotion_expiry_heap = promotion_expiry_heap
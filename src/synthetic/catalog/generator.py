@@ -1,7 +1,6 @@
 import csv
 import os
 import random
-import uuid
 import logging
 from datetime import datetime
 
@@ -19,8 +18,9 @@ from synthetic.event.catalog.medical_equipment_catalog import MedicalEquipmentCa
 from synthetic.event.catalog.oxygen_catalog import OxygenCatalogEvent
 from synthetic.event.catalog.promo_catalog import PromoCatalogEvent
 from synthetic.event.log.commerce.constants import ItemType
+from synthetic.utils.id_generator import generate_id
 from synthetic.utils.random import get_random_int_in_range, get_random_float_in_range
-from synthetic.utils.user_utils import fake
+from synthetic.utils.text_pool import fake_text
 from synthetic.database.db_session_wrapper import DBSessionWrapper
 from synthetic.database.schemas import CatalogEntrySchema, DriverMetaSchema
 from synthetic.event.constants import MediaType
@@ -34,7 +34,7 @@ def create_random_price() -> float:
 
 def create_random_module_data_for_module_type(module_type: str) -> Dict[str, Any]:
     module = {
-        "uuid": str(uuid.uuid4()),
+        "uuid": generate_id(),
         "type": "module",
         "name": module_type,
         "price": create_random_price(),
@@ -62,25 +62,27 @@ def create_drug_data(
     active_ingredients_list = (
         [ingredient.strip() for ingredient in active_ingredients.split(',')]
         if active_ingredients is not None
-        else [fake.sentence()]
+        else [fake_text.sentence()]
     )
     active_ingredients_list = [ingredient for ingredient in active_ingredients_list if len(ingredient) > 0]
 
     return {
-        "uuid": str(uuid.uuid4()),
+        "uuid": generate_id(),
         "item_price": create_random_price(),
         "currency": Currency.USD,
-        "drug_name": drug_name.strip() if drug_name is not None else fake.name(),
+        "drug_name": drug_name.strip() if drug_name is not None else fake_text.name(),
         "active_ingredients": active_ingredients_list,
         "drug_form": drug_form.strip() if drug_form is not None else random.choice(["Gel", "Infus"]),
-        "drug_strength": drug_strength.strip() if drug_strength is not None else fake.sentence(),
-        "atc_anatomical_group": atc_anatomical_group.strip() if atc_anatomical_group is not None else fake.sentence(),
-        "packaging": packaging.strip() if packaging is not None else fake.sentence(),
-        "producer": producer.strip() if producer is not None else fake.name(),
+        "drug_strength": drug_strength.strip() if drug_strength is not None else fake_text.sentence(),
+        "atc_anatomical_group": atc_anatomical_group.strip()
+        if atc_anatomical_group is not None
+        else fake_text.sentence(),
+        "packaging": packaging.strip() if packaging is not None else fake_text.sentence(),
+        "producer": producer.strip() if producer is not None else fake_text.name(),
         "otc_or_ethical": otc_or_ethical.strip() if otc_or_ethical is not None else random.choice(["Ethical", "OTC"]),
         "market_id": market_id.strip() if market_id is not None else str(random.randint(1000, 100000)),
-        "description": description.strip() if description is not None else fake.sentence(),
-        "supplier_name": supplier_name.strip() if supplier_name is not None else fake.name(),
+        "description": description.strip() if description is not None else fake_text.sentence(),
+        "supplier_name": supplier_name.strip() if supplier_name is not None else fake_text.name(),
         "supplier_id": supplier_id.strip() if supplier_id is not None else str(random.randint(1000, 100000)),
     }
 
@@ -96,7 +98,7 @@ def create_blood_data(
     supplier_name: Optional[str] = None,
 ):
     return {
-        "uuid": str(uuid.uuid4()),
+        "uuid": generate_id(),
         "market_id": market_id.strip() if market_id is not None else str(random.randint(1000, 100000)),
         "blood_component": blood_component.strip()
         if blood_component is not None
@@ -109,8 +111,8 @@ def create_blood_data(
         "packaging": packaging.strip() if packaging is not None else "pint",
         "packaging_size": packaging_size.strip() if packaging_size is not None else "1",
         "packaging_units": packaging_units.strip() if packaging_units is not None else "pints",
-        "supplier_id": supplier_id.strip() if supplier_id is not None else fake.sentence(),
-        "supplier_name": supplier_name.strip() if supplier_name is not None else fake.sentence(),
+        "supplier_id": supplier_id.strip() if supplier_id is not None else fake_text.sentence(),
+        "supplier_name": supplier_name.strip() if supplier_name is not None else fake_text.sentence(),
         "item_price": create_random_price(),
         "currency": Currency.USD,
     }
@@ -125,15 +127,15 @@ def create_oxygen_data(
     supplier_name: Optional[str] = None,
 ):
     return {
-        "uuid": str(uuid.uuid4()),
+        "uuid": generate_id(),
         "market_id": market_id.strip() if market_id is not None else str(random.randint(1000, 100000)),
         "packaging": packaging.strip() if packaging is not None else "cylinder",
         "packaging_size": packaging_size.strip()
         if packaging_size is not None
         else str(random.choice([0.5, 1, 1.5, 1.6, 2, 2.5, 5, 6, 7, 7.5, 8, 9, 10])),
         "packaging_units": packaging_units.strip() if packaging_units is not None else "cubic_meters",
-        "supplier_id": supplier_id.strip() if supplier_id is not None else fake.sentence(),
-        "supplier_name": supplier_name.strip() if supplier_name is not None else fake.sentence(),
+        "supplier_id": supplier_id.strip() if supplier_id is not None else fake_text.sentence(),
+        "supplier_name": supplier_name.strip() if supplier_name is not None else fake_text.sentence(),
         "item_price": create_random_price(),
         "currency": Currency.USD,
     }
@@ -175,13 +177,13 @@ def create_medical_equipment_data(
     )
 
     return {
-        "uuid": str(uuid.uuid4()),
+        "uuid": generate_id(),
         "name": name.strip() if name is not None else random_name,
-        "description": description.strip() if description is not None else fake.sentence(),
+        "description": description.strip() if description is not None else fake_text.sentence(),
         "market_id": market_id.strip() if market_id is not None else str(random.randint(1000, 100000)),
-        "supplier_id": supplier_id.strip() if supplier_id is not None else fake.sentence(),
-        "supplier_name": supplier_name.strip() if supplier_name is not None else fake.sentence(),
-        "producer": producer.strip() if producer is not None else fake.sentence(),
+        "supplier_id": supplier_id.strip() if supplier_id is not None else fake_text.sentence(),
+        "supplier_name": supplier_name.strip() if supplier_name is not None else fake_text.sentence(),
+        "producer": producer.strip() if producer is not None else fake_text.sentence(),
         "packaging": packaging.strip() if packaging is not None else "carton",
         "packaging_size": packaging_size.strip()
         if packaging_size is not None
@@ -268,9 +270,9 @@ def create_random_catalog_events_for_type(catalog_type: CatalogType, ts: datetim
                 catalog_type,
                 ts,
                 {
-                    "uuid": str(uuid.uuid4()),
-                    "path": fake.url(),
-                    "title": fake.sentence(),
+                    "uuid": generate_id(),
+                    "path": fake_text.url(),
+                    "title": fake_text.sentence(),
                 },
             )
         ]
@@ -280,10 +282,10 @@ def create_random_catalog_events_for_type(catalog_type: CatalogType, ts: datetim
                 catalog_type,
                 ts,
                 {
-                    "uuid": str(uuid.uuid4()),
+                    "uuid": generate_id(),
                     "media_type": "video",
-                    "name": fake.sentence(),
-                    "description": fake.sentence(),
+                    "name": fake_text.sentence(),
+                    "description": fake_text.sentence(),
                     "lang": "en",
                     "length": float(randrange(10 * 1000, 2000 * 1000)),  # Milliseconds
                     "resolution": str(random.choice(["360", "480", "720", "1080"])),
@@ -304,10 +306,10 @@ def create_random_catalog_events_for_type(catalog_type: CatalogType, ts: datetim
                 catalog_type,
                 ts,
                 {
-                    "uuid": str(uuid.uuid4()),
+                    "uuid": generate_id(),
                     "media_type": "audio",
-                    "name": fake.sentence(),
-                    "description": fake.sentence(),
+                    "name": fake_text.sentence(),
+                    "description": fake_text.sentence(),
                     "lang": "en",
                     "length": float(length_seconds * 1000),  # Milliseconds
                     "resolution": random.choice(["64", "96", "128"]),
@@ -320,10 +322,10 @@ def create_random_catalog_events_for_type(catalog_type: CatalogType, ts: datetim
                 catalog_type,
                 ts,
                 {
-                    "uuid": str(uuid.uuid4()),
+                    "uuid": generate_id(),
                     "media_type": "image",
-                    "name": fake.sentence(),
-                    "description": fake.sentence(),
+                    "name": fake_text.sentence(),
+                    "description": fake_text.sentence(),
                     "lang": "en",
                     "length": float(randrange(10, 2000)),
                     "resolution": random.choice(["360", "480", "720", "1080"]),
@@ -353,9 +355,9 @@ def create_random_catalog_events_for_type(catalog_type: CatalogType, ts: datetim
                 catalog_type,
                 ts,
                 {
-                    "uuid": str(uuid.uuid4()),
-                    "name": fake.sentence(),
-                    "description": fake.sentence(),
+                    "uuid": generate_id(),
+                    "name": fake_text.sentence(),
+                    "description": fake_text.sentence(),
                     "duration": length_seconds,
                 },
             )
@@ -375,15 +377,15 @@ def create_random_catalog_events_for_type(catalog_type: CatalogType, ts: datetim
             else min_length_seconds
         )
 
-        exam_uuid = str(uuid.uuid4())
+        exam_uuid = generate_id()
         exam_catalogs = [
             create_catalog_event_for_type(
                 CatalogType.EXAM,
                 ts,
                 {
                     "uuid": exam_uuid,
-                    "name": fake.sentence(),
-                    "description": fake.sentence(),
+                    "name": fake_text.sentence(),
+                    "description": fake_text.sentence(),
                     "duration": length_seconds,
                     "difficulty": get_random_float_in_range(
                         difficulty_min, difficulty_max
@@ -400,9 +402,9 @@ def create_random_catalog_events_for_type(catalog_type: CatalogType, ts: datetim
                     ts,
                     {
                         "exam_uuid": exam_uuid,
-                        "uuid": str(uuid.uuid4()),
-                        "correct_answer_uuid": str(uuid.uuid4()),
-                        "wrong_answer_uuids": [str(uuid.uuid4()) for _ in range(0, 4)],
+                        "uuid": generate_id(),
+                        "correct_answer_uuid": generate_id(),
+                        "wrong_answer_uuids": [generate_id() for _ in range(0, 4)],
                     },
                 )
             )
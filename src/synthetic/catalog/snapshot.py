@@ -0,0 +1,219 @@
+import json
+import logging
+import mmap
+import os
+import struct
+from enum import Enum
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+from sqlalchemy import func
+
+from synthetic.constants import CatalogType
+from synthetic.database.db_session_wrapper import DBSessionWrapper
+from synthetic.database.schemas import CatalogEntrySchema
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"SYNCATSN"
+SNAPSHOT_VERSION = 1
+
+# Magic, format version and the length of the JSON index that follows the header
+SNAPSHOT_HEADER = struct.Struct("<8sIQ")
+
+# Promotions come and go every tick, so they are always read from the db instead
+UNSNAPSHOTTED_CATALOG_TYPES = [CatalogType.USER, CatalogType.PROMO]
+
+
+def get_catalog_snapshot_filename(snapshot_dirname: str, driver_meta_id: int) -> str:
+    return os.path.join(snapshot_dirname, "catalog_snapshot_%s.bin" % (driver_meta_id,))
+
+
+def get_catalog_stats_from_db(db_session: DBSessionWrapper, driver_meta_id: int) -> Dict[str, List[int]]:
+    """Returns the entry count and highest entry id per catalog type, which change whenever rows are added"""
+
+    rows = (
+        db_session.query(CatalogEntrySchema.type, func.count(CatalogEntrySchema.id), func.max(CatalogEntrySchema.id))
+        .filter_by(driver_meta_id=driver_meta_id)
+        .group_by(CatalogEntrySchema.type)
+        .all()
+    )
+    return dict([(catalog_type, [count, max_id]) for catalog_type, count, max_id in rows])
+
+
+def _encode_catalog_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+
+    raise TypeError("Cannot encode %s in a catalog snapshot!" % (value,))
+
+
+class SnapshotCatalogs(MutableMapping[str, Dict[str, Any]]):
+    """The catalogs of one type, backed by the memory-mapped records of a snapshot
+
+    A record is only decoded the first time it is accessed, and kept from then on, since callers may update it in place.
+    Records that are never accessed stay in the OS page cache, which is shared by all processes mapping the snapshot.
+    Catalogs set or removed afterwards are kept in memory like in a plain dict, in the same order.
+    """
+
+    def __init__(self, mapped_file: mmap.mmap, records_start: int, type_offsets: List[Tuple[str, int, int]]):
+        self._mapped_file = mapped_file
+        self._records_start = records_start
+        self._locations: Dict[str, Tuple[int, int]] = dict(
+            [(catalog_uuid, (offset, length)) for catalog_uuid, offset, length in type_offsets]
+        )
+
+        # Decoded catalogs by uuid, with None for those not decoded yet
+        self._catalogs: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(self._locations)
+
+    def __getitem__(self, catalog_uuid: str) -> Dict[str, Any]:
+        catalog_data = self._catalogs[catalog_uuid]
+        if catalog_data is None:
+            from synthetic.catalog.generator import postprocess_catalog_data
+
+            offset, length = self._locations[catalog_uuid]
+            record_start = self._records_start + offset
+            catalog_data = postprocess_catalog_data(json.loads(self._mapped_file[record_start : record_start + length]))
+            self._catalogs[catalog_uuid] = catalog_data
+
+        return catalog_data
+
+    def __setitem__(self, catalog_uuid: str, catalog_data: Dict[str, Any]):
+        self._catalogs[catalog_uuid] = catalog_data
+
+    def __delitem__(self, catalog_uuid: str):
+        del self._catalogs[catalog_uuid]
+        self._locations.pop(catalog_uuid, None)
+
+    def __contains__(self, catalog_uuid: object) -> bool:
+        return catalog_uuid in self._catalogs
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._catalogs)
+
+    def __len__(self) -> int:
+        return len(self._catalogs)
+
+    def get_decoded_count(self) -> int:
+        return sum([1 for catalog_data in self._catalogs.values() if catalog_data is not None])
+
+
+class CatalogSnapshot:
+    """A read-only, memory-mapped file of packed catalog records with an offset index per catalog type
+
+    The file starts with SNAPSHOT_HEADER, followed by a JSON index and then the records themselves, grouped by catalog
+    type. Only the index is decoded up front. Loaded types keep the file mapped and decode their records on first
+    access, so worker processes warming up from the same snapshot share a single page cache copy of the records.
+    """
+
+    def __init__(self, filename: str, current_stats: Dict[str, List[int]]):
+        self._filename = filename
+
+        with open(filename, "rb") as snapshot_file:
+            self._mapped_file = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, index_length = SNAPSHOT_HEADER.unpack_from(self._mapped_file, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported catalog snapshot %s!" % (filename,))
+
+        index_start = SNAPSHOT_HEADER.size
+        self._records_start = index_start + index_length
+        index = json.loads(self._mapped_file[index_start : self._records_start])
+
+        self.driver_meta_id: int = index["driver_meta_id"]
+        self._offsets: Dict[str, List[Tuple[str, int, int]]] = index["offsets"]
+        self._target_counts: Dict[str, int] = index["target_counts"]
+
+        # Types whose rows changed since the snapshot was written are stale and have to come from the db
+        snapshot_stats: Dict[str, List[int]] = index["stats"]
+        self._current_types = set(
+            [
+                catalog_type
+                for catalog_type in self._offsets
+                if snapshot_stats.get(catalog_type, None) == current_stats.get(catalog_type, None)
+            ]
+        )
+
+    def is_current_for(self, catalog_type: CatalogType) -> bool:
+        return catalog_type.value in self._current_types
+
+    def get_count(self, catalog_type: CatalogType) -> int:
+        return len(self._offsets.get(catalog_type.value, []))
+
+    def can_serve(self, catalog_type: CatalogType, target_count: int) -> bool:
+        """Whether the type can be loaded from the snapshot without touching the db or generating new entries"""
+
+        # Some types generate fewer entries than their target, so also accept the target they were populated for
+        served_count = max(self.get_count(catalog_type), self._target_counts.get(catalog_type.value, 0))
+        return self.is_current_for(catalog_type) and served_count >= target_count
+
+    def load_catalogs(self, catalog_type: CatalogType) -> SnapshotCatalogs:
+        """Returns the catalogs of the type, decoded lazily from the mapped file. The file stays mapped for as long as
+        any of them is in use.
+
+        """
+        return SnapshotCatalogs(self._mapped_file, self._records_start, self._offsets.get(catalog_type.value, []))
+
+    @staticmethod
+    def load_if_present(
+        snapshot_dirname: str, db_session: DBSessionWrapper, driver_meta_id: int
+    ) -> Optional["CatalogSnapshot"]:
+        filename = get_catalog_snapshot_filename(snapshot_dirname, driver_meta_id)
+        if not os.path.exists(filename):
+            return None
+
+        try:
+            snapshot = CatalogSnapshot(filename, get_catalog_stats_from_db(db_session, driver_meta_id))
+        except (ValueError, struct.error):
+            logger.warning("Ignoring unreadable catalog snapshot %s!", filename)
+            return None
+
+        if snapshot.driver_meta_id != driver_meta_id:
+            return None
+
+        return snapshot
+
+    @staticmethod
+    def write(
+        snapshot_dirname: str,
+        db_session: DBSessionWrapper,
+        driver_meta_id: int,
+        catalogs: Dict[CatalogType, MutableMapping[str, Dict[str, Any]]],
+        target_counts: Dict[CatalogType, int],
+    ):
+        stats = get_catalog_stats_from_db(db_session, driver_meta_id)
+
+        offsets: Dict[str, List[Tuple[str, int, int]]] = {}
+        records: List[bytes] = []
+        records_length = 0
+        for catalog_type, catalogs_by_uuid in catalogs.items():
+            if catalog_type in UNSNAPSHOTTED_CATALOG_TYPES:
+                continue
+
+            type_offsets = offsets[catalog_type.value] = []
+            for catalog_uuid, catalog_data in catalogs_by_uuid.items():
+                record = json.dumps(catalog_data, default=_encode_catalog_value).encode("utf-8")
+                type_offsets.append((catalog_uuid, records_length, len(record)))
+                records.append(record)
+                records_length += len(record)
+
+        index = json.dumps(
+            {
+                "driver_meta_id": driver_meta_id,
+                "stats": stats,
+                "target_counts": dict([(catalog_type.value, count) for catalog_type, count in target_counts.items()]),
+                "offsets": offsets,
+            }
+        ).encode("utf-8")
+
+        os.makedirs(snapshot_dirname, exist_ok=True)
+        filename = get_catalog_snapshot_filename(snapshot_dirname, driver_meta_id)
+
+        # Write to the side and swap it in, so readers never see a partially written snapshot
+        temp_filename = "%s.%s.tmp" % (filename, os.getpid())
+        with open(temp_filename, "wb") as snapshot_file:
+            snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(index)))
+            snapshot_file.write(index)
+            snapshot_file.writelines(records)
+        os.replace(temp_filename, filename)
+
+        logger.info("Wrote catalog snapshot with %s entries to %s", sum(len(o) for o in offsets.values()), filename)
@@ -1,3 +1,4 @@
+import itertools
 from copy import deepcopy
 from datetime import datetime
 from dataclasses import dataclass, field
@@ -11,6 +12,9 @@ from synthetic.user.constants import SyntheticUserType
 
 DATETIME_FIELDS = {"start_ts", "end_ts"}
 
+# Every (re)load of the global configuration gets a new revision, so caches derived from it know when to rebuild
+_CONFIG_REVISIONS = itertools.count(1)
+
 
 def reset_configuration():
     global_conf.reset()
@@ -170,6 +174,9 @@ class PurchaseBehaviourConfig(BaseConfig):
     views_required_per_purchase_max: int = 5
     views_per_session_min: int = 1
     views_per_session_max: int = 5
+
+    # Item interests a user keeps at most, the weakest are dropped beyond this when profile data is compacted
+    item_interest_max_count: int = 1000
     impression_ratio: float = 2.0
     detail_probability: float = 0.3
     favorite_probability: float = 0.05
@@ -364,6 +371,9 @@ class ProfileConfig(BaseConfig):
     occurrence_probability: float = 0.0
     online_probability: float = 0.2
 
+    # Number of users simulated by each cohort of a session_engagement_cohort profile
+    cohort_size: int = 1000
+
 
 @dataclass
 class PopulationConfig(BaseConfig):
@@ -473,6 +483,35 @@ class GlobalConfig(BaseConfig):
 
     cache_logs_on_failure: bool = True
 
+    # Directory holding memory-mapped catalog snapshots per driver meta, which speed up warming up the catalog cache and
+    # are shared by all processes warming up from them. Snapshots are disabled when this is not set.
+    catalog_snapshot_dirname: Optional[str] = None
+
+    # File from which the pre-generated fake text pools are loaded, or to which they are written once generated
+    text_pool_filename: Optional[str] = None
+
+    # Managers lagging several increments behind, e.g. after resuming or when backfilling, are advanced in one go and
+    # only emit their last two states, plus a checkpoint every manager_checkpoint_step_count increments if set. A run
+    # schedules the days it catches up on for each user at once, which are then filled with the advanced state. Off by
+    # default, since it changes which profile data updates are emitted
+    coalesce_manager_updates: bool = False
+    manager_checkpoint_step_count: Optional[int] = 30
+
+    # Seed from which order, search, device and catalog ids are derived, so seeded runs get the same ids. Ids are random
+    # version 4 UUIDs when this is not set
+    deterministic_id_seed: Optional[int] = None
+
+    # Users that are more than a day behind, e.g. when backfilling or resuming, fill up to this many days of their
+    # schedule in one go and sort them in once
+    schedule_horizon_days: int = 7
+
+    # Users drop state they no longer need from their profile data this often, see SyntheticUser.compact_profile_data.
+    # Zero turns compaction off
+    state_compaction_interval_days: int = 7
+
+    # Bumped whenever the configuration is reset or reloaded, see _CONFIG_REVISIONS
+    revision: int = 0
+
     def update_from_dict(self, data: Dict):
         update_object_from_dict(self, data, log_label="global")
 
@@ -494,10 +533,15 @@ class GlobalConfig(BaseConfig):
             self.catalogs = CatalogConfig.build_config_dict_from_dict(config_data.get("catalogs", None))
 
         self.verify()
+        self.bump_revision()
 
     def reset(self):
         new_config = GlobalConfig()
         self.__dict__ = new_config.__dict__
+        self.bump_revision()
+
+    def bump_revision(self):
+        self.revision = next(_CONFIG_REVISIONS)
 
     def verify(self):
         self.population.verify()
@@ -19,6 +19,10 @@ class DBSessionWrapper:
     def add(self):
         return self._db_session.add
 
+    @property
+    def execute(self):
+        return self._db_session.execute
+
     @property
     def close(self):
         return self._db_session.close
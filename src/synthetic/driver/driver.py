@@ -4,7 +4,6 @@ import logging
 import pickle
 import random
 import time
-import uuid
 from collections import defaultdict
 
 from datetime import datetime, timedelta
@@ -17,6 +16,7 @@ from synthetic.constants import CatalogType, SECONDS_IN_DAY
 from synthetic.conf import global_conf
 from synthetic.database.db_cache import DatabaseCache
 from synthetic.catalog.cache import CatalogCache, clean_promo_catalogs
+from synthetic.event.event_batch import EventBatch
 from synthetic.event.event_collection import EventCollection
 from synthetic.event.log.commerce.cancel_checkout import CancelCheckoutEvent, CancelType
 from synthetic.event.log.commerce.constants import ItemType, ItemObject
@@ -24,6 +24,7 @@ from synthetic.event.log.commerce.delivery import DeliveryEvent, DeliveryAction
 from synthetic.event.log.generator import generate_rate_events
 from synthetic.event.log.loyalty.promo import PromoType
 from synthetic.event.meta.meta_base import MetaEvent
+from synthetic.event.meta.profile_data_update_event import ProfileDataUpdateEvent
 from synthetic.event.meta.receive_nudge import ReceiveNudges
 from synthetic.sink.factory import build_sink_from_type
 from synthetic.sink.flush_sink import FlushSink
@@ -32,6 +33,7 @@ from synthetic.event.log.log_base import LogEvent
 from synthetic.managers.managed_object import ManagedObject
 from synthetic.managers.population import PopulationManager
 from synthetic.sink.memory_flush_sink import MemoryFlushSink
+from synthetic.utils.id_generator import generate_id, get_generated_id_count, skip_generated_ids
 from synthetic.utils.database import create_db_session, get_current_memory_usage_kb, store_catalogs_in_db
 from synthetic.user.factory import (
     load_users_from_db,
@@ -40,17 +42,20 @@ from synthetic.user.factory import (
     load_user_from_db,
 )
 from synthetic.user.synthetic_user import SyntheticUser, find_first_registered_user
+from synthetic.user.profile_data_update import ProfileDataUpdateBatch
+from synthetic.user.state_compaction import get_profile_data_size
 from synthetic.utils.nudge_utils import get_nudges_from_backend
 from synthetic.utils.random import (
     select_random_profile_names_based_on_counts,
-    select_random_keys_from_dict,
+    get_weighted_sampler,
     get_random_float_in_range,
     get_random_int_in_range,
+    buffered_random,
 )
 from synthetic.utils.slack_notifier import Slack, MessageType
 from synthetic.utils.time_utils import total_difference_seconds
 from synthetic.utils.current_time_utils import get_current_time
-from synthetic.utils.user_utils import fake
+from synthetic.utils.text_pool import fake_text
 
 logger = logging.getLogger(__name__)
 # logger.setLevel(logging.DEBUG)
@@ -92,6 +97,9 @@ class Driver(ManagedObject):
     ):
         super().__init__()
 
+        # Values drawn ahead of time would otherwise outlive seeding random before creating the driver
+        buffered_random.reset()
+
         if sink_types is None:
             sink_types = ["memory"]
 
@@ -115,6 +123,7 @@ class Driver(ManagedObject):
 
         self._clear_cache_after_flush = clear_cache_after_flush
         self._cached_log_events: List[LogEvent] = []
+        self._cached_log_batch = EventBatch()
         self._cached_catalog_events: List[CatalogEvent] = []
         self._cached_meta_events: List[MetaEvent] = []
 
@@ -152,6 +161,9 @@ class Driver(ManagedObject):
     def get_cached_log_events(self) -> List[LogEvent]:
         return self._cached_log_events
 
+    def get_cached_log_batch(self) -> EventBatch:
+        return self._cached_log_batch
+
     def get_cached_catalog_events(self) -> List[CatalogEvent]:
         return self._cached_catalog_events
 
@@ -163,6 +175,7 @@ class Driver(ManagedObject):
             log_events=self._cached_log_events,
             catalog_events=self._cached_catalog_events,
             meta_events=self._cached_meta_events,
+            log_batch=self._cached_log_batch,
         )
 
     def clear_counts(self):
@@ -172,6 +185,7 @@ class Driver(ManagedObject):
 
     def clear_cache(self):
         self._cached_log_events = []
+        self._cached_log_batch = EventBatch()
         self._cached_catalog_events = []
         self._cached_meta_events = []
 
@@ -185,11 +199,16 @@ class Driver(ManagedObject):
             ]
             del driver_data_from_db["inactive_users"]
 
+        if "generated_id_count" in driver_data_from_db:
+            skip_generated_ids(driver_data_from_db["generated_id_count"])
+            del driver_data_from_db["generated_id_count"]
+
         self.set_manager_data(self._driver_data)
 
     def get_driver_data_for_db(self) -> Dict[str, Any]:
         driver_data = self._driver_data.copy()
         driver_data["inactive_users"] = [inactive_user.to_dict() for inactive_user in self._inactive_users]
+        driver_data["generated_id_count"] = get_generated_id_count()
 
         return driver_data
 
@@ -212,6 +231,9 @@ class Driver(ManagedObject):
     def _queued_log_events(self, events: List[LogEvent]):
         self._cached_log_events.extend(events)
 
+    def _queued_log_batch(self, log_batch: EventBatch):
+        self._cached_log_batch.extend(log_batch)
+
     def _queued_catalog_events(self, events: List[CatalogEvent]):
         self._cached_catalog_events.extend(events)
 
@@ -223,6 +245,7 @@ class Driver(ManagedObject):
             events.assert_integrity(verification_ts)
 
         self._queued_log_events(events.log_events)
+        self._queued_log_batch(events.log_batch)
         self._queued_catalog_events(events.catalog_events)
         self._queued_meta_events(events.meta_events)
 
@@ -245,7 +268,13 @@ class Driver(ManagedObject):
         return os.path.join(dirname, f"{global_conf.organisation}_{global_conf.project}.pkl")
 
     def persist_cache_to_disk(self):
-        if len(self._cached_log_events) + len(self._cached_catalog_events) + len(self._cached_meta_events) == 0:
+        cached_count = (
+            len(self._cached_log_events)
+            + len(self._cached_log_batch)
+            + len(self._cached_catalog_events)
+            + len(self._cached_meta_events)
+        )
+        if cached_count == 0:
             return
 
         logger.info("Persisting cached logs to disk...")
@@ -253,6 +282,7 @@ class Driver(ManagedObject):
             pickle.dump(
                 {
                     "logs": self._cached_log_events,
+                    "log_batch": self._cached_log_batch,
                     "catalogs": self._cached_catalog_events,
                     "meta": self._cached_meta_events,
                 },
@@ -269,17 +299,29 @@ class Driver(ManagedObject):
                     cache_file,
                 )
                 self._cached_log_events.extend(data['logs'])
+                self._cached_log_batch.extend(data.get('log_batch', EventBatch()))
                 self._cached_catalog_events.extend(data['catalogs'])
                 self._cached_meta_events.extend(data['meta'])
 
             os.remove(filename)
             logger.info("Restored cached logs from disk!")
 
+    def _apply_profile_data_updates(self, profile_data_updates: ProfileDataUpdateBatch):
+        if len(profile_data_updates) == 0:
+            return
+
+        logger.debug(
+            "Applying %s profile data updates as %s writes...",
+            len(profile_data_updates),
+            profile_data_updates.get_write_count(),
+        )
+        profile_data_updates.apply()
+
     def flush_events(self, current_ts: datetime):
         logger.debug(
             "Flushing with %s meta events, %s logs and %s catalogs...",
             len(self._cached_meta_events),
-            len(self._cached_log_events),
+            len(self._cached_log_events) + len(self._cached_log_batch),
             len(self._cached_catalog_events),
         )
         error_encountered = False
@@ -301,7 +343,15 @@ class Driver(ManagedObject):
                         MessageType.WARNING,
                     )
 
+                # Profile data updates are coalesced and applied together, but always before other meta events so
+                # those still see the profile data as it would be at their time
+                profile_data_updates = ProfileDataUpdateBatch()
                 for meta_event in meta_events:
+                    if isinstance(meta_event, ProfileDataUpdateEvent):
+                        profile_data_updates.add_update(meta_event.user, meta_event.update)
+                        continue
+
+                    self._apply_profile_data_updates(profile_data_updates)
                     consequence_events = meta_event.perform_actions()
                     if consequence_events is None:
                         continue
@@ -310,6 +360,8 @@ class Driver(ManagedObject):
                         sink.flush_log_events(consequence_events.log_events)
                         sink.flush_catalog_events(consequence_events.catalog_events)
 
+                self._apply_profile_data_updates(profile_data_updates)
+
             # Manage detached events
             if len(self._cached_log_events) > 0:
                 log_events = self._cached_log_events
@@ -318,25 +370,31 @@ class Driver(ManagedObject):
             if not detached_events.is_empty():
                 self.queue_events_for_flush(detached_events, current_ts)
 
-            if len(self._cached_log_events) > 0:
+            if len(self._cached_log_events) + len(self._cached_log_batch) > 0:
                 log_events = self._cached_log_events
                 log_events.sort(key=lambda event: event.ts)
 
-                if self._cached_log_events[-1].ts > current_ts:
+                # The event objects join the events generated as batches, in one batch sorted by time
+                log_batch = EventBatch.from_events(log_events)
+                log_batch.extend(self._cached_log_batch)
+                log_batch = log_batch.sorted_by_timestamp()
+
+                latest_log_ts = log_batch.get_latest_ts()
+                if latest_log_ts is not None and latest_log_ts > current_ts:
                     Slack.notify_simple(
                         "Future event",
-                        "Future event for current time %s: %s"
+                        "Future log event for current time %s at %s"
                         % (
                             current_ts,
-                            self._cached_log_events[-1],
+                            latest_log_ts,
                         ),
                         MessageType.WARNING,
                     )
 
-                log_count = len(self._cached_log_events)
+                log_count = len(log_batch)
                 logger.debug("Flushing %s log events...", log_count)
                 for sink in self._log_sinks:
-                    sink.flush_log_events(log_events)
+                    sink.flush_event_batch(log_batch)
 
                 self._flushed_log_count += log_count
 
@@ -364,6 +422,7 @@ class Driver(ManagedObject):
 
             if self._clear_cache_after_flush:
                 self._cached_log_events.clear()
+                self._cached_log_batch = EventBatch()
                 self._cached_catalog_events.clear()
                 self._cached_meta_events.clear()
         except Exception:
@@ -497,6 +556,7 @@ class Driver(ManagedObject):
                         "Final user counts: active %s, inactive %s", len(self._active_users), len(self._inactive_users)
                     )
                     self.log_user_profiles()
+                    self.log_user_state_sizes()
 
                     return
             except OperationalError as e:
@@ -507,6 +567,22 @@ class Driver(ManagedObject):
                 attempt_count -= 1
                 current_wait_time *= 2
 
+    def log_user_state_sizes(self):
+        """Logs how large the stored profile data of the active users is per profile, to keep an eye on state growth"""
+
+        state_sizes = defaultdict(list)
+        for active_user in self._active_users:
+            state_sizes[active_user.profile_name].append(get_profile_data_size(active_user.get_profile_data()))
+        for profile_name in sorted(state_sizes):
+            logger.info(
+                "* %s state: mean %s bytes, max %s bytes"
+                % (
+                    profile_name,
+                    round(sum(state_sizes[profile_name]) / len(state_sizes[profile_name])),
+                    max(state_sizes[profile_name]),
+                )
+            )
+
     def log_user_profiles(self):
         profile_counts = defaultdict(lambda: 0)
         for active_user in self._active_users:
@@ -628,7 +704,7 @@ class Driver(ManagedObject):
                     desired_population_count, profile_counts, global_conf.profiles, generated_count=len(uuids)
                 )
             else:
-                profile_names = select_random_keys_from_dict(global_conf.profiles, count=len(uuids))
+                profile_names = get_weighted_sampler(global_conf.profiles).sample_many(len(uuids))
 
             for platform_uuid, profile_name in zip(uuids, profile_names):
                 self._add_random_user(
@@ -845,6 +921,23 @@ class Driver(ManagedObject):
             )
         )
 
+    def _schedule_catch_up(self):
+        """Schedules the days a resumed or backfilling run has to catch up on for every active user in one go, up to the
+        end of the run or the current time, so their lagging managers are advanced with coalesced updates rather than
+        a day at a time, see SyntheticUser.schedule_catch_up
+
+        """
+        catch_up_ts = get_current_time()
+        if global_conf.end_ts is not None:
+            catch_up_ts = min(catch_up_ts, global_conf.end_ts)
+
+        if total_difference_seconds(self.last_seen_ts, catch_up_ts) < SECONDS_IN_DAY:
+            return
+
+        logger.info("Scheduling %s users up to %s to catch up...", len(self._active_users), catch_up_ts)
+        for user in self._active_users:
+            user.schedule_catch_up(catch_up_ts)
+
     def _wait_and_get_latest_ts(self, online_mode: bool) -> datetime:
         if online_mode:
             latest_ts = get_current_time()
@@ -906,6 +999,9 @@ class Driver(ManagedObject):
         if self._first_run:
             self._initialize_actors(self.last_seen_ts)
 
+        if global_conf.coalesce_manager_updates:
+            self._schedule_catch_up()
+
         logger.info(
             "Starting run from last seen ts %s to %s...",
             self.last_seen_ts,
@@ -1180,8 +1276,7 @@ class Driver(ManagedObject):
         existing_promotions = CatalogCache.cached_catalog[CatalogType.PROMO]
         catalog_config = global_conf.get_catalog_config(CatalogType.PROMO)
         new_count = catalog_config.target_count - len(existing_promotions)
-        if new_count == 0:
-            CatalogCache.update_current_promotions()
+        if new_count <= 0:
             return
 
         new_promotion_catalogs: List[CatalogEvent] = []
@@ -1207,11 +1302,11 @@ class Driver(ManagedObject):
             promotion_uuids = [promotion_item[1]["uuid"] for promotion_item in promotion_items]
             promotion_types = [promotion_item[0].value for promotion_item in promotion_items]
 
-            promo_uuid = str(uuid.uuid4())
+            promo_uuid = generate_id()
             promo_data = {
                 "uuid": promo_uuid,
                 "type": random.choice(list(PromoType)),
-                "title": fake.sentence(),
+                "title": fake_text.sentence(),
                 "cost_adjustment_ratio": cost_adjustment_ratio,
                 "promoted_item_uuids": promotion_uuids,
                 "promoted_item_types": promotion_types,
@@ -1220,7 +1315,7 @@ class Driver(ManagedObject):
             }
 
             new_promotion_catalog = create_catalog_event_for_type(CatalogType.PROMO, current_ts, promo_data)
-            CatalogCache.cached_catalog[CatalogType.PROMO][promo_uuid] = promo_data
+            CatalogCache.add_catalog_for_uuid(CatalogType.PROMO, promo_uuid, promo_data)
             new_promotion_catalogs.append(new_promotion_catalog)
 
         logger.info("Created %s promotions!", len(new_promotion_catalogs))
@@ -1231,8 +1326,6 @@ class Driver(ManagedObject):
             assert self._driver_meta_id is not None
             store_catalogs_in_db(db_session, self._driver_meta_id, new_promotion_catalogs)
 
-        CatalogCache.update_current_promotions()
-
     def get_and_clear_memory_sink_events(self) -> EventCollection:
         sinks = self.get_flush_sinks()
         sink = sinks[0]
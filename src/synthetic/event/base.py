@@ -5,6 +5,8 @@ from synthetic.utils.time_utils import datetime_to_payload_str
 
 
 class Event(object):
+    __slots__ = ("ts",)
+
     def __init__(self, ts: datetime):
         self.ts: datetime = ts
 
@@ -14,6 +14,8 @@ logger = logging.getLogger(__name__)
 
 
 class CatalogEvent(Event):
+    __slots__ = ("_catalog_type", "_data")
+
     @staticmethod
     def from_type_and_data(catalog_type: CatalogType, current_ts: datetime, data: Dict) -> "CatalogEvent":
         return CatalogEvent(catalog_type=catalog_type, ts=current_ts, data=data)
@@ -6,6 +6,8 @@ from synthetic.event.catalog.catalog_base import CatalogEvent
 
 
 class DrugCatalogEvent(CatalogEvent):
+    __slots__ = ()
+
     def __init__(self, catalog_type: CatalogType, ts: datetime, data: Dict):
         super().__init__(catalog_type, ts, data)
 
@@ -6,6 +6,8 @@ from synthetic.event.catalog.catalog_base import CatalogEvent
 
 
 class UserCatalogEvent(CatalogEvent):
+    __slots__ = ()
+
     def __init__(self, ts: datetime, data: Dict):
         super().__init__(CatalogType.USER, ts, data)
 
@@ -0,0 +1,418 @@
+import io
+import sys
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type, Union
+
+import numpy as np
+
+from synthetic.constants import BlockType
+from synthetic.event.log.log_base import LogEvent
+from synthetic.event.log.serialiser import (
+    LOG_PAYLOAD_FIELDS,
+    LogEventSerialiser,
+    get_log_event_serialiser,
+    write_payload_csv_rows,
+)
+from synthetic.utils.random import buffered_random
+from synthetic.utils.time_utils import (
+    datetime_from_epoch_microseconds,
+    datetime_to_epoch_microseconds,
+    epoch_microseconds_to_payload_strs,
+)
+
+
+def _get_extra_slot_names(event_class: Type[LogEvent]) -> Tuple[str, ...]:
+    """Returns the slots that a log event class adds on top of LogEvent, in the order of its class hierarchy"""
+
+    slot_names: List[str] = []
+    for cls in reversed(event_class.__mro__):
+        if cls is LogEvent or not issubclass(cls, LogEvent):
+            continue
+
+        slot_names.extend(cls.__dict__.get("__slots__", ()))
+
+    return tuple(slot_names)
+
+
+def _take(values: List[Any], indices: np.ndarray) -> List[Any]:
+    """Returns the values at the indices. The leading run of consecutive indices, which is all of them for a split and
+    most of them for a sorted batch with sorted events appended, is copied as a slice and the rest picked in C.
+
+    """
+    if len(indices) == 0:
+        return []
+
+    first_index = int(indices[0])
+    run_breaks = np.flatnonzero(indices != first_index + np.arange(len(indices)))
+    run_length = int(run_breaks[0]) if len(run_breaks) > 0 else len(indices)
+    taken = values[first_index : first_index + run_length]
+
+    rest = indices[run_length:].tolist()
+    if len(rest) == 1:
+        taken.append(values[rest[0]])
+    elif len(rest) > 1:
+        taken.extend(itemgetter(*rest)(values))
+
+    return taken
+
+
+class EventBatch:
+    """Log events stored column by column rather than as one object per event, which is cheaper to append to and to
+    serialise in bulk. Batches convert to and from log event objects, so generators and sinks can move over to them one
+    event class at a time.
+
+    Timestamps are kept as naive epoch microseconds, and the users of the events as indices into a table of the user
+    references in the batch.
+
+    """
+
+    # Slots of LogEvent subclasses that aren't columns, by class
+    _extra_slot_names: Dict[Type[LogEvent], Tuple[str, ...]] = {}
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.user_indices = array("I")
+        self.online_flags = array("b")
+        self.ups = array("i")
+        self.dns = array("i")
+        self.event_types: List[str] = []
+        self.blocks: List[BlockType] = []
+        self.props: List[Dict[str, Any]] = []
+        self.event_classes: List[Type[LogEvent]] = []
+        self.extras: List[Tuple[Any, ...]] = []
+
+        self.users: List[Any] = []
+        self._user_indices_by_uuid: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def _get_user_index(self, user: Any) -> int:
+        reference = user.get_event_reference()
+        user_key = (reference.get_platform_uuid(), reference.get_current_device_id())
+        user_index = self._user_indices_by_uuid.get(user_key, None)
+        if user_index is None:
+            user_index = self._user_indices_by_uuid[user_key] = len(self.users)
+            self.users.append(reference)
+
+        return user_index
+
+    def append(
+        self,
+        user: Any,
+        epoch_microseconds: int,
+        online: bool,
+        event_type: str,
+        props: Dict[str, Any],
+        block: BlockType = BlockType.CORE,
+        event_class: Type[LogEvent] = LogEvent,
+        extras: Tuple[Any, ...] = (),
+    ):
+        """Appends an event without creating an event object, drawing its up and down values as LogEvent would"""
+
+        self._append(
+            self._get_user_index(user),
+            epoch_microseconds,
+            online,
+            sys.intern(event_type),
+            props,
+            block,
+            buffered_random.randrange(1000, 100000),
+            buffered_random.randrange(1000, 100000),
+            event_class,
+            extras,
+        )
+
+    def _append(
+        self,
+        user_index: int,
+        epoch_microseconds: int,
+        online: bool,
+        event_type: str,
+        props: Dict[str, Any],
+        block: BlockType,
+        up: int,
+        dn: int,
+        event_class: Type[LogEvent],
+        extras: Tuple[Any, ...],
+    ):
+        self.timestamps.append(epoch_microseconds)
+        self.user_indices.append(user_index)
+        self.online_flags.append(online)
+        self.ups.append(up)
+        self.dns.append(dn)
+        self.event_types.append(event_type)
+        self.blocks.append(block)
+        self.props.append(props)
+        self.event_classes.append(event_class)
+        self.extras.append(extras)
+
+    def add_users(self, users: Sequence[Any]) -> np.ndarray:
+        """Returns the indices of the users in the user table of the batch, adding those that aren't in it yet"""
+
+        return np.array([self._get_user_index(user) for user in users], dtype=np.uint32)
+
+    def extend_columns(
+        self,
+        user_indices: np.ndarray,
+        epoch_microseconds: np.ndarray,
+        online_flags: np.ndarray,
+        event_type: str,
+        props: List[Dict[str, Any]],
+        block: BlockType = BlockType.CORE,
+        event_class: Type[LogEvent] = LogEvent,
+        extras: Optional[List[Tuple[Any, ...]]] = None,
+    ):
+        """Appends events of one type in bulk, given their users as indices from add_users. The up and down values of
+        all of them are drawn at once.
+
+        """
+        event_count = len(props)
+        up_dns = buffered_random.get_generator().integers(1000, 100000, size=(2, event_count))
+
+        self.timestamps.frombytes(np.asarray(epoch_microseconds, dtype=np.int64).tobytes())
+        self.user_indices.frombytes(np.asarray(user_indices, dtype=np.uint32).tobytes())
+        self.online_flags.frombytes(np.asarray(online_flags, dtype=np.int8).tobytes())
+        self.ups.frombytes(up_dns[0].astype(np.int32).tobytes())
+        self.dns.frombytes(up_dns[1].astype(np.int32).tobytes())
+        self.event_types.extend([sys.intern(event_type)] * event_count)
+        self.blocks.extend([block] * event_count)
+        self.props.extend(props)
+        self.event_classes.extend([event_class] * event_count)
+        self.extras.extend(extras if extras is not None else [()] * event_count)
+
+    def append_event(self, event: LogEvent):
+        event_class = type(event)
+        if event_class not in EventBatch._extra_slot_names:
+            EventBatch._extra_slot_names[event_class] = _get_extra_slot_names(event_class)
+
+        self._append(
+            self._get_user_index(event.user),
+            datetime_to_epoch_microseconds(event.ts),
+            event.online,
+            event.event_type,
+            event.props,
+            event.block,
+            event._up,
+            event._dn,
+            event_class,
+            tuple([getattr(event, slot_name) for slot_name in EventBatch._extra_slot_names[event_class]]),
+        )
+
+    def extend_events(self, events: Iterable[LogEvent]):
+        for event in events:
+            self.append_event(event)
+
+    @staticmethod
+    def from_events(events: Iterable[LogEvent]) -> "EventBatch":
+        batch = EventBatch()
+        batch.extend_events(events)
+        return batch
+
+    def extend(self, other: "EventBatch"):
+        """Appends the events of another batch, mapping its users onto the user table of this one"""
+
+        user_index_map = self.add_users(other.users)
+        self.timestamps.extend(other.timestamps)
+        self.user_indices.frombytes(user_index_map[np.array(other.user_indices, dtype=np.uint32)].tobytes())
+        self.online_flags.extend(other.online_flags)
+        self.ups.extend(other.ups)
+        self.dns.extend(other.dns)
+        self.event_types.extend(other.event_types)
+        self.blocks.extend(other.blocks)
+        self.props.extend(other.props)
+        self.event_classes.extend(other.event_classes)
+        self.extras.extend(other.extras)
+
+    def _select(self, event_indices: Union[Sequence[int], np.ndarray]) -> "EventBatch":
+        """Returns a new batch of the events at the indices, in their order, sharing the users of this one"""
+
+        index_array = np.asarray(event_indices, dtype=np.int64)
+
+        batch = EventBatch()
+        batch.users = list(self.users)
+        batch._user_indices_by_uuid = dict(self._user_indices_by_uuid)
+        batch.timestamps = array("q", np.asarray(self.timestamps, dtype=np.int64)[index_array].tobytes())
+        batch.user_indices = array("I", np.asarray(self.user_indices, dtype=np.uint32)[index_array].tobytes())
+        batch.online_flags = array("b", np.asarray(self.online_flags, dtype=np.int8)[index_array].tobytes())
+        batch.ups = array("i", np.asarray(self.ups, dtype=np.int32)[index_array].tobytes())
+        batch.dns = array("i", np.asarray(self.dns, dtype=np.int32)[index_array].tobytes())
+        batch.event_types = _take(self.event_types, index_array)
+        batch.blocks = _take(self.blocks, index_array)
+        batch.props = _take(self.props, index_array)
+        batch.event_classes = _take(self.event_classes, index_array)
+        batch.extras = _take(self.extras, index_array)
+        return batch
+
+    def sorted_by_timestamp(self) -> "EventBatch":
+        """Returns the batch with its events in order of time, keeping the order of events of the same time"""
+
+        timestamps = np.array(self.timestamps, dtype=np.int64)
+        if np.all(timestamps[1:] >= timestamps[:-1]):
+            return self
+
+        return self._select(np.argsort(timestamps, kind="stable"))
+
+    def split_before(self, end_ts: datetime) -> Tuple["EventBatch", "EventBatch"]:
+        """Splits a batch sorted by time into the events before `end_ts` and the rest"""
+
+        split_index = bisect_left(self.timestamps, datetime_to_epoch_microseconds(end_ts))
+        if split_index == 0:
+            return EventBatch(), self
+
+        return self._select(range(0, split_index)), self._select(range(split_index, len(self)))
+
+    def get_latest_ts(self) -> Optional[datetime]:
+        if len(self) == 0:
+            return None
+
+        return datetime_from_epoch_microseconds(int(np.max(np.array(self.timestamps, dtype=np.int64))))
+
+    def to_events(self) -> List[LogEvent]:
+        events: List[LogEvent] = []
+        for event_index in range(0, len(self)):
+            event_class = self.event_classes[event_index]
+            if event_class not in EventBatch._extra_slot_names:
+                EventBatch._extra_slot_names[event_class] = _get_extra_slot_names(event_class)
+
+            # The columns already hold everything the constructors would compute, so they are skipped
+            event = event_class.__new__(event_class)
+            event.ts = datetime_from_epoch_microseconds(self.timestamps[event_index])
+            event.user = self.users[self.user_indices[event_index]]
+            event.online = bool(self.online_flags[event_index])
+            event.event_type = self.event_types[event_index]
+            event.props = self.props[event_index]
+            event.block = self.blocks[event_index]
+            event._up = self.ups[event_index]
+            event._dn = self.dns[event_index]
+            for slot_name, value in zip(EventBatch._extra_slot_names[event_class], self.extras[event_index]):
+                setattr(event, slot_name, value)
+
+            events.append(event)
+
+        return events
+
+    def _get_payload_rows(self, start: int, end: int) -> Iterator[Tuple[LogEventSerialiser, Tuple[Any, ...]]]:
+        """Yields the serialiser of each event from `start` to `end` with the fields it serialises, in the order the
+        row methods of LogEventSerialiser take them
+
+        """
+        users = self.users
+        for t_str, event_index in zip(
+            epoch_microseconds_to_payload_strs(self.timestamps[start:end]), range(start, end)
+        ):
+            yield get_log_event_serialiser(self.event_classes[event_index]), (
+                users[self.user_indices[event_index]],
+                bool(self.online_flags[event_index]),
+                t_str,
+                self.event_types[event_index],
+                self.ups[event_index],
+                self.dns[event_index],
+                self.blocks[event_index],
+                self.props[event_index],
+            )
+
+    def get_payload_values(self, start: int = 0, end: Optional[int] = None) -> List[List[Any]]:
+        """Returns what LogEventSerialiser.get_payload_values returns for each of the events, in order"""
+
+        end = len(self) if end is None else min(end, len(self))
+        return [serialiser.get_row_payload_values(*fields) for serialiser, fields in self._get_payload_rows(start, end)]
+
+    def as_payload_dicts(self) -> List[Dict[str, Any]]:
+        """Returns what as_payload_dict returns for each of the events, in order"""
+
+        return [dict(zip(LOG_PAYLOAD_FIELDS, payload_values)) for payload_values in self.get_payload_values()]
+
+    def encode_json(self, start: int = 0, end: Optional[int] = None) -> str:
+        """Returns what encode_log_events_json returns for the events from `start` to `end`"""
+
+        end = len(self) if end is None else min(end, len(self))
+        buffer = io.StringIO()
+        buffer.write("[")
+        for row_index, (serialiser, fields) in enumerate(self._get_payload_rows(start, end)):
+            if row_index > 0:
+                buffer.write(", ")
+            serialiser.write_row_json(buffer, *fields)
+        buffer.write("]")
+
+        return buffer.getvalue()
+
+    def write_csv_rows(self, csv_file: Any, write_header: bool):
+        """Writes what write_log_events_csv_rows writes for the events"""
+
+        write_payload_csv_rows(self.get_payload_values(), csv_file, write_header)
+
+
+class SessionEventColumns:
+    """Log events of many sessions drawn together, gathered per event type as the session of each event and its time
+    in seconds from the start of the day of the sessions, until they are appended to an EventBatch in one go per type.
+
+    """
+
+    def __init__(self):
+        self._groups: List[
+            Tuple[
+                np.ndarray,
+                np.ndarray,
+                str,
+                List[Dict[str, Any]],
+                BlockType,
+                Type[LogEvent],
+                Optional[List[Tuple[Any, ...]]],
+                Optional[bool],
+            ]
+        ] = []
+
+    def add(
+        self,
+        session_indices: np.ndarray,
+        offsets_seconds: np.ndarray,
+        event_type: str,
+        props: List[Dict[str, Any]],
+        block: BlockType = BlockType.CORE,
+        event_class: Type[LogEvent] = LogEvent,
+        extras: Optional[List[Tuple[Any, ...]]] = None,
+        online: Optional[bool] = None,
+    ):
+        """Gathers events of one type, which are online as their sessions are unless `online` is set"""
+
+        if len(props) > 0:
+            self._groups.append(
+                (session_indices, offsets_seconds, event_type, props, block, event_class, extras, online)
+            )
+
+    def append_to(
+        self,
+        event_batch: EventBatch,
+        start_ts: datetime,
+        session_user_indices: np.ndarray,
+        session_online_flags: np.ndarray,
+    ) -> np.ndarray:
+        """Appends the gathered events to the batch and forgets them, given the user of each session as an index from
+        EventBatch.add_users and whether it is online
+
+        :return: The session of each appended event, in the order they were appended
+        """
+        start_epoch_microseconds = datetime_to_epoch_microseconds(start_ts)
+        appended_session_indices = []
+        for session_indices, offsets_seconds, event_type, props, block, event_class, extras, online in self._groups:
+            event_batch.extend_columns(
+                session_user_indices[session_indices],
+                start_epoch_microseconds + np.round(offsets_seconds * 1000000).astype(np.int64),
+                session_online_flags[session_indices] if online is None else np.full(len(props), online),
+                event_type,
+                props,
+                block=block,
+                event_class=event_class,
+                extras=extras,
+            )
+            appended_session_indices.append(session_indices)
+
+        self._groups = []
+        if len(appended_session_indices) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        return np.concatenate(appended_session_indices)
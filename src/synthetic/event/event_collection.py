@@ -4,20 +4,30 @@ from datetime import datetime
 from typing import List, Optional
 
 from synthetic.event.catalog.catalog_base import CatalogEvent
+from synthetic.event.event_batch import EventBatch
 from synthetic.event.log.log_base import LogEvent
 from synthetic.event.meta.meta_base import MetaEvent
 
 
 @dataclasses.dataclass
 class EventCollection:
+    """Events of all kinds, with log events either as objects or as rows of an EventBatch.
+
+    Log events of the batch are kept in order of time, rather than reversed like the object lists, and come with their
+    associated catalog events already in catalog_events.
+
+    """
+
     catalog_events: List[CatalogEvent] = field(default_factory=lambda: [])
     log_events: List[LogEvent] = field(default_factory=lambda: [])
     meta_events: List[MetaEvent] = field(default_factory=lambda: [])
+    log_batch: EventBatch = field(default_factory=EventBatch)
 
     def clear(self):
         self.catalog_events = []
         self.log_events = []
         self.meta_events = []
+        self.log_batch = EventBatch()
 
     def insert_log_event(self, event: LogEvent):
         self.log_events.append(event)
@@ -36,8 +46,9 @@ class EventCollection:
     def _sort_meta_events(self):
         self.meta_events = sorted(self.meta_events, key=lambda event: event.ts, reverse=True)
 
-    def _sort_events(self):
+    def sort_events(self):
         self._sort_log_events()
+        self.log_batch = self.log_batch.sorted_by_timestamp()
         self._sort_catalog_events()
         self._sort_meta_events()
 
@@ -51,12 +62,24 @@ class EventCollection:
         self.meta_events.extend(events.meta_events)
         self._sort_meta_events()
 
+        self.log_batch.extend(events.log_batch)
+        self.log_batch = self.log_batch.sorted_by_timestamp()
+
+    def extend_events(self, events: "EventCollection"):
+        """Appends the events of another collection without sorting, for batches that are sorted once at the end"""
+
+        self.log_events.extend(events.log_events)
+        self.catalog_events.extend(events.catalog_events)
+        self.meta_events.extend(events.meta_events)
+        self.log_batch.extend(events.log_batch)
+
     def pop_events_before(self, end_ts: datetime) -> "EventCollection":
         generated_events = EventCollection()
         # We produce some log events from the scheduled ones
         while len(self.log_events) > 0 and self.log_events[-1].ts < end_ts:
             generated_log_event = self.log_events.pop()
             generated_events.log_events.append(generated_log_event)
+        generated_events.log_batch, self.log_batch = self.log_batch.split_before(end_ts)
 
         # We produce some catalog events from the scheduled ones
         while len(self.catalog_events) > 0 and self.catalog_events[-1].ts <= end_ts:
@@ -68,12 +91,17 @@ class EventCollection:
             generated_meta_event = self.meta_events.pop()
             generated_events.meta_events.append(generated_meta_event)
 
-        generated_events._sort_events()
+        generated_events.sort_events()
 
         return generated_events
 
     def is_empty(self):
-        return len(self.catalog_events) == 0 and len(self.meta_events) == 0 and len(self.log_events) == 0
+        return (
+            len(self.catalog_events) == 0
+            and len(self.meta_events) == 0
+            and len(self.log_events) == 0
+            and len(self.log_batch) == 0
+        )
 
     def assert_integrity(self, current_ts: datetime):
         for log_event in self.log_events:
@@ -81,6 +109,11 @@ class EventCollection:
                 current_ts,
                 log_event,
             )
+        latest_batch_ts = self.log_batch.get_latest_ts()
+        assert latest_batch_ts is None or latest_batch_ts <= current_ts, "Current ts: %s, future batch event: %s" % (
+            current_ts,
+            latest_batch_ts,
+        )
         for catalog_event in self.catalog_events:
             assert catalog_event.ts <= current_ts, "Current ts: %s, future event: %s" % (
                 current_ts,
@@ -93,7 +126,7 @@ class EventCollection:
             )
 
     def get_latest_ts(self) -> Optional[datetime]:
-        max_ts: Optional[datetime] = None
+        max_ts: Optional[datetime] = self.log_batch.get_latest_ts()
 
         for log_event in self.log_events:
             max_ts = log_event.ts if max_ts is None else max(max_ts, log_event.ts)
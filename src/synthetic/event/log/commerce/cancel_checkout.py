@@ -14,6 +14,8 @@ class CancelType(Enum):
 
 
 class CancelCheckoutEvent(LogEvent):
+    __slots__ = ("_items",)
+
     @staticmethod
     def build_props(
         object_id: str, cancel_type: CancelType, items: List[ItemObject], reason: str, meta: Optional[Dict] = None
@@ -17,6 +17,8 @@ class CartAction(Enum):
 
 
 class CartEvent(LogEvent):
+    __slots__ = ("_shop_item",)
+
     def __init__(
         self,
         user: SyntheticUser,
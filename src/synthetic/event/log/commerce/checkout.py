@@ -1,5 +1,4 @@
 import random
-import uuid
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import List, Optional
@@ -13,9 +12,10 @@ from synthetic.event.log.commerce.schedule_delivery import ScheduleDeliveryEvent
 from synthetic.event.log.log_base import LogEvent
 from synthetic.event.log.payment.payment_method import PaymentMethodEvent
 from synthetic.user.synthetic_user import SyntheticUser
+from synthetic.utils.id_generator import generate_id
 from synthetic.utils.event_utils import prepare_price_for_writing
 from synthetic.utils.catalog_utils import shop_item_as_catalog_event
-from synthetic.utils.random import get_random_delivery_delay_seconds
+from synthetic.utils.random import buffered_random, get_random_delivery_delay_seconds
 
 
 class ListType(Enum):
@@ -34,6 +34,8 @@ class ListAction(Enum):
 
 
 class CheckoutEvent(LogEvent):
+    __slots__ = ("_order", "_is_urgent", "_will_be_cancelled", "_total_order_price", "_update_event_count")
+
     @staticmethod
     def build_props(
         order_id: str,
@@ -100,7 +102,7 @@ class CheckoutEvent(LogEvent):
 
         order_id: str = str(self.props.get("id"))
         # Schedule this order for delivery
-        delivery_id = str(uuid.uuid4())
+        delivery_id = generate_id()
         ideal_delivery_delay_seconds = get_random_delivery_delay_seconds(
             self.user.get_profile_conf().behaviour.schedule.delivery_delay_max_days, self._is_urgent
         )
@@ -124,7 +126,7 @@ class CheckoutEvent(LogEvent):
 
         assert delivery_ts > self.ts + timedelta(seconds=1000)
 
-        current_ts: datetime = self.ts + timedelta(seconds=random.randint(5, 30))
+        current_ts: datetime = self.ts + timedelta(seconds=buffered_random.randint(5, 30))
         checkout_derived_events: List[LogEvent] = []
 
         payment_method = random.sample(list(PaymentType), k=1)[0]
@@ -137,7 +139,7 @@ class CheckoutEvent(LogEvent):
             payment_amount=self._total_order_price,
         )
         checkout_derived_events.extend([payment])
-        current_ts = current_ts + timedelta(seconds=random.randint(5, 30))
+        current_ts = current_ts + timedelta(seconds=buffered_random.randint(5, 30))
 
         total_delivery_wait_seconds = (delivery_ts - current_ts).seconds
         events_end_ts = delivery_ts if not self._will_be_cancelled else current_ts + timedelta()
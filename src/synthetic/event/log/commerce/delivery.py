@@ -11,6 +11,8 @@ class DeliveryAction(Enum):
 
 
 class DeliveryEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(self, user: SyntheticUser, ts: datetime, order_id: str, delivery_id: str, action: DeliveryAction):
         super().__init__(
             user,
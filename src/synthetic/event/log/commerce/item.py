@@ -47,6 +47,8 @@ def get_stock_status_for_timestamp(item_uuid: str, ts: datetime) -> ItemStockSta
 
 
 class ItemEvent(LogEvent):
+    __slots__ = ("_item",)
+
     @classmethod
     def build_shop_item_from_meta(
         cls, item_meta, current_ts: datetime, quantity: int = 1, promo_tuple: Optional[Tuple[str, float]] = None
@@ -33,6 +33,8 @@ def build_props_for_action(
 
 
 class ScheduleDeliveryEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(
         self,
         user: SyntheticUser,
@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 from enum import Enum
-from typing import List
+from typing import Dict, List
 
 from synthetic.constants import BlockType
 from synthetic.event.catalog.catalog_base import CatalogEvent
@@ -24,7 +24,20 @@ class MediaAction(Enum):
     IMPRESSION = "impression"
 
 
+def build_media_props(media_type: MediaType, media_uuid: str, action: MediaAction, time_offset: float) -> Dict:
+    media_type_value = media_type.value
+    return {
+        "type": media_type_value,
+        "id": f"{media_type_value}_{media_uuid}",
+        "id_source": media_uuid,
+        "action": action.value,
+        "time": float(time_offset),
+    }
+
+
 class MediaEvent(LogEvent):
+    __slots__ = ("_media_type", "_media_uuid")
+
     def __init__(
         self,
         user: SyntheticUser,
@@ -51,13 +64,7 @@ class MediaEvent(LogEvent):
             ts,
             online,
             "media",
-            {
-                "type": media_type.value,
-                "id": f"{media_type.value}_{media_uuid}",
-                "id_source": media_uuid,
-                "action": action.value,
-                "time": float(time_offset),
-            },
+            build_media_props(media_type, media_uuid, action, time_offset),
             block=block,
         )
 
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 
 from synthetic.constants import BlockType, CatalogType
 from synthetic.event.catalog.catalog_base import CatalogEvent
@@ -8,7 +8,13 @@ from synthetic.user.synthetic_user import SyntheticUser
 from synthetic.utils.catalog_utils import data_as_catalog_event
 
 
+def build_page_props(path: str, title: str, duration: float) -> Dict:
+    return {"path": path, "title": title, "duration": duration}
+
+
 class PageEvent(LogEvent):
+    __slots__ = ("_uuid",)
+
     def __init__(
         self,
         user: SyntheticUser,
@@ -20,7 +26,7 @@ class PageEvent(LogEvent):
         duration: float,  # Seconds
         block: BlockType = BlockType.CORE,
     ):
-        super().__init__(user, ts, online, "page", {"path": path, "title": title, "duration": duration}, block=block)
+        super().__init__(user, ts, online, "page", build_page_props(path, title, duration), block=block)
         self._uuid = uuid
 
     def get_schema_path(self) -> str:
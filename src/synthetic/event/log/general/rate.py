@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 
 from synthetic.constants import BlockType, CatalogType
 from synthetic.event.log.commerce.constants import ItemType
@@ -8,7 +8,17 @@ from synthetic.user.synthetic_user import SyntheticUser
 from synthetic.utils.event_utils import get_external_subject_type_string
 
 
+def build_rate_props(subject_id: str, catalog_type: CatalogType, rate_value: float) -> Dict:
+    return {
+        "subject_id": subject_id,
+        "type": get_external_subject_type_string(catalog_type),
+        "rate_value": float(rate_value),
+    }
+
+
 class RateEvent(LogEvent):
+    __slots__ = ("_catalog_type",)
+
     def __init__(
         self,
         user: SyntheticUser,
@@ -24,11 +34,7 @@ class RateEvent(LogEvent):
             ts,
             online,
             "rate",
-            {
-                "subject_id": subject_id,
-                "type": get_external_subject_type_string(catalog_type),
-                "rate_value": float(rate_value),
-            },
+            build_rate_props(subject_id, catalog_type, rate_value),
             block=block,
         )
 
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 
 from synthetic.constants import BlockType
 from synthetic.event.log.commerce.constants import ItemObject
@@ -7,7 +7,18 @@ from synthetic.event.log.log_base import LogEvent
 from synthetic.user.synthetic_user import SyntheticUser
 
 
+def build_search_props(search_id: str, query: str, results_list: List[ItemObject], page_number: int) -> Dict:
+    return {
+        "id": search_id,
+        "query": query,
+        "results_list": [result.get_payload_dict() for result in results_list],
+        "page": page_number,
+    }
+
+
 class SearchEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(
         self,
         user: SyntheticUser,
@@ -24,12 +35,7 @@ class SearchEvent(LogEvent):
             ts,
             online,
             "search",
-            {
-                "id": search_id,
-                "query": query,
-                "results_list": [result.get_payload_dict() for result in results_list],
-                "page": page_number,
-            },
+            build_search_props(search_id, query, results_list, page_number),
             block=block,
         )
 
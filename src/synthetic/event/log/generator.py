@@ -1,16 +1,19 @@
 import logging
 import random
 from datetime import datetime, timedelta
-from typing import Dict, List, Sequence, Tuple
-from uuid import uuid4
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
 
 from synthetic.catalog.cache import CatalogCache
-from synthetic.conf import global_conf
+from synthetic.conf import EventConfig, ProfileConfig, global_conf
 from synthetic.constants import CatalogType, BlockType
+from synthetic.event.catalog.catalog_base import CatalogEvent
 from synthetic.event.constants import EventType, MediaType
+from synthetic.event.event_batch import SessionEventColumns
 from synthetic.event.log.commerce.constants import ItemObject, ItemType
-from synthetic.event.log.commerce.item import ItemEvent, ItemAction
-from synthetic.event.log.general.rate import RateEvent
+from synthetic.event.log.commerce.item import ItemEvent, ItemAction, build_item_props
+from synthetic.event.log.general.rate import RateEvent, build_rate_props
 from synthetic.event.log.loyalty.level import LevelEvent
 from synthetic.event.log.loyalty.milestone import MilestoneEvent, MilestoneAction
 from synthetic.event.log.learning.exam import ExamEvent, ExamAction
@@ -20,13 +23,25 @@ from synthetic.event.log.log_base import LogEvent
 from synthetic.event.log.general.media import (
     MediaEvent,
     MediaAction,
+    build_media_props,
 )
-from synthetic.event.log.general.page import PageEvent
-from synthetic.event.log.general.search import SearchEvent
+from synthetic.event.log.general.page import PageEvent, build_page_props
+from synthetic.event.log.general.search import SearchEvent, build_search_props
 from synthetic.user.synthetic_user import SyntheticUser
-from synthetic.utils.random import get_random_int_in_range, get_random_float_in_range, generate_random_rate_value
+from synthetic.utils.id_generator import generate_id
+from synthetic.utils.random import (
+    buffered_random,
+    draw_float_ranges,
+    draw_int_ranges,
+    draw_unique_indices,
+    get_random_int_in_range,
+    get_random_float_in_range,
+    generate_random_rate_value,
+    get_weighted_sampler,
+)
+from synthetic.utils.catalog_utils import MEDIA_TYPES_BY_CATALOG_TYPE, FirstCatalogUses, shop_item_as_catalog_event
 from synthetic.utils.time_utils import total_difference_seconds
-from synthetic.utils.user_utils import fake
+from synthetic.utils.text_pool import fake_text
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +52,7 @@ def generate_rate_events(
     rate_events = []
     rating_probability = global_conf.rating_probability
     if rating_probability > 0.0 and random.random() < rating_probability:
-        current_ts += timedelta(seconds=random.randint(5, 30))
+        current_ts += timedelta(seconds=buffered_random.randint(5, 30))
         rate_events.append(
             RateEvent(
                 user,
@@ -51,6 +66,13 @@ def generate_rate_events(
     return rate_events, current_ts
 
 
+def _get_page_count_range(event_conf: EventConfig) -> Tuple[int, int]:
+    return (
+        event_conf.properties.get("page_count_per_session_min", 1),
+        event_conf.properties.get("page_count_per_session_min", 5),
+    )
+
+
 def generate_event_logs_of_type(
     synthetic_user: SyntheticUser,
     current_session_ts: datetime,
@@ -66,9 +88,7 @@ def generate_event_logs_of_type(
     generation_start_ts = current_session_ts
 
     if event_type == EventType.PAGE:
-        event_conf = profile_config.get_event_config(event_type)
-        min_page_count = event_conf.properties.get("page_count_per_session_min", 1)
-        max_page_count = event_conf.properties.get("page_count_per_session_min", 5)
+        min_page_count, max_page_count = _get_page_count_range(profile_config.get_event_config(event_type))
 
         events, current_session_ts = generate_page_sequence(
             synthetic_user,
@@ -193,7 +213,9 @@ def generate_module_events(user: SyntheticUser, ts: datetime, online: bool) -> T
 
     min_duration = user_profile_conf.session_length_min_seconds
     max_duration = user_profile_conf.session_length_max_seconds
-    session_duration = random.randrange(min_duration, max_duration) if max_duration > min_duration else min_duration
+    session_duration = (
+        buffered_random.randrange(min_duration, max_duration) if max_duration > min_duration else min_duration
+    )
 
     logger.debug("Generating module events for a session of %s seconds...", session_duration)
     if len(active_modules_uuids) > 0:
@@ -212,7 +234,7 @@ def generate_module_events(user: SyntheticUser, ts: datetime, online: bool) -> T
         user.start_module(module_meta["uuid"], module_meta["duration"])
 
         events.append(ModuleEvent(user, ts, online, module_meta["uuid"], ModuleAction.VIEW, 0))
-        ts += timedelta(seconds=random.randrange(5, 30))
+        ts += timedelta(seconds=buffered_random.randrange(5, 30))
 
     remaining_duration_seconds = user.get_module_remaining_duration(module_uuid=module_meta["uuid"])
     total_module_duration_seconds = module_meta["duration"]
@@ -251,7 +273,9 @@ def generate_exam_events(user: SyntheticUser, ts: datetime, online: bool) -> Tup
     user_profile_conf = user.get_profile_conf()
     min_duration = user_profile_conf.session_length_min_seconds
     max_duration = user_profile_conf.session_length_max_seconds
-    session_duration = random.randrange(min_duration, max_duration) if max_duration > min_duration else min_duration
+    session_duration = (
+        buffered_random.randrange(min_duration, max_duration) if max_duration > min_duration else min_duration
+    )
 
     exam_meta = CatalogCache.get_random_catalog_of_type(CatalogType.EXAM)
     exam_uuid = exam_meta["uuid"]
@@ -376,18 +400,18 @@ def generate_search_sequence(
     duration_seconds_min = event_config.properties.get("duration_seconds_min", 30)
     duration_seconds_max = event_config.properties.get("duration_seconds_max", 60)
     results_per_page_max = event_config.properties.get("results_per_page_max", 10)
+    query_zipf_exponent = event_config.properties.get("query_zipf_exponent", 0.0)
     assert results_per_page_max >= 1
 
     search_result_count = page_count * results_per_page_max - get_random_int_in_range(0, results_per_page_max - 1)
     catalog_type_probabilities = user.get_profile_conf().behaviour.purchase.catalog_type_probabilities
-    search_result_metas = CatalogCache.get_random_unique_catalogs_from_distribution(
-        catalog_type_probabilities, count=search_result_count
-    )
+    search_result_counts = get_weighted_sampler(catalog_type_probabilities).sample_counts(search_result_count)
+    search_result_metas = CatalogCache.get_random_unique_catalogs_for_counts(search_result_counts)
 
     current_ts = ts
     events: List[LogEvent] = []
-    query = fake.sentence()
-    search_id = f"{str(uuid4())}-{str(current_ts.timestamp())}"
+    query = fake_text.query(query_zipf_exponent)
+    search_id = f"{generate_id()}-{str(current_ts.timestamp())}"
 
     for page_offset, result_start_index in enumerate(range(0, search_result_count, results_per_page_max)):
         result_end_index = min(result_start_index + results_per_page_max, search_result_count)
@@ -426,3 +450,376 @@ def generate_search_sequence(
         current_ts += timedelta(seconds=search_duration)
 
     return events, current_ts
+
+
+def generate_page_events_for_periods(
+    user: SyntheticUser, period_timestamps: List[datetime], online: bool
+) -> List[List[LogEvent]]:
+    """Generates the events generate_event_logs_of_type generates for EventType.PAGE from each of the timestamps, with
+    the page counts and durations of all periods drawn at once.
+
+    """
+    event_config = user.get_profile_conf().get_event_config(EventType.PAGE)
+    min_page_count, max_page_count = _get_page_count_range(event_config)
+    duration_seconds_min = event_config.properties.get("duration_seconds_min", 30)
+    duration_seconds_max = event_config.properties.get("duration_seconds_max", 60)
+
+    page_catalogs = CatalogCache.get_all_catalogs(CatalogType.PAGE)
+    generator = buffered_random.get_generator()
+    if max_page_count <= min_page_count:
+        page_counts = np.full(len(period_timestamps), min_page_count)
+    else:
+        page_counts = generator.integers(min_page_count, max_page_count, size=len(period_timestamps))
+    page_counts = np.minimum(page_counts, len(page_catalogs))
+    page_durations_seconds = iter(
+        (
+            duration_seconds_min
+            + generator.random(int(page_counts.sum())) * (duration_seconds_max - duration_seconds_min)
+        ).tolist()
+    )
+
+    events_per_period: List[List[LogEvent]] = []
+    for current_ts, page_count in zip(period_timestamps, page_counts.tolist()):
+        period_events: List[LogEvent] = []
+        for page_catalog in random.sample(page_catalogs, k=page_count):
+            page_duration_seconds = next(page_durations_seconds)
+
+            # We are only able to report the duration of the page view at the end, naturally
+            current_ts += timedelta(seconds=page_duration_seconds)
+
+            period_events.append(
+                PageEvent(
+                    user,
+                    current_ts,
+                    online,
+                    uuid=page_catalog["uuid"],
+                    path=page_catalog["path"],
+                    title=page_catalog["title"],
+                    duration=page_duration_seconds,
+                )
+            )
+        events_per_period.append(period_events)
+
+    return events_per_period
+
+
+# Generators of the events of an event type from many timestamps at once, by event type. Types without one fall back to
+# generate_event_logs_of_type for each timestamp.
+PERIOD_BATCH_GENERATORS: Dict[EventType, Callable[[SyntheticUser, List[datetime], bool], List[List[LogEvent]]]] = {
+    EventType.PAGE: generate_page_events_for_periods,
+}
+
+
+def generate_event_logs_for_periods(
+    user: SyntheticUser, period_timestamps: List[datetime], event_types: List[EventType], online: bool
+) -> List[LogEvent]:
+    """Generates events of each of the event types from the matching timestamp, as generate_event_logs_of_type does,
+    but with all periods of an event type generated in one batch.
+
+    :return: The events of all periods, in the order of the periods
+    """
+    assert len(period_timestamps) == len(event_types)
+
+    period_indices_by_type: Dict[EventType, List[int]] = {}
+    for period_index, event_type in enumerate(event_types):
+        period_indices_by_type.setdefault(event_type, []).append(period_index)
+
+    period_events: List[Sequence[LogEvent]] = [[]] * len(period_timestamps)
+    for event_type, period_indices in period_indices_by_type.items():
+        type_timestamps = [period_timestamps[period_index] for period_index in period_indices]
+
+        batch_generator = PERIOD_BATCH_GENERATORS.get(event_type, None)
+        if batch_generator is not None:
+            events_per_period: List[Sequence[LogEvent]] = list(batch_generator(user, type_timestamps, online))
+        else:
+            events_per_period = [
+                generate_event_logs_of_type(user, current_ts, event_type, online)[0] for current_ts in type_timestamps
+            ]
+
+        for period_index, events in zip(period_indices, events_per_period):
+            period_events[period_index] = events
+
+    return [event for events in period_events for event in events]
+
+
+def append_rate_event_columns(
+    columns: SessionEventColumns,
+    session_indices: np.ndarray,
+    offsets_seconds: np.ndarray,
+    subject_ids: Sequence[str],
+    catalog_type: CatalogType,
+) -> np.ndarray:
+    """Gathers the events generate_rate_events generates for each of the sessions, returning the times after them"""
+
+    rating_probability = global_conf.rating_probability
+    if rating_probability <= 0.0:
+        return offsets_seconds
+
+    generator = buffered_random.get_generator()
+    rating = np.flatnonzero(generator.random(len(offsets_seconds)) < rating_probability)
+    offsets_seconds = offsets_seconds.copy()
+    offsets_seconds[rating] += generator.integers(5, 31, size=len(rating))
+    rate_values = 1.0 + generator.random(len(rating)) * 4.0
+
+    columns.add(
+        session_indices[rating],
+        offsets_seconds[rating],
+        "rate",
+        [
+            build_rate_props(subject_ids[sequence_index], catalog_type, rate_value)
+            for sequence_index, rate_value in zip(rating.tolist(), rate_values.tolist())
+        ],
+        event_class=RateEvent,
+        extras=[(catalog_type,)] * len(rating),
+        online=True,
+    )
+    return offsets_seconds
+
+
+def append_page_sequence_columns(
+    columns: SessionEventColumns,
+    catalog_uses: FirstCatalogUses,
+    profile_conf: ProfileConfig,
+    session_indices: np.ndarray,
+    offsets_seconds: np.ndarray,
+) -> np.ndarray:
+    """Gathers a page sequence for each of the sessions, returning the times after them"""
+
+    generator = buffered_random.get_generator()
+    event_config = profile_conf.get_event_config(EventType.PAGE)
+    duration_seconds_min = event_config.properties.get("duration_seconds_min", 30)
+    duration_seconds_max = event_config.properties.get("duration_seconds_max", 60)
+    min_page_count, max_page_count = _get_page_count_range(event_config)
+
+    catalogs = CatalogCache.cached_catalog[CatalogType.PAGE]
+    uuids = list(catalogs)
+    page_counts = np.minimum(
+        draw_int_ranges(generator, min_page_count, max_page_count, len(session_indices)), len(uuids)
+    )
+    catalog_indices = draw_unique_indices(generator, page_counts, len(uuids))
+    sequence_indices = np.repeat(np.arange(len(session_indices)), page_counts)
+    page_durations_seconds = draw_float_ranges(
+        generator, duration_seconds_min, duration_seconds_max, len(catalog_indices)
+    )
+
+    # Pages follow each other, so each is logged after the durations of its sequence up to and including its own
+    elapsed_seconds = np.concatenate([[0.0], np.cumsum(page_durations_seconds)])
+    sequence_bounds = np.concatenate([[0], np.cumsum(page_counts)])
+    page_offsets_seconds = (
+        offsets_seconds[sequence_indices]
+        + elapsed_seconds[1:]
+        - elapsed_seconds[sequence_bounds[:-1]][sequence_indices]
+    )
+
+    page_catalogs = [catalogs[uuids[catalog_index]] for catalog_index in catalog_indices.tolist()]
+    columns.add(
+        session_indices[sequence_indices],
+        page_offsets_seconds,
+        "page",
+        [
+            build_page_props(page_catalog["path"], page_catalog["title"], page_duration_seconds)
+            for page_catalog, page_duration_seconds in zip(page_catalogs, page_durations_seconds.tolist())
+        ],
+        event_class=PageEvent,
+        extras=[(page_catalog["uuid"],) for page_catalog in page_catalogs],
+    )
+    catalog_uses.add(CatalogType.PAGE, uuids, catalog_indices, page_offsets_seconds)
+
+    return offsets_seconds + elapsed_seconds[sequence_bounds[1:]] - elapsed_seconds[sequence_bounds[:-1]]
+
+
+def append_search_sequence_columns(
+    columns: SessionEventColumns,
+    catalog_events: List[CatalogEvent],
+    profile_conf: ProfileConfig,
+    session_indices: np.ndarray,
+    offsets_seconds: np.ndarray,
+    start_ts: datetime,
+) -> np.ndarray:
+    """Gathers a search sequence for each of the sessions, returning the times after them. Searches draw their results
+    and impressions one sequence at a time, and add a catalog event per impression to `catalog_events` as the shop items
+    of impressions depend on their time.
+
+    """
+    event_config = profile_conf.get_event_config(EventType.SEARCH)
+    duration_seconds_min = event_config.properties.get("duration_seconds_min", 30)
+    duration_seconds_max = event_config.properties.get("duration_seconds_max", 60)
+    results_per_page_max = event_config.properties.get("results_per_page_max", 10)
+    query_zipf_exponent = event_config.properties.get("query_zipf_exponent", 0.0)
+    assert results_per_page_max >= 1
+    min_page_count, max_page_count = _get_page_count_range(event_config)
+    catalog_type_sampler = get_weighted_sampler(profile_conf.behaviour.purchase.catalog_type_probabilities)
+
+    search_sequence_indices: List[int] = []
+    search_offsets_seconds: List[float] = []
+    search_props: List[Dict] = []
+    impression_sequence_indices: List[int] = []
+    impression_offsets_seconds: List[float] = []
+    impression_props: List[Dict] = []
+    impression_extras: List[Tuple] = []
+
+    end_offsets_seconds = offsets_seconds.copy()
+    for sequence_index, offset_seconds in enumerate(offsets_seconds.tolist()):
+        page_count = get_random_int_in_range(min_page_count, max_page_count)
+        search_result_count = page_count * results_per_page_max - get_random_int_in_range(0, results_per_page_max - 1)
+        search_result_metas = CatalogCache.get_random_unique_catalogs_for_counts(
+            catalog_type_sampler.sample_counts(search_result_count)
+        )
+
+        query = fake_text.query(query_zipf_exponent)
+        search_id = f"{generate_id()}-{str((start_ts + timedelta(seconds=offset_seconds)).timestamp())}"
+
+        for page_offset, result_start_index in enumerate(range(0, search_result_count, results_per_page_max)):
+            result_end_index = min(result_start_index + results_per_page_max, search_result_count)
+            page_result_metas = search_result_metas[result_start_index:result_end_index]
+
+            results_list = [ItemObject(result[1]["uuid"], ItemType(result[0].value)) for result in page_result_metas]
+            search_sequence_indices.append(sequence_index)
+            search_offsets_seconds.append(offset_seconds)
+            search_props.append(build_search_props(search_id, query, results_list, page_offset + 1))
+
+            # Add impressions
+            impression_ts = start_ts + timedelta(seconds=offset_seconds + 1)
+            for catalog_type, item_meta in page_result_metas:
+                shop_item = ItemEvent.build_shop_item_from_meta(item_meta, impression_ts)
+                impression_sequence_indices.append(sequence_index)
+                impression_offsets_seconds.append(offset_seconds + 1)
+                impression_props.append(build_item_props(ItemAction.IMPRESSION, shop_item, search_id, 1.0))
+                impression_extras.append((shop_item,))
+                catalog_events.append(shop_item_as_catalog_event(shop_item, impression_ts))
+
+            offset_seconds += get_random_float_in_range(duration_seconds_min, duration_seconds_max)
+
+        end_offsets_seconds[sequence_index] = offset_seconds
+
+    columns.add(
+        session_indices[np.array(search_sequence_indices, dtype=np.int64)],
+        np.array(search_offsets_seconds),
+        "search",
+        search_props,
+        event_class=SearchEvent,
+    )
+    columns.add(
+        session_indices[np.array(impression_sequence_indices, dtype=np.int64)],
+        np.array(impression_offsets_seconds),
+        "item",
+        impression_props,
+        block=BlockType.ECOMMERCE,
+        event_class=ItemEvent,
+        extras=impression_extras,
+    )
+
+    return end_offsets_seconds
+
+
+def append_media_sequence_columns(
+    columns: SessionEventColumns,
+    catalog_uses: FirstCatalogUses,
+    profile_conf: ProfileConfig,
+    catalog_type: CatalogType,
+    session_indices: np.ndarray,
+    offsets_seconds: np.ndarray,
+) -> np.ndarray:
+    """Gathers a media sequence of a random entry of the media catalog type for each of the sessions, returning the
+    times after them
+
+    """
+    generator = buffered_random.get_generator()
+    sequence_count = len(session_indices)
+    media_type = MEDIA_TYPES_BY_CATALOG_TYPE[catalog_type]
+
+    event_config = profile_conf.get_event_config(EventType(media_type.value))
+    duration_seconds_min = event_config.properties.get("duration_seconds_min", 30)
+    duration_seconds_max = event_config.properties.get("duration_seconds_max", 60)
+
+    catalogs = CatalogCache.cached_catalog[catalog_type]
+    assert len(catalogs) > 0, "No catalogs for %s!" % (catalog_type.value,)
+    uuids = list(catalogs)
+    catalog_indices = generator.integers(0, len(uuids), size=sequence_count)
+    media_uuids = [uuids[catalog_index] for catalog_index in catalog_indices.tolist()]
+
+    def add_media_events(
+        sequence_indices: np.ndarray, media_offsets_seconds: np.ndarray, action: MediaAction, time_offsets
+    ):
+        columns.add(
+            session_indices[sequence_indices],
+            media_offsets_seconds,
+            "media",
+            [
+                build_media_props(media_type, media_uuids[sequence_index], action, time_offset)
+                for sequence_index, time_offset in zip(sequence_indices.tolist(), time_offsets)
+            ],
+            event_class=MediaEvent,
+            extras=[(media_type, media_uuids[sequence_index]) for sequence_index in sequence_indices.tolist()],
+        )
+
+    all_sequences = np.arange(sequence_count)
+    play_offsets_seconds = offsets_seconds + draw_float_ranges(generator, 0.5, 5, sequence_count)
+    play_durations_seconds = draw_int_ranges(generator, duration_seconds_min, duration_seconds_max, sequence_count)
+    end_offsets_seconds = play_offsets_seconds + play_durations_seconds
+
+    add_media_events(all_sequences, offsets_seconds, MediaAction.IMPRESSION, [0] * sequence_count)
+    add_media_events(all_sequences, play_offsets_seconds, MediaAction.PLAY, [0] * sequence_count)
+    if media_type != MediaType.IMAGE:
+        media_lengths_ms = np.array([catalogs[media_uuid]["length"] for media_uuid in media_uuids])
+
+        pause_probability = event_config.properties.get("pause_probability", 0.3)
+        pausing = np.flatnonzero(generator.random(sequence_count) <= pause_probability)
+        view_ratios = generator.random(len(pausing)) * 0.6
+        add_media_events(
+            pausing,
+            play_offsets_seconds[pausing] + play_durations_seconds[pausing] * view_ratios,
+            MediaAction.PAUSE,
+            np.round(media_lengths_ms[pausing] * view_ratios).tolist(),
+        )
+        add_media_events(all_sequences, end_offsets_seconds, MediaAction.FINISH, media_lengths_ms.tolist())
+
+    catalog_uses.add(catalog_type, uuids, catalog_indices, offsets_seconds)
+
+    return append_rate_event_columns(columns, session_indices, end_offsets_seconds, media_uuids, catalog_type)
+
+
+# The event types append_event_sequence_columns supports, which only need the profile of the user
+BATCH_EVENT_TYPES = [EventType.PAGE, EventType.SEARCH, EventType.VIDEO, EventType.AUDIO, EventType.IMAGE]
+
+# Catalog types of the media event types
+MEDIA_CATALOG_TYPES = {
+    EventType.VIDEO: CatalogType.MEDIA_VIDEO,
+    EventType.AUDIO: CatalogType.MEDIA_AUDIO,
+    EventType.IMAGE: CatalogType.MEDIA_IMAGE,
+}
+
+
+def append_event_sequence_columns(
+    columns: SessionEventColumns,
+    catalog_uses: FirstCatalogUses,
+    catalog_events: List[CatalogEvent],
+    profile_conf: ProfileConfig,
+    event_type: EventType,
+    session_indices: np.ndarray,
+    offsets_seconds: np.ndarray,
+    start_ts: datetime,
+) -> np.ndarray:
+    """Gathers the events generate_event_logs_of_type generates for each of the sessions, which all share a profile,
+    with the times of the sessions given in seconds from `start_ts`. Only supports BATCH_EVENT_TYPES.
+
+    :return: The times after the events of each session
+    """
+    if event_type == EventType.PAGE:
+        end_offsets_seconds = append_page_sequence_columns(
+            columns, catalog_uses, profile_conf, session_indices, offsets_seconds
+        )
+    elif event_type == EventType.SEARCH:
+        end_offsets_seconds = append_search_sequence_columns(
+            columns, catalog_events, profile_conf, session_indices, offsets_seconds, start_ts
+        )
+    elif event_type in MEDIA_CATALOG_TYPES:
+        end_offsets_seconds = append_media_sequence_columns(
+            columns, catalog_uses, profile_conf, MEDIA_CATALOG_TYPES[event_type], session_indices, offsets_seconds
+        )
+    else:
+        raise ValueError("Unsupported event type for batches: %s" % (event_type,))
+
+    assert np.all(end_offsets_seconds > offsets_seconds), f"{event_type} did not increment time!"
+
+    return end_offsets_seconds
@@ -38,6 +38,8 @@ def build_props_for_action(
 
 
 class ExamEvent(LogEvent):
+    __slots__ = ("_exam_id",)
+
     def __init__(
         self,
         user: SyntheticUser,
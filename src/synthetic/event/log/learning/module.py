@@ -20,6 +20,8 @@ class ModuleAction(Enum):
 
 
 class ModuleEvent(LogEvent):
+    __slots__ = ("_module_id",)
+
     def __init__(
         self, user: SyntheticUser, ts: datetime, online: bool, module_id: str, action: ModuleAction, progress: int
     ):
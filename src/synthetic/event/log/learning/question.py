@@ -21,6 +21,8 @@ class QuestionAction(Enum):
 
 
 class QuestionEvent(LogEvent):
+    __slots__ = ("_question_id",)
+
     def __init__(
         self, user: SyntheticUser, ts: datetime, question_id: str, exam_id: str, action: QuestionAction, answer_id: str
     ):
@@ -1,15 +1,18 @@
+import sys
 from datetime import datetime
-from random import randrange
+from synthetic.utils.random import buffered_random
 from typing import Any, Dict, List
 
 from synthetic.constants import BlockType
 from synthetic.event.base import Event
 from synthetic.event.catalog.catalog_base import CatalogEvent
 from synthetic.event.log.commerce.constants import ItemType
-from synthetic.utils.data_utils import prepare_data_for_db
+from synthetic.event.log.serialiser import get_log_event_serialiser
 
 
 class LogEvent(Event):
+    __slots__ = ("user", "online", "event_type", "props", "block", "_up", "_dn")
+
     def __init__(
         self,
         user: "SyntheticUser",  # type: ignore
@@ -21,15 +24,19 @@ class LogEvent(Event):
     ):
         super().__init__(ts)
 
-        self.user = user
-        self.device_id = user.get_current_device_id()
+        # Events only keep a shared reference to the identity of the user, see UserReference
+        self.user = user.get_event_reference()
         self.online = online
-        self.event_type = event_type
+        self.event_type = sys.intern(event_type)
         self.props = props if props is not None else {}
         self.block = block
 
-        self._up = randrange(1000, 100000)
-        self._dn = randrange(1000, 100000)
+        self._up = buffered_random.randrange(1000, 100000)
+        self._dn = buffered_random.randrange(1000, 100000)
+
+    @property
+    def device_id(self) -> str:
+        return self.user.get_current_device_id()
 
     def __str__(self):
         return "%s - %s: %s (%s)" % (
@@ -43,19 +50,7 @@ class LogEvent(Event):
         return self.as_payload_dict()
 
     def as_payload_dict(self):
-        return {
-            "u_id": self.user.get_platform_uuid(),
-            "d_id": self.device_id,
-            "os": "android",
-            "ol": self.online,
-            "ts": self.get_formatted_ts(),
-            "type": self.event_type,
-            "ip": "0.0.0.0",
-            "up": self._up,
-            "dn": self._dn,
-            "block": self.block.value,
-            "props": prepare_data_for_db(self.props),
-        }
+        return get_log_event_serialiser(type(self)).as_payload_dict(self)
 
     def update_driver_after_flush(self, driver: "Driver"):  # type: ignore
         pass
@@ -16,6 +16,8 @@ def build_props(prev_level: int, new_level: int, module_id: Optional[str]):
 
 
 class LevelEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(
         self,
         user: SyntheticUser,
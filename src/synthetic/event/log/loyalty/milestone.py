@@ -16,6 +16,8 @@ class MilestoneAction(Enum):
 
 
 class MilestoneEvent(LogEvent):
+    __slots__ = ("_milestone_id",)
+
     def __init__(
         self,
         user: SyntheticUser,
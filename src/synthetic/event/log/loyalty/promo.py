@@ -39,6 +39,8 @@ def build_props(
 
 
 class PromoEvent(LogEvent):
+    __slots__ = ("_items",)
+
     @staticmethod
     def build_from_catalog(
         user: SyntheticUser, current_ts: datetime, online: bool, promo_catalog: Dict[str, Any], action: PromoAction
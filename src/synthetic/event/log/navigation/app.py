@@ -1,5 +1,6 @@
 from datetime import datetime
 from enum import Enum
+from typing import Dict
 
 from synthetic.event.log.log_base import LogEvent
 from synthetic.user.synthetic_user import SyntheticUser
@@ -12,7 +13,13 @@ class AppAction(Enum):
     RESUME = "resume"
 
 
+def build_app_props(action: AppAction) -> Dict:
+    return {"action": action.value}
+
+
 class AppEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(
         self,
         user: SyntheticUser,
@@ -20,7 +27,7 @@ class AppEvent(LogEvent):
         online: bool,
         action: AppAction,
     ):
-        super().__init__(user, ts, online, "app", props={"action": action.value})
+        super().__init__(user, ts, online, "app", props=build_app_props(action))
 
     def get_schema_path(self) -> str:
         return "events/app"
@@ -1,9 +1,10 @@
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Any
+from typing import Any, Dict, Union
 
 from synthetic.event.log.log_base import LogEvent
 from synthetic.user.synthetic_user import SyntheticUser
+from synthetic.user.user_reference import UserReference
 
 SEND_USER_DATA_IN_LOGS = False
 
@@ -14,7 +15,7 @@ class IdentifyAction(Enum):
     LOGOUT = "logout"
 
 
-def build_props_for_action(user: SyntheticUser, event_type: IdentifyAction) -> Dict:
+def build_props_for_action(user: Union[SyntheticUser, UserReference], event_type: IdentifyAction) -> Dict:
     props: Dict[str, Any] = {"action": event_type.value}
     if SEND_USER_DATA_IN_LOGS and event_type in [IdentifyAction.REGISTER, IdentifyAction.LOGIN]:
         props["user_props"] = user.get_logged_user_data()
@@ -23,6 +24,8 @@ def build_props_for_action(user: SyntheticUser, event_type: IdentifyAction) -> D
 
 
 class IdentifyEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(
         self,
         user: SyntheticUser,
@@ -20,6 +20,8 @@ def build_props(nudge: Nudge, nudge_action: NudgeResponseAction) -> Dict:
 
 
 class NudgeResponseEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(
         self,
         user: "SyntheticUser",  # type: ignore
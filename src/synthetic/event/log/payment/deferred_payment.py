@@ -42,6 +42,8 @@ def build_props(
 
 
 class DeferredPaymentEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(
         self,
         user: SyntheticUser,
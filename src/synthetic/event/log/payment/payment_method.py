@@ -30,6 +30,8 @@ def build_props(
 
 
 class PaymentMethodEvent(LogEvent):
+    __slots__ = ()
+
     def __init__(
         self,
         user: SyntheticUser,
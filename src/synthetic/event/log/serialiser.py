@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Set
+
+from synthetic.utils.time_utils import datetime_to_payload_str
+
+# The fields of a log event payload, in the order they are written
+LOG_PAYLOAD_FIELDS = ["u_id", "d_id", "os", "ol", "ts", "type", "ip", "up", "dn", "block", "props"]
+
+LOG_PAYLOAD_OS = "android"
+LOG_PAYLOAD_IP = "0.0.0.0"
+
+PLAIN_VALUE_TYPES = frozenset([str, int, float, bool, type(None)])
+
+# The constant parts of the JSON encoding of a payload, between the values that vary per event
+_JSON_OS_AND_OL = ', "os": %s, "ol": ' % (json.dumps(LOG_PAYLOAD_OS),)
+_JSON_IP_AND_UP = ', "ip": %s, "up": ' % (json.dumps(LOG_PAYLOAD_IP),)
+
+
+def encode_value(value: Any) -> Any:
+    """Encodes a prop value as prepare_data_for_db does, but into new dicts rather than in place"""
+
+    if type(value) in PLAIN_VALUE_TYPES:
+        return value
+    elif isinstance(value, Enum):
+        return value.value
+    elif isinstance(value, dict):
+        return dict([(key, encode_value(item_value)) for key, item_value in value.items()])
+
+    return value
+
+
+class LogEventSerialiser:
+    """Encodes the log events of one class into their payloads.
+
+    The serialiser learns which prop fields of its class hold values that need encoding, so fields that have only ever
+    held plain values are passed through with a single type check.
+
+    """
+
+    def __init__(self, event_class: type):
+        self.event_class = event_class
+
+        # Prop fields that held enums, dicts or other values that need encoding
+        self._encoded_prop_keys: Set[str] = set()
+
+    def encode_props(self, props: Dict[str, Any]) -> Dict[str, Any]:
+        encoded_prop_keys = self._encoded_prop_keys
+        encoded_props = {}
+        for key, value in props.items():
+            if key not in encoded_prop_keys and type(value) in PLAIN_VALUE_TYPES:
+                encoded_props[key] = value
+                continue
+
+            encoded_prop_keys.add(key)
+            encoded_props[key] = encode_value(value)
+
+        return encoded_props
+
+    def get_payload_values(self, event: Any) -> List[Any]:
+        """Returns the values of the payload of the event, in the order of LOG_PAYLOAD_FIELDS"""
+
+        return self.get_row_payload_values(
+            event.user,
+            event.online,
+            datetime_to_payload_str(event.ts),
+            event.event_type,
+            event._up,
+            event._dn,
+            event.block,
+            event.props,
+        )
+
+    def get_row_payload_values(
+        self, user: Any, online: bool, t_str: str, event_type: str, up: int, dn: int, block: Enum, props: Dict[str, Any]
+    ) -> List[Any]:
+        """Returns the values of the payload of an event given by its fields, as columnar batches hold them"""
+
+        return [
+            user.get_platform_uuid(),
+            user.get_current_device_id(),
+            LOG_PAYLOAD_OS,
+            online,
+            t_str,
+            event_type,
+            LOG_PAYLOAD_IP,
+            up,
+            dn,
+            block.value,
+            self.encode_props(props),
+        ]
+
+    def as_payload_dict(self, event: Any) -> Dict[str, Any]:
+        return dict(zip(LOG_PAYLOAD_FIELDS, self.get_payload_values(event)))
+
+    def write_json(self, event: Any, buffer: io.StringIO):
+        """Writes what json.dumps writes for the payload dict of the event"""
+
+        self.write_row_json(
+            buffer,
+            event.user,
+            event.online,
+            datetime_to_payload_str(event.ts),
+            event.event_type,
+            event._up,
+            event._dn,
+            event.block,
+            event.props,
+        )
+
+    def write_row_json(
+        self,
+        buffer: io.StringIO,
+        user: Any,
+        online: bool,
+        t_str: str,
+        event_type: str,
+        up: int,
+        dn: int,
+        block: Enum,
+        props: Dict[str, Any],
+    ):
+        buffer.write('{"u_id": ')
+        buffer.write(json.dumps(user.get_platform_uuid()))
+        buffer.write(', "d_id": ')
+        buffer.write(json.dumps(user.get_current_device_id()))
+        buffer.write(_JSON_OS_AND_OL)
+        buffer.write(json.dumps(online))
+        buffer.write(', "ts": "')
+        buffer.write(t_str)
+        buffer.write('", "type": ')
+        buffer.write(json.dumps(event_type))
+        buffer.write(_JSON_IP_AND_UP)
+        buffer.write(str(up))
+        buffer.write(', "dn": ')
+        buffer.write(str(dn))
+        buffer.write(', "block": ')
+        buffer.write(json.dumps(block.value))
+        buffer.write(', "props": ')
+        buffer.write(json.dumps(self.encode_props(props)))
+        buffer.write("}")
+
+
+_serialisers: Dict[type, LogEventSerialiser] = {}
+
+
+def get_log_event_serialiser(event_class: type) -> LogEventSerialiser:
+    serialiser = _serialisers.get(event_class, None)
+    if serialiser is None:
+        serialiser = _serialisers[event_class] = LogEventSerialiser(event_class)
+
+    return serialiser
+
+
+def register_log_event_serialiser(event_class: type, serialiser: LogEventSerialiser):
+    """Replaces the serialiser of a log event class, e.g. with one that knows how to encode its props faster"""
+
+    _serialisers[event_class] = serialiser
+
+
+def encode_log_events_json(events: Iterable[Any]) -> str:
+    """Returns what json.dumps returns for the list of payload dicts of the events"""
+
+    buffer = io.StringIO()
+    buffer.write("[")
+    for event_index, event in enumerate(events):
+        if event_index > 0:
+            buffer.write(", ")
+        get_log_event_serialiser(type(event)).write_json(event, buffer)
+    buffer.write("]")
+
+    return buffer.getvalue()
+
+
+def write_log_events_csv_rows(events: Iterable[Any], csv_file: Any, write_header: bool):
+    """Writes the rows that csv.DictWriter writes for the payload dicts of the events"""
+
+    write_payload_csv_rows(
+        [get_log_event_serialiser(type(event)).get_payload_values(event) for event in events], csv_file, write_header
+    )
+
+
+def write_payload_csv_rows(payload_rows: Iterable[List[Any]], csv_file: Any, write_header: bool):
+    """Writes the rows that csv.DictWriter writes for payload dicts, given their values in order of LOG_PAYLOAD_FIELDS"""
+
+    writer = csv.writer(csv_file)
+    if write_header:
+        writer.writerow(LOG_PAYLOAD_FIELDS)
+
+    writer.writerows(payload_rows)
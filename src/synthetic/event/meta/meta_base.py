@@ -5,6 +5,8 @@ from synthetic.event.base import Event
 
 
 class MetaEvent(Event):
+    __slots__ = ("user",)
+
     def __init__(self, user: "SyntheticUser", ts: datetime):  # type: ignore
         super().__init__(ts)
 
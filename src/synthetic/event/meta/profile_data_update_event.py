@@ -10,11 +10,17 @@ logger = logging.getLogger(__name__)
 
 
 class ProfileDataUpdateEvent(MetaEvent):
+    __slots__ = ("_update",)
+
     def __init__(self, user: "SyntheticUser", ts: datetime, update: ProfileDataUpdate):  # type: ignore
         super().__init__(user, ts)
 
         self._update = update
 
+    @property
+    def update(self) -> ProfileDataUpdate:
+        return self._update
+
     def perform_actions(self) -> Optional[EventCollection]:
         self._update.apply_to_user(self.user)
         return None
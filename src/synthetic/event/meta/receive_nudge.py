@@ -10,6 +10,8 @@ logger = logging.getLogger(__name__)
 
 
 class ReceiveNudges(MetaEvent):
+    __slots__ = ()
+
     def __init__(self, user: "SyntheticUser", ts: datetime):  # type: ignore
         super().__init__(user, ts)
 
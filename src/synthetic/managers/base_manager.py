@@ -59,6 +59,64 @@ class BaseVariableManager:
 
         return updates
 
+    def get_pending_step_count(self, current_ts: datetime) -> int:
+        """Returns the number of whole update increments between the last update and the given timestamp"""
+
+        last_seen_ts = datetime.fromtimestamp(self.data["last_seen_ts"])
+        return max(0, int(total_difference_seconds(last_seen_ts, current_ts) // self._update_increment_seconds))
+
+    def advance(
+        self, current_ts: datetime, checkpoint_step_count: Optional[int] = None
+    ) -> Optional[Dict[datetime, ProfileDataUpdate]]:
+        """Advances the variable by all increments up to the given timestamp in one go. Unlike update, this only
+        returns updates with the last two states, plus one with the state every checkpoint_step_count increments if set.
+
+        """
+        step_count = self.get_pending_step_count(current_ts)
+        if step_count == 0:
+            return None
+
+        last_seen_ts = datetime.fromtimestamp(self.data["last_seen_ts"])
+        increment = timedelta(seconds=self._update_increment_seconds)
+
+        # The state one increment before the end is kept as well, since the update with the final state is only
+        # applied after the next schedule of the object has been filled
+        checkpoint_step_counts = set([step_count - 1, step_count])
+        if checkpoint_step_count is not None:
+            checkpoint_step_counts.update(range(checkpoint_step_count, step_count, checkpoint_step_count))
+
+        updates: Dict[datetime, ProfileDataUpdate] = {}
+        advanced_step_count = 0
+        for checkpoint_index in sorted(checkpoint_step_counts):
+            if checkpoint_index <= advanced_step_count:
+                continue
+
+            self.advance_variable(checkpoint_index - advanced_step_count)
+            advanced_step_count = checkpoint_index
+
+            checkpoint_ts = last_seen_ts + increment * advanced_step_count
+            self.data["last_seen_ts"] = checkpoint_ts.timestamp()
+            updates[checkpoint_ts] = self.create_state_update()
+
+        return updates
+
+    def advance_variable(self, step_count: int):
+        """Advances the variable by several increments. Managers that can jump ahead more cheaply than stepping
+        through every increment should override this.
+
+        """
+        for _ in range(0, step_count):
+            self.update_variable()
+
+    def create_state_update(self) -> ProfileDataUpdate:
+        """Creates an update that sets all stored data of the manager to its current values"""
+
+        update = ProfileDataUpdate()
+        for key, value in self.data.items():
+            update.add_set_variable(f"managers/{self._variable_name}/{key}", value)
+
+        return update
+
     def update_variable(self) -> ProfileDataUpdate:
         raise NotImplementedError()
 
@@ -1,15 +1,22 @@
 import logging
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
 
 from synthetic.conf import EngagementConfig
 from synthetic.managers.base_manager import BaseVariableManager
 from synthetic.user.profile_data_update import ProfileDataUpdate
-from synthetic.utils.event_utils import generate_engagement_delta
-from synthetic.utils.random import get_random_float_in_range
+from synthetic.utils.random import buffered_random, create_numpy_random_generator, get_random_float_in_range
 
 logger = logging.getLogger(__name__)
 
+# Engagement below this level has ended for good
+ENGAGEMENT_END_LEVEL = 10e-5
+
+# Number of engagement steps drawn per NumPy call whenever the steps drawn for some walk parameters run out
+ENGAGEMENT_STEP_BLOCK_SIZE = 4096
+
 
 # logger.setLevel(logging.DEBUG)
 
@@ -36,13 +43,13 @@ class EngagementManager(BaseVariableManager):
     def update_variable(self) -> ProfileDataUpdate:
         logger.debug("Updating engagement")
 
-        if self.data["engagement_level"] < 10e-5:
+        if self.data["engagement_level"] < ENGAGEMENT_END_LEVEL:
             # That's the end of engagement
             self.data["engagement_level"] = 0.0
 
             return ProfileDataUpdate.create_variable_set_update(f"managers/{self._variable_name}/engagement_level", 0.0)
 
-        engagement_delta = generate_engagement_delta(self._config)
+        engagement_delta = engagement_steps.next_delta(self._config)
         logger.debug("Updating variable with engagement delta %s", engagement_delta)
         updated_engagement = self.update_engagement(engagement_delta)
 
@@ -60,3 +67,77 @@ class EngagementManager(BaseVariableManager):
         logger.debug("Updating engagement by %s", engagement_delta)
         updated_engagement = self.data["engagement_level"] = self._get_updated_engagement(engagement_delta)
         return updated_engagement
+
+
+def draw_engagement_deltas(
+    config: EngagementConfig, generator: np.random.Generator, shape: Tuple[int, ...]
+) -> np.ndarray:
+    """Draws the deltas of engagement random walk steps all at once, distributed like generate_engagement_delta"""
+
+    changed = generator.random(shape) < config.change_probability
+    total_weight = config.boost_probability + config.decay_probability
+    boosted = generator.random(shape) * total_weight < config.boost_probability
+    magnitudes = config.change_min + generator.random(shape) * (config.change_max - config.change_min)
+    return np.where(changed, np.where(boosted, magnitudes, -magnitudes), 0.0)
+
+
+def walk_engagement_levels(config: EngagementConfig, levels: np.ndarray, step_counts: np.ndarray) -> np.ndarray:
+    """Steps the engagement random walk from each of the levels by the matching number of steps, all at once. This
+    pays off for many walks, e.g. all members of a cohort, as it still loops over the steps. A single walk is quicker to
+    step with update_variable.
+
+    :return: The level of each walk after every step, which stays put once a walk has taken all its steps
+    """
+    shape = (len(levels), int(step_counts.max()))
+    deltas = draw_engagement_deltas(config, create_numpy_random_generator(), shape)
+
+    level_history = np.empty(shape)
+    for step_index in range(0, shape[1]):
+        stepped_levels = np.where(levels < ENGAGEMENT_END_LEVEL, 0.0, np.clip(levels + deltas[:, step_index], 0, 1))
+        levels = np.where(step_index < step_counts, stepped_levels, levels)
+        level_history[:, step_index] = levels
+
+    return level_history
+
+
+class EngagementSteps:
+    """Serves the deltas of daily engagement steps from blocks drawn with NumPy, shared by all managers with the same
+    walk parameters. A block covers thousands of user days, e.g. the whole population catching up after downtime, at
+    a fraction of the cost of drawing each delta with generate_engagement_delta. Managers still take one step per day
+    as their schedule is filled, so every day sees its own level.
+
+    The blocks are drawn from the generator of buffered_random, and are dropped along with its blocks.
+    """
+
+    def __init__(self, block_size: int = ENGAGEMENT_STEP_BLOCK_SIZE):
+        self._block_size = block_size
+        self._generator: Optional[np.random.Generator] = None
+
+        # Remaining deltas per walk parameters, see _get_walk_key
+        self._deltas: Dict[Tuple[float, ...], Iterator[float]] = {}
+
+    @staticmethod
+    def _get_walk_key(config: EngagementConfig) -> Tuple[float, ...]:
+        return (
+            config.change_probability,
+            config.boost_probability,
+            config.decay_probability,
+            config.change_min,
+            config.change_max,
+        )
+
+    def next_delta(self, config: EngagementConfig) -> float:
+        generator = buffered_random.get_generator()
+        if generator is not self._generator:
+            self._deltas = {}
+            self._generator = generator
+
+        walk_key = self._get_walk_key(config)
+        try:
+            return next(self._deltas[walk_key])
+        except (KeyError, StopIteration):
+            self._deltas[walk_key] = iter(draw_engagement_deltas(config, generator, (self._block_size,)).tolist())
+            return next(self._deltas[walk_key])
+
+
+engagement_steps = EngagementSteps()
@@ -1,7 +1,8 @@
 from datetime import datetime
 import logging
-from typing import Dict
+from typing import Dict, List
 
+from synthetic.conf import global_conf
 from synthetic.managers.base_manager import BaseVariableManager
 from synthetic.user.profile_data_update import ProfileDataUpdate
 
@@ -21,7 +22,30 @@ class ManagedObject:
         updates = {}
 
         for manager in self._managers.values():
-            manager_updates = manager.update(current_ts)
+            if global_conf.coalesce_manager_updates and manager.get_pending_step_count(current_ts) > 1:
+                manager_updates = manager.advance(current_ts, global_conf.manager_checkpoint_step_count)
+            else:
+                manager_updates = manager.update(current_ts)
+            if manager_updates is None:
+                continue
+
+            updates.update(manager_updates)
+
+        return updates
+
+    def advance_managers(self, current_ts: datetime) -> Dict[datetime, ProfileDataUpdate]:
+        """Advances the managers lagging more than one increment behind the timestamp in one go, with a checkpoint every
+        global_conf.manager_checkpoint_step_count increments, see BaseVariableManager.advance. Managers that are at most
+        one increment behind are left to update_managers.
+
+        """
+        updates = {}
+
+        for manager in self._managers.values():
+            if manager.get_pending_step_count(current_ts) <= 1:
+                continue
+
+            manager_updates = manager.advance(current_ts, global_conf.manager_checkpoint_step_count)
             if manager_updates is None:
                 continue
 
@@ -40,6 +64,9 @@ class ManagedObject:
     def get_manager(self, variable_name: str):
         return self._managers.get(variable_name, None)
 
+    def get_managers(self) -> List[BaseVariableManager]:
+        return list(self._managers.values())
+
     def set_manager_data(self, data):
         for manager in self._managers.values():
             manager.set_data(data)
@@ -6,8 +6,9 @@ from synthetic.conf import global_conf
 from synthetic.event.log.nudge.nudge_response import NudgeResponseEvent
 from synthetic.sink.flush_sink import FlushSink
 from synthetic.event.catalog.catalog_base import CatalogEvent
+from synthetic.event.event_batch import EventBatch
 from synthetic.event.log.log_base import LogEvent
-from synthetic.utils.file import write_log_events_to_csv, write_catalog_events_to_csv
+from synthetic.utils.file import write_event_batch_to_csv, write_log_events_to_csv, write_catalog_events_to_csv
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +68,20 @@ class CSVFlushSink(FlushSink):
 
         write_log_events_to_csv(written_log_events, global_conf.log_events_filename)
 
+    def flush_event_batch(self, event_batch: EventBatch):
+        if global_conf.filter_log_events_for_csv:
+            super().flush_event_batch(event_batch)
+            return
+
+        if global_conf.log_events_filename is None:
+            raise ValueError("No log filename configured!")
+
+        output_dirname = os.path.dirname(global_conf.log_events_filename)
+        if not os.path.exists(output_dirname):
+            os.makedirs(output_dirname)
+
+        write_event_batch_to_csv(event_batch, global_conf.log_events_filename)
+
     def flush_catalog_events(self, catalog_events: List[CatalogEvent]):
         if global_conf.catalog_events_filename is None:
             raise ValueError("No catalog filename configured!")
@@ -2,6 +2,7 @@ import logging
 from typing import List
 
 from synthetic.event.catalog.catalog_base import CatalogEvent
+from synthetic.event.event_batch import EventBatch
 from synthetic.event.log.log_base import LogEvent
 
 logger = logging.getLogger(__name__)
@@ -21,3 +22,8 @@ class FlushSink:
 
     def flush_catalog_events(self, catalog_events: List[CatalogEvent]):
         raise NotImplementedError()
+
+    def flush_event_batch(self, event_batch: EventBatch):
+        """Flushes a batch of log events, through the event objects unless a sink can serialise the batch directly"""
+
+        self.flush_log_events(event_batch.to_events())
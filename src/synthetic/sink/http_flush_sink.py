@@ -10,7 +10,9 @@ from synthetic.conf import global_conf
 from synthetic.event.constants import SubjectType
 from synthetic.sink.flush_sink import FlushSink
 from synthetic.event.catalog.catalog_base import CatalogEvent
+from synthetic.event.event_batch import EventBatch
 from synthetic.event.log.log_base import LogEvent
+from synthetic.event.log.serialiser import encode_log_events_json
 from synthetic.utils.slack_notifier import Slack, MessageType
 
 logger = logging.getLogger(__name__)
@@ -19,13 +21,15 @@ FAKE_CALLS = False
 RATE_LIMITING_SLEEP_SECONDS = 0.01
 
 
-def post_payload_with_retries(url: str, headers: Dict[str, str], payload: Union[List, Dict], retry_count=10):
+def post_payload_with_retries(url: str, headers: Dict[str, str], payload: Union[List, Dict, str], retry_count=10):
+    """Posts the payload as JSON, or as is if it is already serialised"""
+
     current_retry_wait = 2
     used_retries = 0
     if FAKE_CALLS:
         logger.critical("Called payload %s with %s", url, payload)
     else:
-        serialised_payload = json.dumps(payload)
+        serialised_payload = payload if isinstance(payload, str) else json.dumps(payload)
 
         # Initial try
         res = requests.post(url="%s" % (url,), data=serialised_payload, headers=headers)
@@ -120,7 +124,17 @@ def send_log_events(events: List[LogEvent]):
 
     headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
 
-    payload = {"data": [event.as_payload_dict() for event in events]}
+    payload = '{"data": %s}' % (encode_log_events_json(events),)
+    post_payload_with_retries(f"{api_url}/data/ingest/log", headers, payload)
+
+
+def send_log_event_batch(event_batch: EventBatch, start: int, end: int):
+    api_url = global_conf.api_url
+    api_key = global_conf.api_key
+
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+
+    payload = '{"data": %s}' % (event_batch.encode_json(start, end),)
     post_payload_with_retries(f"{api_url}/data/ingest/log", headers, payload)
 
 
@@ -154,6 +168,12 @@ class HTTPFlushSink(FlushSink):
                 send_log_events(log_events[i : i + logs_per_batch])
                 time.sleep(RATE_LIMITING_SLEEP_SECONDS)
 
+    def flush_event_batch(self, event_batch: EventBatch, logs_per_batch=5000):
+        for i in range(0, len(event_batch), logs_per_batch):
+            send_log_event_batch(event_batch, i, i + logs_per_batch)
+            if i + logs_per_batch < len(event_batch):
+                time.sleep(RATE_LIMITING_SLEEP_SECONDS)
+
     def flush_catalog_events(self, catalog_events: List[CatalogEvent], logs_per_batch=5000):
         if len(catalog_events) == 0:
             return
@@ -0,0 +1,48 @@
+from datetime import date
+from typing import Dict, Optional
+
+# Whether the user was active is remembered for this many days, including today
+ACTIVE_DAY_WINDOW = 3
+
+ACTIVE_DAY_SLOT_KEYS = [str(slot) for slot in range(0, ACTIVE_DAY_WINDOW)]
+
+
+def get_active_day_slot_key(day_ordinal: int) -> str:
+    return ACTIVE_DAY_SLOT_KEYS[day_ordinal % ACTIVE_DAY_WINDOW]
+
+
+def encode_active_day(day_ordinal: int, active: bool) -> int:
+    return day_ordinal * 2 + (1 if active else 0)
+
+
+def get_active_day(active_days: Dict[str, int], day_ordinal: int) -> Optional[bool]:
+    """Returns whether the user was active on the day, or None if that is not known.
+
+    The active days are a ring of ACTIVE_DAY_WINDOW slots indexed by day ordinal, each holding the encoded ordinal and
+    activity of the last day written to it. Writing a day overwrites the day ACTIVE_DAY_WINDOW days before it, so old
+    days never need to be pruned.
+
+    """
+    encoded_day = active_days.get(ACTIVE_DAY_SLOT_KEYS[day_ordinal % ACTIVE_DAY_WINDOW], None)
+    if encoded_day is None or encoded_day // 2 != day_ordinal:
+        return None
+
+    return encoded_day % 2 == 1
+
+
+def is_legacy_active_days(active_days: Dict) -> bool:
+    """Whether the active days were stored by date string, as users written before the ring was introduced"""
+
+    return any([key not in ACTIVE_DAY_SLOT_KEYS for key in active_days])
+
+
+def migrate_legacy_active_days(legacy_active_days: Dict[str, bool], current_day_ordinal: int) -> Dict[str, int]:
+    """Converts active days keyed by date string into the ring, dropping days that have left the window"""
+
+    active_days: Dict[str, int] = {}
+    for date_str, active in sorted(legacy_active_days.items()):
+        day_ordinal = date.fromisoformat(date_str).toordinal()
+        if current_day_ordinal - ACTIVE_DAY_WINDOW < day_ordinal <= current_day_ordinal:
+            active_days[get_active_day_slot_key(day_ordinal)] = encode_active_day(day_ordinal, active)
+
+    return active_days
@@ -10,3 +10,6 @@ class SyntheticUserType(Enum):
 
     # A simple user that visits one page every second
     EVENT_PER_PERIOD = "event_per_period"
+
+    # Many session engagement users of a profile, simulated together as one cohort
+    SESSION_ENGAGEMENT_COHORT = "session_engagement_cohort"
@@ -2,14 +2,15 @@ import logging
 from datetime import timedelta, datetime
 from typing import Dict, List, Optional
 
+import numpy as np
+
 from synthetic.event.catalog.catalog_base import CatalogEvent
 from synthetic.event.event_collection import EventCollection
 from synthetic.event.meta.meta_base import MetaEvent
-from synthetic.utils.random import select_random_keys_from_dict
+from synthetic.utils.random import get_weighted_sampler
 from synthetic.utils.time_utils import total_difference_seconds
 from synthetic.database.schemas import SyntheticUserSchema
-from synthetic.event.log.log_base import LogEvent
-from synthetic.event.log.generator import generate_event_logs_of_type
+from synthetic.event.log.generator import generate_event_logs_for_periods
 from synthetic.user.constants import SyntheticUserType
 from synthetic.user.synthetic_user import SyntheticUser
 from synthetic.utils.user_utils import create_user_platform_uuid
@@ -79,20 +80,18 @@ class EventPerPeriodUser(SyntheticUser):
             end_ts,
         )
 
-        current_ts = start_ts
         meta_events: List[MetaEvent] = []
-        log_events: List[LogEvent] = []
         catalog_events: List[CatalogEvent] = []
 
-        while total_difference_seconds(current_ts, end_ts) >= seconds_per_event:
-            logger.debug("Adding event on %s...", current_ts)
-            selected_event_type = select_random_keys_from_dict(self._profile_config.event_probabilities, count=1)[0]
-
-            logs_for_type, _ = generate_event_logs_of_type(self, current_ts, selected_event_type, online=True)
-            log_events.extend(logs_for_type)
+        # An event every period that fits entirely before the end, all drawn at once
+        period_count = int(max(0, total_difference_seconds(start_ts, end_ts) // seconds_per_event))
+        period_timestamps = [
+            start_ts + timedelta(seconds=offset_seconds)
+            for offset_seconds in (np.arange(period_count) * seconds_per_event).tolist()
+        ]
+        event_types = get_weighted_sampler(self._profile_config.event_probabilities).sample_many(period_count)
 
-            # We decide how time passes ourselves
-            current_ts += timedelta(seconds=seconds_per_event)
+        log_events = generate_event_logs_for_periods(self, period_timestamps, event_types, online=True)
 
         logger.debug("Generated %s events!", len(log_events))
 
@@ -10,10 +10,11 @@ from synthetic.database.schemas import SyntheticUserSchema, DriverMetaSchema
 from synthetic.user.constants import SyntheticUserType
 from synthetic.user.event_per_period_user import EventPerPeriodUser
 from synthetic.user.purchase_engagement_user import PurchaseEngagementUser
+from synthetic.user.session_engagement_cohort_user import SessionEngagementCohortUser
 from synthetic.user.session_engagement_user import SessionEngagementUser
 from synthetic.user.synthetic_user import SyntheticUser
 from synthetic.utils.database import get_current_memory_usage_kb
-from synthetic.utils.random import select_random_keys_from_dict
+from synthetic.utils.random import get_weighted_sampler
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,8 @@ def build_user_from_db_data(data: SyntheticUserSchema) -> SyntheticUser:
         return PurchaseEngagementUser.from_db_data(data)
     elif user_type == SyntheticUserType.EVENT_PER_PERIOD:
         return EventPerPeriodUser.from_db_data(data)
+    elif user_type == SyntheticUserType.SESSION_ENGAGEMENT_COHORT:
+        return SessionEngagementCohortUser.from_db_data(data)
     else:
         raise ValueError("Invalid synthetic user type: %s" % (data.type,))
 
@@ -90,7 +93,7 @@ def create_random_user(
     assert isinstance(driver_meta_id, int)
 
     if profile_name is None:
-        profile_name = select_random_keys_from_dict(global_conf.profiles)[0]
+        profile_name = get_weighted_sampler(global_conf.profiles).sample()
 
     profile_config = global_conf.profiles[profile_name]
     user_type = profile_config.user_type
@@ -116,5 +119,12 @@ def create_random_user(
             profile_name=profile_name,
             platform_uuid=platform_uuid,
         )
+    elif user_type == SyntheticUserType.SESSION_ENGAGEMENT_COHORT:
+        return SessionEngagementCohortUser.create_random_user(
+            driver_meta_id=driver_meta_id,
+            registration_ts=registration_ts,
+            profile_name=profile_name,
+            platform_uuid=platform_uuid,
+        )
     else:
         raise ValueError("Unsupported profile type: %s" % (user_type,))
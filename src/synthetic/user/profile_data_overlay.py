@@ -0,0 +1,78 @@
+from copy import deepcopy
+from typing import Any, Dict, Hashable, Set
+
+
+class ProfileDataOverlay(dict):
+    """A copy-on-write view of profile data, used while filling the schedule of a user with externally managed side
+    effects.
+
+    The overlay starts out as a shallow copy of the underlying data. Nested dicts are wrapped in overlays of their own
+    and other containers are copied the first time they are accessed, so writes never reach the underlying data while
+    subtrees that are never touched are never copied. Discarding the overlay discards all writes made through it.
+    """
+
+    def __init__(self, data: Dict):
+        super().__init__(data)
+        self._owned_keys: Set[Hashable] = set()
+
+    def _own(self, key: Hashable, value: Any) -> Any:
+        if key in self._owned_keys:
+            return value
+
+        if isinstance(value, dict):
+            value = ProfileDataOverlay(value)
+        elif isinstance(value, (list, set)):
+            value = deepcopy(value)
+
+        dict.__setitem__(self, key, value)
+        self._owned_keys.add(key)
+        return value
+
+    def __getitem__(self, key: Hashable) -> Any:
+        return self._own(key, dict.__getitem__(self, key))
+
+    def __setitem__(self, key: Hashable, value: Any):
+        dict.__setitem__(self, key, value)
+        self._owned_keys.add(key)
+
+    def __delitem__(self, key: Hashable):
+        dict.__delitem__(self, key)
+        self._owned_keys.discard(key)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self:
+            return default
+
+        return self[key]
+
+    def setdefault(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+
+        return self[key]
+
+    def pop(self, key: Hashable, *args) -> Any:
+        if key not in self:
+            return dict.pop(self, key, *args)
+
+        value = self[key]
+        dict.pop(self, key)
+        self._owned_keys.discard(key)
+        return value
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def copy(self) -> Dict:
+        return dict(self.items())
+
+    def __reduce__(self):
+        # Values taken from the overlay can end up in events, which are pickled and copied as plain data
+        return dict, (dict(self),)
@@ -1,24 +1,44 @@
-from typing import Any, List, Dict
+from functools import lru_cache
+from typing import Any, List, Dict, Tuple
 
+# Profile data paths come from a small, fixed set of manager and behaviour variables
+VARIABLE_PATH_CACHE_SIZE = 4096
 
-def set_variable_in_path(data: Dict, path: str, value: Any):
-    current_data = data
-    parts = path.split("/")
+
+@lru_cache(maxsize=VARIABLE_PATH_CACHE_SIZE)
+def compile_variable_path(path: str) -> Tuple[str, ...]:
+    """Splits a slash-separated path into its keys once, so repeated writes to the same path skip the parsing"""
+
+    parts = tuple(path.split("/"))
     if len(parts) == 0:
         raise ValueError("Could not parse: %s" % (path,))
-    elif len(parts) > 1:
-        for part in parts[0:-1]:
-            if part not in current_data:
-                current_data[part] = {}
-            current_data = current_data[part]
 
-    current_data[parts[-1]] = value
+    return parts
+
+
+def set_variable_at_keys(data: Dict, keys: Tuple[str, ...], value: Any):
+    current_data = data
+    for key in keys[:-1]:
+        if key not in current_data:
+            current_data[key] = {}
+        current_data = current_data[key]
+
+    current_data[keys[-1]] = value
+
+
+def set_variable_in_path(data: Dict, path: str, value: Any):
+    set_variable_at_keys(data, compile_variable_path(path), value)
 
 
 class BaseUpdate:
     def apply_to_user(self, user: "SyntheticUser"):  # type: ignore
         raise NotImplementedError()
 
+    def add_to_writes(self, writes: Dict[Tuple[str, ...], Any]):
+        """Records the writes of this update by compiled path, replacing any earlier write to the same path"""
+
+        raise NotImplementedError()
+
 
 class SetVariableUpdate(BaseUpdate):
     def __init__(self, path: str, value: Any):
@@ -29,6 +49,13 @@ class SetVariableUpdate(BaseUpdate):
         profile_data = user.get_profile_data()
         set_variable_in_path(profile_data, self._path, self._value)
 
+    def add_to_writes(self, writes: Dict[Tuple[str, ...], Any]):
+        keys = compile_variable_path(self._path)
+
+        # Moving the write to the end keeps it after writes to its parents that it came after
+        writes.pop(keys, None)
+        writes[keys] = self._value
+
 
 class ProfileDataUpdate:
     @staticmethod
@@ -46,3 +73,44 @@ class ProfileDataUpdate:
     def apply_to_user(self, user: "SyntheticUser"):  # type: ignore
         for update in self._updates:
             update.apply_to_user(user)
+
+    def add_to_writes(self, writes: Dict[Tuple[str, ...], Any]):
+        for update in self._updates:
+            update.add_to_writes(writes)
+
+
+class ProfileDataUpdateBatch:
+    """Collects profile data updates per user in the order they happen, keeping only the last write per path, so they
+    can all be applied at once at the end of a flush.
+
+    """
+
+    def __init__(self):
+        self._users: Dict[int, "SyntheticUser"] = {}  # type: ignore
+        self._writes_by_user: Dict[int, Dict[Tuple[str, ...], Any]] = {}
+        self._update_count = 0
+
+    def __len__(self) -> int:
+        return self._update_count
+
+    def add_update(self, user: "SyntheticUser", update: ProfileDataUpdate):  # type: ignore
+        user_key = id(user)
+        if user_key not in self._writes_by_user:
+            self._users[user_key] = user
+            self._writes_by_user[user_key] = {}
+
+        update.add_to_writes(self._writes_by_user[user_key])
+        self._update_count += 1
+
+    def get_write_count(self) -> int:
+        return sum([len(writes) for writes in self._writes_by_user.values()])
+
+    def apply(self):
+        for user_key, writes in self._writes_by_user.items():
+            profile_data = self._users[user_key].get_profile_data()
+            for keys, value in writes.items():
+                set_variable_at_keys(profile_data, keys, value)
+
+        self._users.clear()
+        self._writes_by_user.clear()
+        self._update_count = 0
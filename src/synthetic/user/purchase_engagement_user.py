@@ -3,7 +3,6 @@ import random
 
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from uuid import uuid4
 
 from synthetic.catalog.cache import CatalogCache
 from synthetic.conf import global_conf, PurchaseBehaviourConfig
@@ -23,8 +22,15 @@ from synthetic.event.log.log_base import LogEvent
 from synthetic.user.constants import SyntheticUserType
 from synthetic.managers.engagement import EngagementManager
 from synthetic.user.session_engagement_user import SessionEngagementUser
+from synthetic.user.state_compaction import get_evicted_item_interest_uuids
 from synthetic.user.synthetic_user import SyntheticUser
-from synthetic.utils.random import get_random_float_in_range, get_random_int_in_range
+from synthetic.utils.id_generator import generate_id
+from synthetic.utils.random import (
+    buffered_random,
+    get_random_float_in_range,
+    get_random_int_in_range,
+    get_weighted_sampler,
+)
 from synthetic.utils.user_utils import create_user_platform_uuid
 
 logger = logging.getLogger(__name__)
@@ -162,8 +168,8 @@ class PurchaseEngagementUser(SessionEngagementUser):
             if payment_successful:
                 self.set_account_balance(self.account_balance + payment_amount, current_ts=current_ts)
 
-            payment_id = str(uuid4())
-            order_id = str(uuid4())
+            payment_id = generate_id()
+            order_id = generate_id()
             self.get_profile_data()
             preferred_payment_type = self.get_preferred_payment_type()
 
@@ -208,9 +214,8 @@ class PurchaseEngagementUser(SessionEngagementUser):
 
             item_interests = {}
 
-            interested_item_catalogs = CatalogCache.get_random_unique_catalogs_from_distribution(
-                catalog_probabilities, interested_item_count
-            )
+            interested_item_counts = get_weighted_sampler(catalog_probabilities).sample_counts(interested_item_count)
+            interested_item_catalogs = CatalogCache.get_random_unique_catalogs_for_counts(interested_item_counts)
             for interested_catalog_type, interested_item_catalog in interested_item_catalogs:
                 item_interests[interested_item_catalog["uuid"]] = {
                     "catalog_type": interested_catalog_type.value,
@@ -235,6 +240,29 @@ class PurchaseEngagementUser(SessionEngagementUser):
 
         self.set_profile_data_value("item_interests", item_interests, change_ts=current_ts)
 
+    def compact_profile_data(self, current_ts: datetime):
+        super().compact_profile_data(current_ts)
+
+        item_interests = self._profile_data.get("item_interests", {})
+        evicted_item_uuids = set(
+            get_evicted_item_interest_uuids(
+                item_interests, self.get_purchase_behaviour_config().item_interest_max_count
+            )
+        )
+        if len(evicted_item_uuids) > 0:
+            logger.debug("Evicting %s item interests of %s...", len(evicted_item_uuids), self.get_platform_uuid())
+            self.set_profile_data_value(
+                "item_interests",
+                dict(
+                    [
+                        (item_uuid, item_interest)
+                        for item_uuid, item_interest in item_interests.items()
+                        if item_uuid not in evicted_item_uuids
+                    ]
+                ),
+                change_ts=current_ts,
+            )
+
     def _generate_reminder_events(
         self, current_ts: datetime, shop_item: ShopItem, online: bool
     ) -> Tuple[datetime, List[LogEvent]]:
@@ -256,7 +284,7 @@ class PurchaseEngagementUser(SessionEngagementUser):
             current_reminders.remove(shop_item.id)
 
         self.set_profile_data_value("current_reminders", current_reminders, change_ts=current_ts)
-        current_ts += timedelta(seconds=random.randrange(5, 30))
+        current_ts += timedelta(seconds=buffered_random.randrange(5, 30))
 
         return current_ts, reminder_events
 
@@ -275,7 +303,7 @@ class PurchaseEngagementUser(SessionEngagementUser):
             current_favorites.remove(shop_item.id)
 
         self.set_profile_data_value("current_favorites", current_favorites, change_ts=current_ts)
-        current_ts += timedelta(seconds=random.randrange(5, 30))
+        current_ts += timedelta(seconds=buffered_random.randrange(5, 30))
 
         return current_ts, favorite_events
 
@@ -329,7 +357,8 @@ class PurchaseEngagementUser(SessionEngagementUser):
 
         catalog_probabilities = purchase_behaviour_config.catalog_type_probabilities
         assert len(catalog_probabilities) > 0
-        item_metas = CatalogCache.get_random_unique_catalogs_from_distribution(catalog_probabilities, impression_count)
+        item_counts = get_weighted_sampler(catalog_probabilities).sample_counts(impression_count)
+        item_metas = CatalogCache.get_random_unique_catalogs_for_counts(item_counts)
 
         for catalog_type, item_meta in item_metas:
             log_events.append(
@@ -368,7 +397,7 @@ class PurchaseEngagementUser(SessionEngagementUser):
         checkout_cancellation_probability = self._profile_data["checkout_cancellation_probability"]
 
         log_events: List[LogEvent] = []
-        order_id = str(uuid4())
+        order_id = generate_id()
         is_urgent = random.random() < checkout_urgent_probability
         will_be_cancelled = random.random() < checkout_cancellation_probability
         cancellation_type: CancelType = random.choice(list(CancelType))
@@ -486,12 +515,12 @@ class PurchaseEngagementUser(SessionEngagementUser):
                     ItemEvent(self, current_ts + timedelta(seconds=2), online, shop_item, ItemAction.VIEW)
                 )
 
-                current_ts += timedelta(seconds=random.randrange(5, 30))
+                current_ts += timedelta(seconds=buffered_random.randrange(5, 30))
 
                 if random.random() < purchase_behaviour_config.detail_probability:
                     # And in extreme cases, we view detail!
                     log_events.append(ItemEvent(self, current_ts, online, shop_item, ItemAction.DETAIL))
-                    current_ts += timedelta(seconds=random.randrange(5, 30))
+                    current_ts += timedelta(seconds=buffered_random.randrange(5, 30))
 
                 if random.random() < purchase_behaviour_config.favorite_probability:
                     current_ts, favorite_events = self._generate_favorite_events(current_ts, shop_item, online)
@@ -511,11 +540,11 @@ class PurchaseEngagementUser(SessionEngagementUser):
             log_events.append(
                 PromoEvent.build_from_catalog(self, current_ts, online, promo_catalog, action=PromoAction.VIEW)
             )
-            current_ts += timedelta(seconds=random.randint(1, 5))
+            current_ts += timedelta(seconds=buffered_random.randint(1, 5))
 
         # Now we are in purchase mode!
         total_price = 0.0
-        cart_id = str(uuid4())
+        cart_id = generate_id()
         order_items: List[ShopItem] = []
 
         for item_uuid, item_interest in item_interests.items():
@@ -552,7 +581,7 @@ class PurchaseEngagementUser(SessionEngagementUser):
                 if checkout_successful:
                     self.set_account_balance(self.account_balance - total_price, current_ts=current_ts)
 
-                current_ts += timedelta(seconds=random.randrange(5, 30))
+                current_ts += timedelta(seconds=buffered_random.randrange(5, 30))
 
         order_items = sorted(order_items, key=lambda curr_item: curr_item.id)
 
@@ -0,0 +1,473 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from synthetic.conf import global_conf
+from synthetic.constants import CatalogType, ProductUserType, SECONDS_IN_DAY
+from synthetic.database.schemas import SyntheticUserSchema
+from synthetic.event.catalog.catalog_base import CatalogEvent
+from synthetic.event.catalog.user_catalog import UserCatalogEvent
+from synthetic.event.event_batch import EventBatch, SessionEventColumns
+from synthetic.event.event_collection import EventCollection
+from synthetic.event.log.generator import BATCH_EVENT_TYPES, append_event_sequence_columns, append_rate_event_columns
+from synthetic.event.log.navigation.app import AppAction, AppEvent, build_app_props
+from synthetic.event.log.navigation.identify import IdentifyAction, IdentifyEvent, build_props_for_action
+from synthetic.managers.engagement import ENGAGEMENT_END_LEVEL, walk_engagement_levels
+from synthetic.user.constants import SyntheticUserType
+from synthetic.user.session_engagement_user import ENGAGEMENT_SCALED_SESSIONS, GUARANTEED_ENGAGEMENT_FOR_SESSION
+from synthetic.user.session_enrichment import BackgroundingStage, SessionEnrichmentStage, enrich_session_batch
+from synthetic.user.synthetic_user import SCHEDULE_DURATION_SECONDS, SyntheticUser
+from synthetic.user.user_reference import UserReference
+from synthetic.utils.catalog_utils import FirstCatalogUses
+from synthetic.utils.random import buffered_random, draw_float_ranges, get_weighted_sampler
+from synthetic.utils.time_utils import datetime_to_epoch_microseconds
+from synthetic.utils.user_utils import create_user_platform_uuid, get_user_data_for_platform_uuid
+
+logger = logging.getLogger(__name__)
+
+# Event types whose generators only need the profile of the user, which all members of a cohort share, and that are
+# written to batches directly
+COHORT_EVENT_TYPES = BATCH_EVENT_TYPES
+
+
+def encode_levels(levels: np.ndarray) -> str:
+    """Encodes engagement levels as the hex of their float32 values, which take less than half the space of a JSON list"""
+
+    return levels.astype("<f4").tobytes().hex()
+
+
+def decode_levels(encoded_levels: str) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex(encoded_levels), dtype="<f4").astype(np.float64)
+
+
+def encode_flags(flags: np.ndarray) -> str:
+    """Encodes flags as a hex bitset, as MilestoneIndex does for achieved milestones"""
+
+    return np.packbits(flags).tobytes().hex()
+
+
+def decode_flags(encoded_flags: str, count: int) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(bytes.fromhex(encoded_flags), dtype=np.uint8), count=count).astype(np.bool_)
+
+
+class SessionEngagementCohortUser(SyntheticUser):
+    """A cohort of users of one profile that behave like SessionEngagementUser, held as NumPy arrays rather than as one
+    object and profile data dict per user, so a process can simulate far larger populations.
+
+    The engagement levels, registration times and today's engagement of the members are arrays, persisted in the
+    profile data of the cohort, with the levels and flags encoded as hex. Only the parts that changed are written back.
+    Sessions are drawn for the whole cohort at once: which members are engaged on a day, their session counts, starts
+    and framing events, and the engagement walk. The content of the sessions is drawn in rounds, with one sequence for
+    every session still running per round. The log events are gathered as columns and written to the EventBatch of
+    the event collection in one go per event type, without creating event objects, and each catalog entry in use gets
+    a single catalog event a day. Members only generate the event types in COHORT_EVENT_TYPES and do not receive
+    nudges.
+
+    """
+
+    @staticmethod
+    def create_initial_profile_data(profile_name: str, registration_ts: datetime) -> Dict:
+        profile_conf = global_conf.profiles[profile_name]
+        member_count = profile_conf.cohort_size
+        engagement_config = profile_conf.get_engagement_config("session_engagement")
+
+        # Members register over the day from the registration of the cohort
+        generator = buffered_random.get_generator()
+        registration_timestamps = registration_ts.timestamp() + generator.random(member_count) * SECONDS_IN_DAY
+        engagement_levels = engagement_config.initial_min + generator.random(member_count) * (
+            engagement_config.initial_max - engagement_config.initial_min
+        )
+
+        return {
+            "profile_name": profile_name,
+            "registration_timestamp": str(registration_ts.timestamp()),
+            "cohort": {
+                "platform_uuids": [create_user_platform_uuid(profile_name) for _ in range(0, member_count)],
+                "registration_timestamps": registration_timestamps.tolist(),
+                "engagement_levels": encode_levels(engagement_levels),
+                "registered_until": registration_ts.timestamp(),
+                "active_day_ordinal": None,
+                "active_day_flags": encode_flags(np.zeros(member_count, dtype=np.bool_)),
+            },
+        }
+
+    @classmethod
+    def create_random_user(
+        cls,
+        driver_meta_id: int,
+        registration_ts: datetime,
+        profile_name: str,
+        platform_uuid: Optional[str] = None,
+    ):
+        if platform_uuid is None:
+            platform_uuid = create_user_platform_uuid(profile_name)
+
+        return SessionEngagementCohortUser(
+            driver_meta_id,
+            platform_uuid,
+            cls.create_initial_profile_data(profile_name, registration_ts=registration_ts),
+        )
+
+    @staticmethod
+    def from_db_data(raw_data: SyntheticUserSchema) -> SyntheticUser:
+        return SessionEngagementCohortUser(
+            driver_meta_id=raw_data.driver_meta_id,
+            platform_uuid=raw_data.platform_uuid,
+            profile_data=raw_data.profile_data,
+            last_seen_ts=raw_data.last_seen_ts,
+        )
+
+    def __init__(
+        self,
+        driver_meta_id: int,
+        platform_uuid: str,
+        profile_data: Dict,
+        last_seen_ts: Optional[datetime] = None,
+    ):
+        super().__init__(driver_meta_id, platform_uuid, profile_data, last_seen_ts=last_seen_ts)
+        self._type = SyntheticUserType.SESSION_ENGAGEMENT_COHORT
+
+        profile_conf = self.get_profile_conf()
+        if len(profile_conf.event_probabilities) == 0:
+            raise ValueError("No event probabilities configured for profile: %s" % (profile_data["profile_name"],))
+        unsupported_event_types = [
+            event_type for event_type in profile_conf.event_probabilities if event_type not in COHORT_EVENT_TYPES
+        ]
+        if len(unsupported_event_types) > 0:
+            raise ValueError("Cohorts cannot generate events of type %s!" % (unsupported_event_types,))
+
+        cohort_data = profile_data["cohort"]
+        self._member_platform_uuids: List[str] = cohort_data["platform_uuids"]
+        self._registration_timestamps = np.array(cohort_data["registration_timestamps"], dtype=np.float64)
+        self._engagement_levels = decode_levels(cohort_data["engagement_levels"])
+        self._registered_until: float = cohort_data["registered_until"]
+        self._active_day_ordinal: Optional[int] = cohort_data["active_day_ordinal"]
+        self._active_day_flags = decode_flags(cohort_data["active_day_flags"], len(self._member_platform_uuids))
+
+        self._member_references: Optional[List[UserReference]] = None
+
+    def get_member_count(self) -> int:
+        return len(self._member_platform_uuids)
+
+    def get_member_engagement_levels(self) -> np.ndarray:
+        return self._engagement_levels
+
+    def get_member_references(self) -> List[UserReference]:
+        if self._member_references is None:
+            profile_name = self._profile_data["profile_name"]
+            self._member_references = [
+                UserReference(member_platform_uuid, str(hash(member_platform_uuid)), profile_name)
+                for member_platform_uuid in self._member_platform_uuids
+            ]
+
+        return self._member_references
+
+    def is_active(self):
+        return bool(np.any(self._engagement_levels > ENGAGEMENT_END_LEVEL))
+
+    def force_churn(self):
+        self._engagement_levels[:] = 0.0
+
+    def check_registration(self, start_ts: datetime, end_ts: datetime) -> Tuple[datetime, EventCollection]:
+        """Registers the members whose registration falls in the time since the last call"""
+
+        end_timestamp = end_ts.timestamp()
+        registering = np.flatnonzero(
+            (self._registration_timestamps >= self._registered_until) & (self._registration_timestamps < end_timestamp)
+        )
+
+        # Once every member registered, there is nothing left to track
+        if self._registered_until <= self._registration_timestamps.max():
+            self._registered_until = max(self._registered_until, end_timestamp)
+
+        log_batch = EventBatch()
+        catalog_events: List[CatalogEvent] = []
+        member_references = self.get_member_references()
+        registering_references = [member_references[member_index] for member_index in registering.tolist()]
+        for member_index in registering.tolist():
+            registration_ts = datetime.fromtimestamp(self._registration_timestamps[member_index])
+            member_user_data = get_user_data_for_platform_uuid(self._member_platform_uuids[member_index])
+            catalog_events.append(UserCatalogEvent(registration_ts, data=member_user_data))
+
+        log_batch.extend_columns(
+            log_batch.add_users(registering_references),
+            np.array(
+                [
+                    datetime_to_epoch_microseconds(datetime.fromtimestamp(registration_timestamp))
+                    for registration_timestamp in self._registration_timestamps[registering].tolist()
+                ],
+                dtype=np.int64,
+            ),
+            np.ones(len(registering), dtype=np.bool_),
+            "identify",
+            [
+                build_props_for_action(member_reference, IdentifyAction.REGISTER)
+                for member_reference in registering_references
+            ],
+            event_class=IdentifyEvent,
+        )
+
+        return start_ts, EventCollection(catalog_events=catalog_events, log_batch=log_batch)
+
+    def _draw_active_day_flags(self, start_ts: datetime, eligible: np.ndarray) -> np.ndarray:
+        """Draws which members are engaged on the day of `start_ts`, once per day as _engaged_today does"""
+
+        day_ordinal = start_ts.toordinal()
+        if self._active_day_ordinal == day_ordinal:
+            return self._active_day_flags & eligible
+
+        generator = buffered_random.get_generator()
+        day_probability = self.get_profile_conf().session_day_of_week_probabilities[start_ts.weekday()]
+        base_session_probabilities = (
+            GUARANTEED_ENGAGEMENT_FOR_SESSION + (1.0 - GUARANTEED_ENGAGEMENT_FOR_SESSION) * self._engagement_levels
+        )
+        day_active = generator.random(self.get_member_count()) < day_probability
+        self._active_day_flags = (
+            day_active & (generator.random(self.get_member_count()) <= base_session_probabilities) & eligible
+        )
+        self._active_day_ordinal = day_ordinal
+        return self._active_day_flags
+
+    def _get_engagement_scalers(self, member_indices: np.ndarray, engagement_factor: float) -> np.ndarray:
+        if not ENGAGEMENT_SCALED_SESSIONS:
+            return np.ones(len(member_indices))
+
+        return 1.0 - engagement_factor + self._engagement_levels[member_indices] * engagement_factor
+
+    def _draw_session_starts(self, start_ts: datetime, engaged: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the member index and the start in seconds from `start_ts` of each session of the day, sorted by
+        start
+
+        """
+        profile_conf = self.get_profile_conf()
+        generator = buffered_random.get_generator()
+
+        engaged_indices = np.flatnonzero(engaged)
+        session_counts = np.round(
+            profile_conf.session_min_count
+            + (profile_conf.session_max_count - profile_conf.session_min_count)
+            * generator.random(len(engaged_indices))
+            * self._get_engagement_scalers(engaged_indices, profile_conf.session_engagement_count_factor)
+        ).astype(np.int64)
+        member_indices = np.repeat(engaged_indices, session_counts)
+
+        hour_probabilities = profile_conf.session_hourly_start_probabilities
+        start_hour = start_ts.hour
+        cum_weights = np.cumsum(hour_probabilities[start_hour:] + hour_probabilities[:start_hour])
+        hour_offsets = np.minimum(
+            np.searchsorted(cum_weights, generator.random(len(member_indices)) * cum_weights[-1], side="right"), 23
+        )
+        start_offsets_seconds = hour_offsets * 3600 + generator.random(len(member_indices)) * 3600
+
+        session_order = np.argsort(start_offsets_seconds, kind="stable")
+        return member_indices[session_order], start_offsets_seconds[session_order]
+
+    def get_session_enrichment_stages(self) -> List[SessionEnrichmentStage]:
+        background_per_minute_probability = self.get_profile_conf().background_per_minute_probability
+        if (
+            self.get_profile_conf().product_user_type == ProductUserType.MOBILE
+            and background_per_minute_probability > 0
+        ):
+            return [BackgroundingStage(background_per_minute_probability)]
+
+        return []
+
+    def _append_sessions(
+        self,
+        event_batch: EventBatch,
+        catalog_events: List[CatalogEvent],
+        start_ts: datetime,
+        session_user_indices: np.ndarray,
+        start_offsets_seconds: np.ndarray,
+        session_durations_seconds: np.ndarray,
+        online_flags: np.ndarray,
+    ):
+        """Appends the events of the sessions as SessionEngagementUser generates them, given the user of each session as
+        an index from EventBatch.add_users and its start in seconds from `start_ts`, and their associated catalog events
+        to `catalog_events`
+
+        """
+        profile_conf = self.get_profile_conf()
+        is_mobile = profile_conf.product_user_type == ProductUserType.MOBILE
+        generator = buffered_random.get_generator()
+        session_count = len(session_user_indices)
+        all_sessions = np.arange(session_count)
+        session_users = [event_batch.users[user_index] for user_index in session_user_indices.tolist()]
+        columns = SessionEventColumns()
+        catalog_uses = FirstCatalogUses()
+
+        current_offsets_seconds = start_offsets_seconds
+        if is_mobile:
+            columns.add(
+                all_sessions,
+                current_offsets_seconds,
+                "app",
+                [build_app_props(AppAction.OPEN) for _ in range(0, session_count)],
+                event_class=AppEvent,
+            )
+            current_offsets_seconds = current_offsets_seconds + draw_float_ranges(generator, 0.5, 5, session_count)
+
+        columns.add(
+            all_sessions,
+            current_offsets_seconds,
+            "identify",
+            [build_props_for_action(session_user, IdentifyAction.LOGIN) for session_user in session_users],
+            event_class=IdentifyEvent,
+        )
+        current_offsets_seconds = current_offsets_seconds + draw_float_ranges(generator, 2, 5, session_count)
+        columns.append_to(event_batch, start_ts, session_user_indices, online_flags)
+
+        # Each round adds a sequence of events to every session that hasn't reached its end yet
+        end_offsets_seconds = current_offsets_seconds + session_durations_seconds
+        current_offsets_seconds = current_offsets_seconds + 10 * (0.5 + generator.random(session_count))
+        event_type_sampler = get_weighted_sampler(profile_conf.event_probabilities)
+        running = np.flatnonzero(current_offsets_seconds < end_offsets_seconds)
+        while len(running) > 0:
+            event_type_indices = event_type_sampler.sample_indices(generator, len(running))
+            for event_type_index, event_type in enumerate(event_type_sampler.names):
+                sequence_sessions = running[event_type_indices == event_type_index]
+                if len(sequence_sessions) == 0:
+                    continue
+
+                current_offsets_seconds[sequence_sessions] = append_event_sequence_columns(
+                    columns,
+                    catalog_uses,
+                    catalog_events,
+                    profile_conf,
+                    event_type,
+                    sequence_sessions,
+                    current_offsets_seconds[sequence_sessions],
+                    start_ts,
+                )
+
+            current_offsets_seconds[running] += generator.integers(5, 30, size=len(running))
+            running = running[current_offsets_seconds[running] < end_offsets_seconds[running]]
+
+        content_start_index = len(event_batch)
+        content_session_indices = columns.append_to(event_batch, start_ts, session_user_indices, online_flags)
+        enrich_session_batch(
+            event_batch,
+            content_start_index,
+            content_session_indices,
+            online_flags,
+            self.get_session_enrichment_stages(),
+        )
+
+        columns.add(
+            all_sessions,
+            current_offsets_seconds,
+            "identify",
+            [build_props_for_action(session_user, IdentifyAction.LOGOUT) for session_user in session_users],
+            event_class=IdentifyEvent,
+        )
+        current_offsets_seconds = current_offsets_seconds + draw_float_ranges(generator, 0.5, 5, session_count)
+        if is_mobile:
+            columns.add(
+                all_sessions,
+                current_offsets_seconds,
+                "app",
+                [build_app_props(AppAction.CLOSE) for _ in range(0, session_count)],
+                event_class=AppEvent,
+            )
+            current_offsets_seconds = current_offsets_seconds + draw_float_ranges(generator, 0.5, 5, session_count)
+
+        append_rate_event_columns(
+            columns,
+            all_sessions,
+            current_offsets_seconds,
+            [f"{global_conf.organisation}_{global_conf.project}"] * session_count,
+            CatalogType.APP,
+        )
+        columns.append_to(event_batch, start_ts, session_user_indices, online_flags)
+
+        catalog_events.extend(catalog_uses.get_catalog_events(start_ts))
+
+    def generate_session_events(self, start_ts: datetime, end_ts: datetime) -> EventCollection:
+        """Generates the sessions of all members for the day from `start_ts` and steps their engagement by a day"""
+
+        event_batch = EventBatch()
+        catalog_events: List[CatalogEvent] = []
+        profile_conf = self.get_profile_conf()
+
+        end_timestamp = end_ts.timestamp()
+        new_day = self._active_day_ordinal != start_ts.toordinal()
+        eligible = (self._registration_timestamps < end_timestamp) & (self._engagement_levels > ENGAGEMENT_END_LEVEL)
+        engaged = self._draw_active_day_flags(start_ts, eligible)
+
+        member_indices, start_offsets_seconds = self._draw_session_starts(start_ts, engaged)
+        generator = buffered_random.get_generator()
+        online_flags = generator.random(len(member_indices)) < profile_conf.online_probability
+        session_durations_seconds = profile_conf.session_length_min_seconds + np.floor(
+            generator.random(len(member_indices))
+            * (profile_conf.session_length_max_seconds - profile_conf.session_length_min_seconds)
+            * self._get_engagement_scalers(member_indices, profile_conf.session_engagement_duration_factor)
+        ).astype(np.int64)
+
+        # Sessions that would start before their member registers are dropped
+        starting = start_ts.timestamp() + start_offsets_seconds >= self._registration_timestamps[member_indices]
+        session_member_indices, session_member_positions = np.unique(member_indices[starting], return_inverse=True)
+        member_references = self.get_member_references()
+        session_user_indices = event_batch.add_users(
+            [member_references[member_index] for member_index in session_member_indices.tolist()]
+        )[session_member_positions]
+        self._append_sessions(
+            event_batch,
+            catalog_events,
+            start_ts,
+            session_user_indices,
+            start_offsets_seconds[starting],
+            session_durations_seconds[starting],
+            online_flags[starting],
+        )
+
+        # Registered members take one step of the engagement walk per day, like their session engagement managers
+        registered = self._registration_timestamps < end_timestamp
+        if new_day and np.any(registered):
+            level_history = walk_engagement_levels(
+                profile_conf.get_engagement_config("session_engagement"),
+                self._engagement_levels,
+                registered.astype(np.int64),
+            )
+            # Levels are kept at the precision they are persisted at, so a cohort loaded back carries on exactly
+            self._engagement_levels = level_history[:, -1].astype(np.float32).astype(np.float64)
+
+        logger.debug(
+            "Generated %s events for %s engaged out of %s members!", len(event_batch), engaged.sum(), len(engaged)
+        )
+        return EventCollection(catalog_events=catalog_events, log_batch=event_batch.sorted_by_timestamp())
+
+    def _fill_event_schedule_for_day(self, start_ts: datetime, upcoming_events: EventCollection) -> datetime:
+        """Fills the day as other users do, but keeps the schedule on whole days. Sessions of members run past the end
+        of the day, and a schedule following the latest of them would cut the next day of every member short by the
+        longest overrun of any of them, where a single user only loses its own.
+
+        """
+        super()._fill_event_schedule_for_day(start_ts, upcoming_events)
+        return start_ts + timedelta(seconds=SCHEDULE_DURATION_SECONDS)
+
+    def _persist_cohort_data(self, change_ts: datetime):
+        """Writes the parts of the state of the cohort that changed since they were last written"""
+
+        cohort_data = self._profile_data["cohort"]
+        for key, value in [
+            ("engagement_levels", encode_levels(self._engagement_levels)),
+            ("registered_until", self._registered_until),
+            ("active_day_ordinal", self._active_day_ordinal),
+            ("active_day_flags", encode_flags(self._active_day_flags)),
+        ]:
+            if cohort_data[key] != value:
+                self.set_profile_data_value(f"cohort/{key}", value, change_ts=change_ts)
+
+    def create_custom_events(self, start_ts: datetime, end_ts: datetime) -> Optional[EventCollection]:
+        self._currently_generating_events = EventCollection()
+
+        if self.is_active():
+            self._currently_generating_events.extend_events(self.generate_session_events(start_ts, end_ts))
+
+        self._persist_cohort_data(end_ts)
+
+        result = self._currently_generating_events
+        self._currently_generating_events = None
+        return result
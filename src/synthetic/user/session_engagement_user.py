@@ -15,14 +15,27 @@ from synthetic.event.meta.receive_nudge import ReceiveNudges
 from synthetic.managers.engagement import EngagementManager
 from synthetic.utils.event_utils import generate_engagement_delta, calculate_bonus_session_count
 from synthetic.utils.nudge_utils import Nudge, generate_random_nudge
-from synthetic.utils.random import select_random_keys_from_dict, get_random_float_in_range, get_random_int_in_range
+from synthetic.utils.random import (
+    buffered_random,
+    get_weighted_sampler,
+    get_random_float_in_range,
+    get_random_int_in_range,
+    get_start_hour_sampler,
+)
 from synthetic.database.schemas import SyntheticUserSchema
 from synthetic.event.log.log_base import LogEvent
 from synthetic.event.log.navigation.identify import IdentifyEvent, IdentifyAction
 from synthetic.event.log.generator import generate_event_logs_of_type, generate_rate_events
+from synthetic.user.active_days import (
+    encode_active_day,
+    get_active_day,
+    get_active_day_slot_key,
+    is_legacy_active_days,
+    migrate_legacy_active_days,
+)
 from synthetic.user.constants import SyntheticUserType
+from synthetic.user.session_enrichment import BackgroundingStage, SessionEnrichmentStage, enrich_session_events
 from synthetic.user.synthetic_user import SyntheticUser
-from synthetic.utils.time_utils import total_difference_seconds
 from synthetic.utils.user_utils import create_user_platform_uuid
 
 logger = logging.getLogger(__name__)
@@ -37,46 +50,7 @@ GUARANTEED_ENGAGEMENT_FOR_SESSION = 0.8
 def enrich_session_events_with_backgrounding(
     session_events: List[LogEvent], online: bool, background_per_minute_probability: float = 0.05
 ) -> List[LogEvent]:
-    if len(session_events) < 2:
-        return session_events
-
-    last_session_event = session_events[0]
-    new_session_events = [last_session_event]
-    last_check_ts = last_session_event.ts
-
-    for session_event in session_events[1:]:
-        total_seconds_since_last_check = total_difference_seconds(last_check_ts, session_event.ts)
-        if total_seconds_since_last_check >= 60:
-            minute_count = math.floor(total_seconds_since_last_check / 60)
-            background_count = sum(
-                [random.random() < background_per_minute_probability for _ in range(0, minute_count)]
-            )
-            if background_count > 0:
-                background_ts_list = [
-                    last_check_ts + timedelta(seconds=random.random() * total_seconds_since_last_check)
-                    for _ in range(0, background_count)
-                ]
-                for background_ts in background_ts_list:
-                    new_session_events.append(
-                        AppEvent(last_session_event.user, background_ts, online, AppAction.BACKGROUND)
-                    )
-                    new_session_events.append(
-                        AppEvent(
-                            last_session_event.user, background_ts + timedelta(seconds=1), online, AppAction.RESUME
-                        )
-                    )
-                    new_session_events.append(
-                        IdentifyEvent(
-                            last_session_event.user, background_ts + timedelta(seconds=2), online, IdentifyAction.LOGIN
-                        )
-                    )
-
-            last_check_ts = session_event.ts
-
-        new_session_events.append(session_event)
-        last_session_event = session_event
-
-    return new_session_events
+    return BackgroundingStage(background_per_minute_probability).enrich(session_events, online)
 
 
 class SessionEngagementUser(SyntheticUser):
@@ -197,18 +171,19 @@ class SessionEngagementUser(SyntheticUser):
             raise ValueError(
                 "No event probabilities configured for profile: %s" % (self._profile_data["profile_name"],)
             )
+        event_type_sampler = get_weighted_sampler(self._profile_config.event_probabilities)
         current_session_ts = session_start_ts
         current_session_ts += timedelta(seconds=10 * (0.5 + random.random()))
 
         while current_session_ts < session_end_ts:
-            selected_event_type = select_random_keys_from_dict(self._profile_config.event_probabilities, count=1)[0]
+            selected_event_type = event_type_sampler.sample()
             new_events, current_session_ts = generate_event_logs_of_type(
                 self, current_session_ts, selected_event_type, online
             )
             log_events.extend(new_events)
 
             # Random wait between event types
-            current_session_ts += timedelta(seconds=random.randrange(5, 30))
+            current_session_ts += timedelta(seconds=buffered_random.randrange(5, 30))
 
         return EventCollection(meta_events=meta_events, log_events=log_events), current_session_ts
 
@@ -223,6 +198,15 @@ class SessionEngagementUser(SyntheticUser):
 
         return current_session_ts, logout_events
 
+    def get_session_enrichment_stages(self) -> List[SessionEnrichmentStage]:
+        """The stages that add to the events of each session, in order - override to plug in more"""
+
+        background_per_minute_probability = self.get_profile_conf().background_per_minute_probability
+        if self._product_user_type == ProductUserType.MOBILE and background_per_minute_probability > 0:
+            return [BackgroundingStage(background_per_minute_probability)]
+
+        return []
+
     def _create_session_and_events(self, session_start_ts: datetime) -> EventCollection:
         online = random.random() < self._profile_config.online_probability
         engagement_session_duration_factor = self.get_profile_conf().session_engagement_duration_factor
@@ -259,12 +243,7 @@ class SessionEngagementUser(SyntheticUser):
         )
         session_log_events = session_events.log_events
 
-        profile_conf = self.get_profile_conf()
-        background_per_minute_probability = profile_conf.background_per_minute_probability
-        if self._product_user_type == ProductUserType.MOBILE and background_per_minute_probability > 0:
-            session_log_events = enrich_session_events_with_backgrounding(
-                session_log_events, online, background_per_minute_probability=background_per_minute_probability
-            )
+        session_log_events = enrich_session_events(session_log_events, online, self.get_session_enrichment_stages())
 
         log_events.extend(session_log_events)
 
@@ -306,17 +285,15 @@ class SessionEngagementUser(SyntheticUser):
         return get_random_int_in_range(profile_conf.nudges.checks_per_day_min, profile_conf.nudges.checks_per_day_max)
 
     def _engaged_today(self, session_start_ts: datetime):
-        active_dates = self._profile_data["active_dates"] if "active_dates" in self._profile_data else {}
+        day_ordinal = session_start_ts.toordinal()
+        active_days = self._profile_data["active_dates"] if "active_dates" in self._profile_data else {}
+        migrated = is_legacy_active_days(active_days)
+        if migrated:
+            active_days = migrate_legacy_active_days(active_days, day_ordinal)
 
-        # Clear old data
-        for dt_str, active in active_dates.copy().items():
-            active_date = datetime.strptime(dt_str, "%Y-%m-%d").date()
-            if active_date < (session_start_ts - timedelta(days=2)).date():
-                del active_dates[dt_str]
-
-        session_start_date_str = session_start_ts.strftime("%Y-%m-%d")
-        if session_start_date_str in active_dates:
-            return active_dates[session_start_date_str]
+        engaged = get_active_day(active_days, day_ordinal)
+        if engaged is not None:
+            return engaged
 
         day_of_week_offset = session_start_ts.weekday()
         day_of_week_probabilities = self.get_profile_conf().session_day_of_week_probabilities
@@ -327,35 +304,29 @@ class SessionEngagementUser(SyntheticUser):
         )
         if day_probability < 1.0 and random.random() > day_probability:
             # Sessions skipped for today
-            active_dates[session_start_date_str] = False
-        elif random.random() <= base_session_probability:
-            active_dates[session_start_date_str] = True
+            engaged = False
         else:
-            active_dates[session_start_date_str] = False
+            engaged = random.random() <= base_session_probability
 
-        self.set_profile_data_value("active_dates", active_dates, change_ts=session_start_ts)
-        return active_dates[session_start_date_str]
+        # Only today's slot changes, unless the whole ring is new
+        slot_key = get_active_day_slot_key(day_ordinal)
+        if migrated:
+            active_days[slot_key] = encode_active_day(day_ordinal, engaged)
+            self.set_profile_data_value("active_dates", active_days, change_ts=session_start_ts)
+        else:
+            self.set_profile_data_value(
+                "active_dates/%s" % (slot_key,), encode_active_day(day_ordinal, engaged), change_ts=session_start_ts
+            )
+        return engaged
 
     def _generate_session_start_timestamps(self, start_ts: datetime, session_count: int) -> List[datetime]:
-        session_start_timestamps = []
-        hour_probabilities = self.get_profile_conf().session_hourly_start_probabilities
-        assert len(hour_probabilities) == 24
-        start_hour_probs = dict([(hour, prob) for hour, prob in enumerate(hour_probabilities)])
-        start_hour_offset_probs = dict(
-            [
-                (
-                    offset,
-                    start_hour_probs[(start_ts + timedelta(hours=offset)).hour],
-                )
-                for offset in range(0, 24)
-            ]
-        )
-        start_hour_offsets = select_random_keys_from_dict(start_hour_offset_probs, count=session_count)
-        for start_hour_offset in start_hour_offsets:
-            session_start_ts = start_ts + timedelta(hours=start_hour_offset, seconds=random.random() * 3600)
-            session_start_timestamps.append(session_start_ts)
+        """Returns the start of each session in the day from `start_ts`, sorted ascending"""
 
-        return session_start_timestamps
+        start_hour_sampler = get_start_hour_sampler(self.get_profile_conf().session_hourly_start_probabilities)
+        return [
+            start_ts + timedelta(seconds=offset_seconds)
+            for offset_seconds in start_hour_sampler.sample_offsets_seconds(start_ts.hour, session_count)
+        ]
 
     def _generate_session_events_starting_from(self, start_ts: datetime, session_count: int) -> EventCollection:
         events = EventCollection()
@@ -363,16 +334,13 @@ class SessionEngagementUser(SyntheticUser):
         if session_count <= 0:
             return events
 
-        session_start_timestamps = self._generate_session_start_timestamps(start_ts, session_count)
-
-        for session_index in range(0, session_count):
-            session_start_ts = session_start_timestamps[session_index]
-
-            # Have some random time pass before the start of the first session
+        # Sessions start in order, so their events only need to be sorted once they may overlap
+        for session_start_ts in self._generate_session_start_timestamps(start_ts, session_count):
             session_events = self._create_session_and_events(session_start_ts)
             logger.debug("Created session with %s log_events!", len(session_events.log_events))
-            events.insert_events(session_events)
+            events.extend_events(session_events)
 
+        events.sort_events()
         return events
 
     def create_custom_events(self, start_ts: datetime, end_ts: datetime) -> Optional[EventCollection]:
@@ -444,9 +412,7 @@ class SessionEngagementUser(SyntheticUser):
         nudge_conf = profile_conf.nudges
 
         online = random.random() < self._profile_config.online_probability
-        response_action: NudgeResponseAction = select_random_keys_from_dict(nudge_conf.response_probabilities, count=1)[
-            0
-        ]
+        response_action: NudgeResponseAction = get_weighted_sampler(nudge_conf.response_probabilities).sample()
 
         nudge_response = NudgeResponseEvent(
             user=self, response_ts=response_ts, online=online, nudge=nudge, nudge_response_action=response_action
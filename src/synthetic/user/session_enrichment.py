@@ -0,0 +1,218 @@
+from datetime import timedelta
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from synthetic.event.event_batch import EventBatch
+from synthetic.event.log.log_base import LogEvent
+from synthetic.event.log.navigation.app import AppEvent, AppAction, build_app_props
+from synthetic.event.log.navigation.identify import IdentifyEvent, IdentifyAction, build_props_for_action
+from synthetic.utils.random import buffered_random
+from synthetic.utils.time_utils import datetime_from_epoch_microseconds, datetime_to_epoch_microseconds
+
+
+class SessionEnrichmentStage:
+    """A step that adds events to the log events of a generated session, e.g. the app being sent to the background.
+
+    Users pick their stages in SyntheticUser subclasses, see SessionEngagementUser.get_session_enrichment_stages.
+
+    """
+
+    def enrich(self, session_events: List[LogEvent], online: bool) -> List[LogEvent]:
+        raise NotImplementedError()
+
+    def enrich_batch(
+        self, event_batch: EventBatch, start_index: int, session_indices: np.ndarray, session_online_flags: np.ndarray
+    ):
+        """Appends the events the stage adds to the sessions of the events from `start_index` on to the end of the
+        batch, given the session of each of those events and whether each session is online. The events of a session
+        are those of a single user, and may be out of order as the batch is sorted by time later.
+
+        """
+        raise NotImplementedError()
+
+
+def enrich_session_events(
+    session_events: List[LogEvent], online: bool, stages: List[SessionEnrichmentStage]
+) -> List[LogEvent]:
+    for stage in stages:
+        session_events = stage.enrich(session_events, online)
+
+    return session_events
+
+
+def enrich_session_batch(
+    event_batch: EventBatch,
+    start_index: int,
+    session_indices: np.ndarray,
+    session_online_flags: np.ndarray,
+    stages: List[SessionEnrichmentStage],
+):
+    """Enriches the sessions of the events from `start_index` on, as enrich_session_events does for event objects"""
+
+    for stage in stages:
+        stage.enrich_batch(event_batch, start_index, session_indices, session_online_flags)
+
+
+class BackgroundingStage(SessionEnrichmentStage):
+    """Sends the app to the background and back in the gaps of at least a minute between session events, with the
+    given probability per minute of each gap.
+
+    The background count of each gap is drawn as a single binomial and the times of the backgrounds as one sorted
+    batch of uniforms, rather than one draw per minute.
+
+    """
+
+    def __init__(self, background_per_minute_probability: float):
+        self.background_per_minute_probability = background_per_minute_probability
+
+    def _find_gaps(self, timestamps: Sequence[int]) -> List[Tuple[int, int, float]]:
+        """Returns the index of the event ending each gap, the start of the gap in epoch microseconds and its length in
+        seconds, given the epoch microseconds of the session events
+
+        """
+        gaps = []
+        last_check_timestamp = timestamps[0]
+        for event_index in range(1, len(timestamps)):
+            event_timestamp = timestamps[event_index]
+            gap_seconds = (event_timestamp - last_check_timestamp) / 1000000
+            if gap_seconds >= 60:
+                gaps.append((event_index, last_check_timestamp, gap_seconds))
+                last_check_timestamp = event_timestamp
+
+        return gaps
+
+    def _draw_gap_backgrounds(self, gap_seconds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the gap of each background and its time as a ratio of the gap, given the lengths of the gaps in
+        seconds. Backgrounds are ordered by gap, and by time within each gap.
+
+        """
+        generator = buffered_random.get_generator()
+        minute_counts = (gap_seconds // 60).astype(np.int64)
+        background_counts = generator.binomial(minute_counts, min(self.background_per_minute_probability, 1.0))
+        background_count_total = int(background_counts.sum())
+        if background_count_total == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        # Uniforms are sorted within each gap by sorting on the gap index first
+        gap_indices = np.repeat(np.arange(len(gap_seconds)), background_counts)
+        background_ratios = generator.random(background_count_total) + gap_indices
+        background_ratios.sort()
+        background_ratios -= gap_indices
+
+        return gap_indices, background_ratios
+
+    def _draw_backgrounds(self, gaps: List[Tuple[int, int, float]]) -> List[List[float]]:
+        """Returns the times of the backgrounds in each gap, as ratios of the gap sorted ascending"""
+
+        background_ratios_per_gap: List[List[float]] = [[] for _ in gaps]
+        gap_indices, background_ratios = self._draw_gap_backgrounds(
+            np.array([gap_seconds for _, _, gap_seconds in gaps])
+        )
+        for gap_index, background_ratio in zip(gap_indices.tolist(), background_ratios.tolist()):
+            background_ratios_per_gap[gap_index].append(background_ratio)
+
+        return background_ratios_per_gap
+
+    def enrich(self, session_events: List[LogEvent], online: bool) -> List[LogEvent]:
+        if len(session_events) < 2 or self.background_per_minute_probability <= 0.0:
+            return session_events
+
+        gaps = self._find_gaps([datetime_to_epoch_microseconds(event.ts) for event in session_events])
+        if len(gaps) == 0:
+            return session_events
+
+        background_ratios_per_gap = self._draw_backgrounds(gaps)
+        if all(len(background_ratios) == 0 for background_ratios in background_ratios_per_gap):
+            return session_events
+
+        new_session_events = list(session_events[: gaps[0][0]])
+        for gap_index, ((event_index, gap_start_timestamp, gap_seconds), background_ratios) in enumerate(
+            zip(gaps, background_ratios_per_gap)
+        ):
+            user = session_events[event_index - 1].user
+            gap_start_ts = datetime_from_epoch_microseconds(gap_start_timestamp)
+            for background_ratio in background_ratios:
+                background_ts = gap_start_ts + timedelta(seconds=background_ratio * gap_seconds)
+                new_session_events.append(AppEvent(user, background_ts, online, AppAction.BACKGROUND))
+                new_session_events.append(
+                    AppEvent(user, background_ts + timedelta(seconds=1), online, AppAction.RESUME)
+                )
+                new_session_events.append(
+                    IdentifyEvent(user, background_ts + timedelta(seconds=2), online, IdentifyAction.LOGIN)
+                )
+
+            next_event_index = gaps[gap_index + 1][0] if gap_index + 1 < len(gaps) else len(session_events)
+            new_session_events.extend(session_events[event_index:next_event_index])
+
+        return new_session_events
+
+    def enrich_batch(
+        self, event_batch: EventBatch, start_index: int, session_indices: np.ndarray, session_online_flags: np.ndarray
+    ):
+        if len(event_batch) - start_index < 2 or self.background_per_minute_probability <= 0.0:
+            return
+
+        timestamps = np.array(event_batch.timestamps[start_index:], dtype=np.int64)
+        event_order = np.lexsort((timestamps, session_indices))
+        sorted_timestamps = timestamps[event_order]
+        sorted_session_indices = session_indices[event_order]
+        session_bounds = np.flatnonzero(
+            np.concatenate([[True], sorted_session_indices[1:] != sorted_session_indices[:-1], [True]])
+        ).tolist()
+
+        gap_start_timestamps: List[int] = []
+        gap_seconds: List[float] = []
+        gap_event_indices: List[int] = []
+        for session_start, session_end in zip(session_bounds[:-1], session_bounds[1:]):
+            for _, gap_start_timestamp, seconds in self._find_gaps(
+                sorted_timestamps[session_start:session_end].tolist()
+            ):
+                gap_start_timestamps.append(gap_start_timestamp)
+                gap_seconds.append(seconds)
+                gap_event_indices.append(session_start)
+        if len(gap_seconds) == 0:
+            return
+
+        gap_seconds_array = np.array(gap_seconds)
+        gap_indices, background_ratios = self._draw_gap_backgrounds(gap_seconds_array)
+        background_count = len(gap_indices)
+        if background_count == 0:
+            return
+
+        background_epoch_microseconds = np.array(gap_start_timestamps, dtype=np.int64)[gap_indices] + np.round(
+            background_ratios * gap_seconds_array[gap_indices] * 1000000
+        ).astype(np.int64)
+
+        # The users and sessions of the backgrounds are those of the first events of their sessions
+        background_event_order = event_order[np.array(gap_event_indices, dtype=np.int64)[gap_indices]]
+        user_indices = np.array(event_batch.user_indices[start_index:], dtype=np.uint32)[background_event_order]
+        online_flags = session_online_flags[session_indices[background_event_order]]
+
+        event_batch.extend_columns(
+            user_indices,
+            background_epoch_microseconds,
+            online_flags,
+            "app",
+            [build_app_props(AppAction.BACKGROUND) for _ in range(0, background_count)],
+            event_class=AppEvent,
+        )
+        event_batch.extend_columns(
+            user_indices,
+            background_epoch_microseconds + 1000000,
+            online_flags,
+            "app",
+            [build_app_props(AppAction.RESUME) for _ in range(0, background_count)],
+            event_class=AppEvent,
+        )
+        event_batch.extend_columns(
+            user_indices,
+            background_epoch_microseconds + 2000000,
+            online_flags,
+            "identify",
+            [
+                build_props_for_action(event_batch.users[user_index], IdentifyAction.LOGIN)
+                for user_index in user_indices.tolist()
+            ],
+            event_class=IdentifyEvent,
+        )
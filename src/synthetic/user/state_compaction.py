@@ -0,0 +1,143 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from synthetic.catalog.cache import CatalogCache
+from synthetic.constants import CatalogType
+
+# Number of hex characters of the digest that identifies the milestone catalog a bitset is indexed against
+MILESTONE_INDEX_KEY_LENGTH = 16
+
+
+class MilestoneIndex:
+    """Assigns each milestone of the catalog a bit, in order of required score, so the milestones a user achieved can
+    be stored as a single hex string rather than a list of uuids.
+
+    """
+
+    def __init__(self, milestone_metas: List[Dict[str, Any]]):
+        sorted_metas = sorted(milestone_metas, key=lambda meta: (meta["required_score"], meta["uuid"]))
+
+        self.uuids: List[str] = [meta["uuid"] for meta in sorted_metas]
+        self.required_scores: List[float] = [meta["required_score"] for meta in sorted_metas]
+        self.bits_by_uuid: Dict[str, int] = dict([(uuid, bit) for bit, uuid in enumerate(self.uuids)])
+        self.key = hashlib.blake2b("\n".join(self.uuids).encode("utf-8")).hexdigest()[:MILESTONE_INDEX_KEY_LENGTH]
+
+    def encode(self, achieved_uuids: Set[str]) -> str:
+        bits = 0
+        for uuid in achieved_uuids:
+            bits |= 1 << self.bits_by_uuid[uuid]
+
+        return format(bits, "x")
+
+    def decode(self, encoded_bits: str) -> List[str]:
+        bits = int(encoded_bits, 16)
+        return [uuid for bit, uuid in enumerate(self.uuids) if bits >> bit & 1]
+
+    def encode_achieved_for_score(self, level_score: float) -> str:
+        """Returns the bits of the milestones a user with the level score has achieved, which are all milestones up to
+        the score as milestones are checked against the score whenever it changes
+
+        """
+        return self.encode(
+            set(
+                [
+                    uuid
+                    for uuid, required_score in zip(self.uuids, self.required_scores)
+                    if required_score <= level_score
+                ]
+            )
+        )
+
+
+# Indexes of every milestone catalog seen in this process by key, so bitsets indexed against an older catalog can still
+# be decoded
+_milestone_indexes_by_key: Dict[str, MilestoneIndex] = {}
+_milestone_index: Optional[Tuple[int, MilestoneIndex]] = None
+
+
+def get_milestone_index() -> MilestoneIndex:
+    """Returns the index of the cached milestone catalog, rebuilt only when the catalog cache revision of the
+    milestones changes
+
+    """
+    global _milestone_index
+
+    catalog_revision = CatalogCache.get_revision(CatalogType.MILESTONE)
+    if _milestone_index is None or _milestone_index[0] != catalog_revision:
+        milestone_index = MilestoneIndex(list(CatalogCache.cached_catalog.get(CatalogType.MILESTONE, {}).values()))
+        milestone_index = _milestone_indexes_by_key.setdefault(milestone_index.key, milestone_index)
+        _milestone_index = (catalog_revision, milestone_index)
+
+    return _milestone_index[1]
+
+
+def get_max_level_score(profile_data: Dict) -> float:
+    level_scores = profile_data.get("level_score", {})
+    return max(level_scores.values()) if len(level_scores) > 0 else 0.0
+
+
+def get_compacted_milestones(profile_data: Dict) -> Optional[Dict[str, str]]:
+    """Returns the milestone bitset the profile data should hold, or None if it is already up to date.
+
+    Users stored before the bitset have their list of uuids converted, and bitsets indexed against an older milestone
+    catalog are re-indexed, keeping the achieved milestones that are still in the catalog. New milestones are left for
+    the milestone events to award. Bitsets of a catalog this process hasn't seen are rebuilt from the level scores.
+
+    """
+    milestone_index = get_milestone_index()
+    milestones = profile_data.get("milestones", None)
+    if milestones is not None and milestones["index"] == milestone_index.key:
+        return None
+
+    if milestones is None:
+        achieved_uuids = profile_data.get("milestone_achieved_uuids", [])
+    elif milestones["index"] in _milestone_indexes_by_key:
+        achieved_uuids = _milestone_indexes_by_key[milestones["index"]].decode(milestones["bits"])
+    else:
+        return {
+            "index": milestone_index.key,
+            "bits": milestone_index.encode_achieved_for_score(get_max_level_score(profile_data)),
+        }
+
+    known_uuids = set([uuid for uuid in achieved_uuids if uuid in milestone_index.bits_by_uuid])
+    return {"index": milestone_index.key, "bits": milestone_index.encode(known_uuids)}
+
+
+def get_finished_module_uuids(profile_data: Dict) -> List[str]:
+    """Returns the modules the user has no duration left on, which progress_module reports as finished"""
+
+    return [
+        module_uuid
+        for module_uuid, module_data in profile_data.get("active_modules", {}).items()
+        if module_data["remaining_duration"] <= 0
+    ]
+
+
+def get_evicted_item_interest_uuids(item_interests: Dict[str, Dict], max_count: int) -> List[str]:
+    """Returns the item interests to drop: those whose items have left the catalog, which can't be viewed or bought
+    anymore, and then the weakest interests beyond `max_count`
+
+    """
+    evicted_uuids: List[str] = []
+    remaining_interests: List[Tuple[float, str]] = []
+    for item_uuid, item_interest in item_interests.items():
+        catalog_type = CatalogType(item_interest.get("catalog_type", CatalogType.DRUG.value))
+        if catalog_type in CatalogCache.cached_catalog and item_uuid not in CatalogCache.cached_catalog[catalog_type]:
+            evicted_uuids.append(item_uuid)
+        else:
+            remaining_interests.append((item_interest["interest_ratio"], item_uuid))
+
+    if len(remaining_interests) > max_count:
+        remaining_interests.sort()
+        evicted_uuids.extend(
+            [item_uuid for _, item_uuid in remaining_interests[: len(remaining_interests) - max_count]]
+        )
+
+    return evicted_uuids
+
+
+def get_profile_data_size(profile_data: Dict) -> int:
+    """Returns the size in bytes of the profile data as it is stored in the database"""
+
+    return len(json.dumps(profile_data, default=str))
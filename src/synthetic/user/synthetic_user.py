@@ -1,10 +1,9 @@
 import logging
-from copy import deepcopy
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 
 from synthetic.conf import global_conf, ProfileConfig
-from synthetic.constants import BlockType
+from synthetic.constants import BlockType, SECONDS_IN_DAY
 from synthetic.database.db_session_wrapper import DBSessionWrapper
 from synthetic.database.schemas import SyntheticUserSchema
 from synthetic.event.catalog.catalog_base import CatalogEvent
@@ -14,27 +13,20 @@ from synthetic.event.log.log_base import LogEvent
 from synthetic.event.meta.profile_data_update_event import ProfileDataUpdateEvent
 from synthetic.managers.managed_object import ManagedObject
 from synthetic.user.constants import SyntheticUserType
+from synthetic.user.profile_data_overlay import ProfileDataOverlay
 from synthetic.user.profile_data_update import ProfileDataUpdate, set_variable_in_path
+from synthetic.user.state_compaction import get_compacted_milestones, get_finished_module_uuids, get_milestone_index
+from synthetic.user.user_reference import UserReference
 from synthetic.utils.nudge_utils import Nudge, get_nudges_from_backend
 from synthetic.utils.current_time_utils import get_current_time
-from synthetic.utils.user_utils import generate_random_user_data
+from synthetic.utils.user_utils import get_logged_user_data, get_user_data_for_platform_uuid
 
 logger = logging.getLogger(__name__)
 
 # logger.setLevel(logging.DEBUG)
 
-LOGGED_USER_DATA_NAMES = [
-    'country',
-    'region_state',
-    'city',
-    'workplace',
-    'timezone',
-    'profession',
-    'zipcode',
-    'language',
-    'experience',
-    'education_level',
-]
+# The schedule of a user is filled a day at a time, see fill_event_schedule
+SCHEDULE_DURATION_SECONDS = SECONDS_IN_DAY
 
 
 class SyntheticUser(ManagedObject):
@@ -79,6 +71,7 @@ class SyntheticUser(ManagedObject):
 
         self._scheduled_events = EventCollection()
         self._forced_device_id: Optional[str] = None
+        self._event_reference: Optional[UserReference] = None
 
     def start_event_generation(self):
         assert self._currently_generating_events is None
@@ -186,15 +179,17 @@ class SyntheticUser(ManagedObject):
 
         generated_events = EventCollection()
 
+        # Side effects of filling the schedule are applied later through meta events, so they go to a throwaway overlay
         profile_data = None
         if externally_managed_side_effects:
-            profile_data = deepcopy(self._profile_data)
+            profile_data = self._profile_data
+            self.set_profile_data(ProfileDataOverlay(profile_data))
 
         while self._schedule_end_ts < end_ts:
-            generated_events.insert_events(self._scheduled_events)
+            # Schedules usually end after their latest event, but events past `end_ts` stay scheduled in case not
+            generated_events.insert_events(self._scheduled_events.pop_events_before(end_ts))
 
-            self._scheduled_events.clear()
-            self._schedule_end_ts = self.fill_event_schedule()
+            self._schedule_end_ts = self.fill_event_schedule(until_ts=end_ts)
 
         if externally_managed_side_effects:
             assert profile_data is not None
@@ -223,59 +218,91 @@ class SyntheticUser(ManagedObject):
 
         return generated_events
 
+    def schedule_catch_up(self, end_ts: datetime):
+        """Fills the schedule up to `end_ts` in one go, for the days a resumed or backfilling run catches up on. Managers
+        lagging behind are first advanced to the last of those days at once, so they emit checkpoint updates rather than
+        one per day, and the days in between are filled with their advanced state. The events stay scheduled until
+        generate_events reaches them, and side effects are applied through their meta events as in the driver.
+
+        """
+        if self._schedule_end_ts >= end_ts:
+            return
+
+        profile_data = self._profile_data
+        self.set_profile_data(ProfileDataOverlay(profile_data))
+
+        catch_up_events = EventCollection()
+        updates = self.advance_managers(end_ts - timedelta(seconds=SCHEDULE_DURATION_SECONDS))
+        for ts, update in updates.items():
+            catch_up_events.meta_events.append(ProfileDataUpdateEvent(self, ts, update))
+        self._scheduled_events.extend_events(catch_up_events)
+
+        while self._schedule_end_ts < end_ts:
+            self._schedule_end_ts = self.fill_event_schedule(until_ts=end_ts)
+
+        self.set_profile_data(profile_data)
+
     def set_last_seen_ts(self, last_seen_ts: datetime):
         self._last_seen_ts = last_seen_ts
         self._schedule_end_ts = last_seen_ts
 
-    def fill_event_schedule(self) -> datetime:
-        """This should not touch the variable managers, otherwise you get inconsistencies.
+    def _fill_event_schedule_for_day(self, start_ts: datetime, upcoming_events: EventCollection) -> datetime:
+        """Adds the events of the day from `start_ts` to `upcoming_events` unsorted, and returns where the schedule
+        ends after them.
 
-        :param db_session:
-        :return:
         """
-        schedule_duration_seconds: int = 86400
+        day_end_ts = start_ts + timedelta(seconds=SCHEDULE_DURATION_SECONDS)
+        logger.debug("Filling event schedule between %s and %s...", start_ts, day_end_ts)
 
-        new_schedule_end_ts = self._schedule_end_ts + timedelta(seconds=schedule_duration_seconds)
-        logger.debug(
-            "Filling event schedule between %s and %s...",
-            self._schedule_end_ts,
-            new_schedule_end_ts,
-        )
+        day_events = self.create_events(start_ts, day_end_ts)
+        if day_events is None:
+            day_events = EventCollection()
+        assert isinstance(day_events, EventCollection), day_events
 
-        upcoming_events = self.create_events(self._schedule_end_ts, new_schedule_end_ts)
+        updates = self.update_managers(day_end_ts)
+        for ts, update in updates.items():
+            day_events.meta_events.append(ProfileDataUpdateEvent(self, ts, update))
 
-        if upcoming_events is not None:
-            assert isinstance(upcoming_events, EventCollection), upcoming_events
-            self._scheduled_events.insert_events(upcoming_events)
+        if self._is_compaction_due(day_end_ts):
+            self.start_event_generation()
+            self.compact_profile_data(day_end_ts)
+            day_events.extend_events(self.finish_event_generation())
 
-            logger.debug(
-                "Schedule generated with %s events up to %s!",
-                len(self._scheduled_events.log_events),
-                new_schedule_end_ts,
-            )
+        upcoming_events.extend_events(day_events)
 
-            if len(self._scheduled_events.log_events) > 0:
-                logger.debug(
-                    "Filled log schedule between %s and %s...",
-                    self._scheduled_events.log_events[-1].ts,
-                    self._scheduled_events.log_events[0].ts,
-                )
-                assert self._scheduled_events.log_events[0].ts >= self._scheduled_events.log_events[-1].ts
-            if len(self._scheduled_events.catalog_events) > 0:
-                logger.debug(
-                    "Filled log schedule between %s and %s...",
-                    self._scheduled_events.catalog_events[-1].ts,
-                    self._scheduled_events.catalog_events[0].ts,
-                )
-                assert self._scheduled_events.catalog_events[0].ts >= self._scheduled_events.catalog_events[-1].ts
+        max_day_event_ts = day_events.get_latest_ts()
+        return max_day_event_ts if max_day_event_ts is not None else day_end_ts
 
-        updates = self.update_managers(new_schedule_end_ts)
-        for ts, update in updates.items():
-            self._scheduled_events.insert_meta_event(ProfileDataUpdateEvent(self, ts, update))
+    def fill_event_schedule(self, until_ts: Optional[datetime] = None) -> datetime:
+        """This should not touch the variable managers, otherwise you get inconsistencies.
+
+        Fills a day of events at a time. With global_conf.schedule_horizon_days above one, further days are filled in
+        the same call until the schedule reaches `until_ts`, and the events of all days are sorted in once.
+
+        :param until_ts: The time up to which events are needed, if known
+        :return: The new end of the schedule
+        """
+        new_schedule_end_ts = self._schedule_end_ts
+        upcoming_events = EventCollection()
+        for _ in range(0, max(1, global_conf.schedule_horizon_days)):
+            new_schedule_end_ts = self._fill_event_schedule_for_day(new_schedule_end_ts, upcoming_events)
+            if until_ts is None or new_schedule_end_ts >= until_ts:
+                break
 
-        max_scheduled_event_ts = self._scheduled_events.get_latest_ts()
-        if max_scheduled_event_ts is not None:
-            new_schedule_end_ts = max_scheduled_event_ts
+        self._scheduled_events.extend_events(upcoming_events)
+        self._scheduled_events.sort_events()
+
+        logger.debug(
+            "Schedule generated with %s events up to %s!",
+            len(self._scheduled_events.log_events),
+            new_schedule_end_ts,
+        )
+        if len(self._scheduled_events.log_events) > 0:
+            logger.debug(
+                "Filled log schedule between %s and %s...",
+                self._scheduled_events.log_events[-1].ts,
+                self._scheduled_events.log_events[0].ts,
+            )
 
         return new_schedule_end_ts
 
@@ -290,10 +317,14 @@ class SyntheticUser(ManagedObject):
 
     def get_all_user_data(self) -> Dict[str, str]:
         if self._user_data is None:
-            self._user_data = generate_random_user_data(platform_uuid=self.get_platform_uuid())
             if "user_data" in self._profile_data:
-                self._user_data.update(self.get_persisted_user_data())
+                persisted_user_data = self.get_persisted_user_data()
+                self._user_data = get_user_data_for_platform_uuid(
+                    self.get_platform_uuid(), country=persisted_user_data.get("country", None)
+                )
+                self._user_data.update(persisted_user_data)
             else:
+                self._user_data = get_user_data_for_platform_uuid(self.get_platform_uuid())
                 self._update_profile_data_with_user_data()
 
         return self._user_data
@@ -308,10 +339,7 @@ class SyntheticUser(ManagedObject):
         return persisted_user_data
 
     def get_logged_user_data(self) -> Dict[str, str]:
-        all_user_data = self.get_all_user_data()
-
-        logged_user_data = dict([(name, all_user_data[name]) for name in LOGGED_USER_DATA_NAMES])
-        return logged_user_data
+        return get_logged_user_data(self.get_all_user_data())
 
     def get_registration_payload(self) -> Dict[str, str]:
         user_data = self.get_all_user_data()
@@ -357,19 +385,30 @@ class SyntheticUser(ManagedObject):
     def set_level_score(self, block: BlockType, score: float, current_ts: datetime):
         self.set_profile_data_value(f"level_score/{block.value}", score, change_ts=current_ts)
 
+    def _get_milestones(self) -> Dict[str, str]:
+        """Returns the milestone bitset as it should be, leaving the write to set_milestone_achieved and
+        compact_profile_data so reading it never changes profile data without an update
+
+        """
+        compacted_milestones = get_compacted_milestones(self._profile_data)
+        if compacted_milestones is not None:
+            return compacted_milestones
+
+        return self._profile_data["milestones"]
+
     @property
     def milestone_achieved_uuids(self) -> List[str]:
-        if "milestone_achieved_uuids" not in self._profile_data:
-            self.set_profile_data_value("milestone_achieved_uuids", [])
-
-        return self._profile_data["milestone_achieved_uuids"]
+        return get_milestone_index().decode(self._get_milestones()["bits"])
 
     def set_milestone_achieved(self, milestone_uuid: str, current_ts: datetime):
-        new_profile_uuids = (
-            self._profile_data["milestone_achieved_uuids"] if "milestone_achieved_uuids" in self._profile_data else []
+        milestone_index = get_milestone_index()
+        achieved_uuids = set(milestone_index.decode(self._get_milestones()["bits"]))
+        achieved_uuids.add(milestone_uuid)
+        self.set_profile_data_value(
+            "milestones",
+            {"index": milestone_index.key, "bits": milestone_index.encode(achieved_uuids)},
+            change_ts=current_ts,
         )
-        new_profile_uuids.append(milestone_uuid)
-        self.set_profile_data_value("milestone_achieved_uuids", new_profile_uuids, change_ts=current_ts)
 
     @property
     def level(self) -> int:
@@ -402,11 +441,53 @@ class SyntheticUser(ManagedObject):
 
         return [key for key in self._profile_data["active_modules"]]
 
+    def compact_profile_data(self, current_ts: datetime):
+        """Drops or shrinks state the user no longer needs, so the profile data of long-lived users keeps a roughly
+        constant size. Subclasses with more state to bound extend this.
+
+        """
+        if "milestones" in self._profile_data or "milestone_achieved_uuids" in self._profile_data:
+            compacted_milestones = get_compacted_milestones(self._profile_data)
+            if compacted_milestones is not None:
+                self.set_profile_data_value("milestones", compacted_milestones, change_ts=current_ts)
+            if len(self._profile_data.get("milestone_achieved_uuids", [])) > 0:
+                self.set_profile_data_value("milestone_achieved_uuids", [], change_ts=current_ts)
+
+        finished_module_uuids = get_finished_module_uuids(self._profile_data)
+        if len(finished_module_uuids) > 0:
+            self.set_profile_data_value(
+                "active_modules",
+                dict(
+                    [
+                        (module_uuid, module_data)
+                        for module_uuid, module_data in self._profile_data["active_modules"].items()
+                        if module_uuid not in finished_module_uuids
+                    ]
+                ),
+                change_ts=current_ts,
+            )
+
+    def _is_compaction_due(self, current_ts: datetime) -> bool:
+        """Users compact on the same days, every global_conf.state_compaction_interval_days, so nothing needs storing"""
+
+        interval_days = global_conf.state_compaction_interval_days
+        return interval_days > 0 and current_ts.toordinal() % interval_days == 0
+
     def get_current_device_id(self):
         if self._forced_device_id is not None:
             return self._forced_device_id
         return str(hash(self.get_platform_uuid()))
 
+    def get_event_reference(self) -> UserReference:
+        """Returns the reference that log events of this user hold, which is shared until the device changes"""
+
+        if self._event_reference is None:
+            self._event_reference = UserReference(
+                self.get_platform_uuid(), self.get_current_device_id(), self._profile_data.get("profile_name", None)
+            )
+
+        return self._event_reference
+
     def persist_in_db(self, db_session: DBSessionWrapper, driver_meta_id: int):
         assert isinstance(driver_meta_id, int)
         db_user = SyntheticUserSchema.create_user_from_data(driver_meta_id, self)
@@ -488,6 +569,7 @@ class SyntheticUser(ManagedObject):
 
     def set_device_id(self, device_id: str):
         self._forced_device_id = device_id
+        self._event_reference = None
 
 
 def find_first_registered_user(
@@ -0,0 +1,38 @@
+from typing import Dict, Optional
+
+from synthetic.conf import ProfileConfig, global_conf
+from synthetic.utils.user_utils import get_logged_user_data, get_user_data_for_platform_uuid
+
+
+class UserReference:
+    """A lightweight stand-in for a synthetic user, held by the log events of the user. Cached log events only need to
+    know whose they are, so they shouldn't keep whole users and their profile data alive.
+
+    """
+
+    __slots__ = ("_platform_uuid", "_device_id", "_profile_name")
+
+    def __init__(self, platform_uuid: str, device_id: str, profile_name: Optional[str]):
+        self._platform_uuid = platform_uuid
+        self._device_id = device_id
+        self._profile_name = profile_name
+
+    def get_platform_uuid(self) -> str:
+        return self._platform_uuid
+
+    def get_current_device_id(self) -> str:
+        return self._device_id
+
+    def get_profile_conf(self) -> ProfileConfig:
+        assert self._profile_name is not None
+        return global_conf.profiles[self._profile_name]
+
+    def get_logged_user_data(self) -> Dict[str, str]:
+        """Returns the logged data drawn from the platform uuid alone, which is all the data of users that don't persist
+        any of their own, like the members of cohorts
+
+        """
+        return get_logged_user_data(get_user_data_for_platform_uuid(self._platform_uuid))
+
+    def get_event_reference(self) -> "UserReference":
+        return self
@@ -1,4 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
 
 from synthetic.catalog.cache import CatalogCache
 from synthetic.catalog.generator import create_catalog_event_for_type
@@ -34,3 +37,50 @@ def media_as_catalog_event(media_type: MediaType, uuid: str, ts: datetime) -> Ca
 def data_as_catalog_event(catalog_type: CatalogType, uuid: str, ts: datetime) -> CatalogEvent:
     catalog_data = CatalogCache.get_catalog_by_uuid(catalog_type, uuid)
     return create_catalog_event_for_type(catalog_type, ts=ts, data=catalog_data)
+
+
+# Media types of the media catalog types
+MEDIA_TYPES_BY_CATALOG_TYPE = {
+    CatalogType.MEDIA_VIDEO: MediaType.VIDEO,
+    CatalogType.MEDIA_AUDIO: MediaType.AUDIO,
+    CatalogType.MEDIA_IMAGE: MediaType.IMAGE,
+}
+
+
+class FirstCatalogUses:
+    """The first use of each catalog entry by log events drawn in bulk, as times in seconds from a start time. The
+    catalog events of entries repeat the same data, so such events only need one per entry rather than one per event.
+
+    """
+
+    def __init__(self):
+        self._offsets_by_entry: Dict[Tuple[CatalogType, str], float] = {}
+
+    def add(
+        self, catalog_type: CatalogType, uuids: Sequence[str], catalog_indices: np.ndarray, offsets_seconds: np.ndarray
+    ):
+        """Records uses of the entries at `catalog_indices` into `uuids`, at the given times"""
+
+        if len(catalog_indices) == 0:
+            return
+
+        use_order = np.lexsort((offsets_seconds, catalog_indices))
+        sorted_indices = catalog_indices[use_order]
+        first_uses = use_order[np.concatenate([[True], sorted_indices[1:] != sorted_indices[:-1]])]
+        for catalog_index, offset_seconds in zip(
+            catalog_indices[first_uses].tolist(), offsets_seconds[first_uses].tolist()
+        ):
+            entry = (catalog_type, uuids[catalog_index])
+            if offset_seconds < self._offsets_by_entry.get(entry, offset_seconds + 1):
+                self._offsets_by_entry[entry] = offset_seconds
+
+    def get_catalog_events(self, start_ts: datetime) -> List[CatalogEvent]:
+        catalog_events = []
+        for (catalog_type, uuid), offset_seconds in self._offsets_by_entry.items():
+            use_ts = start_ts + timedelta(seconds=offset_seconds)
+            if catalog_type in MEDIA_TYPES_BY_CATALOG_TYPE:
+                catalog_events.append(media_as_catalog_event(MEDIA_TYPES_BY_CATALOG_TYPE[catalog_type], uuid, use_ts))
+            else:
+                catalog_events.append(data_as_catalog_event(catalog_type, uuid, use_ts))
+
+        return catalog_events
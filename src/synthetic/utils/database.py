@@ -1,6 +1,5 @@
 import logging
 import resource
-import uuid
 from datetime import datetime
 from typing import List, Optional
 
@@ -17,11 +16,15 @@ from synthetic.database.schemas import (
 )
 from synthetic.constants import CatalogType
 from synthetic.event.catalog.catalog_base import CatalogEvent
+from synthetic.utils.id_generator import generate_id
 from synthetic.utils.data_utils import prepare_data_for_db
-from synthetic.utils.user_utils import fake
+from synthetic.utils.text_pool import fake_text
 
 logger = logging.getLogger(__name__)
 
+# Number of catalog rows sent per executemany when storing catalogs
+CATALOG_INSERT_BATCH_SIZE = 10000
+
 
 def clear_db_data(db_session: DBSessionWrapper):
     driver_meta = load_driver_meta_from_db(db_session, global_conf.organisation, global_conf.project)
@@ -50,33 +53,46 @@ def create_db_session(db_uri: str = None) -> DBSessionWrapper:
 
 
 def store_catalogs_in_db(db_session: DBSessionWrapper, driver_meta_id: int, catalogs: List[CatalogEvent]):
-    for catalog in catalogs:
-        catalog_data = catalog.data
-        db_session.add(
-            CatalogEntrySchema(
-                type=catalog.catalog_type.value,
-                driver_meta_id=driver_meta_id,
-                platform_uuid=catalog.data["uuid"],
-                data=prepare_data_for_db(catalog_data),
-            )
+    """Inserts the catalogs in batches with a single executemany each, rather than adding ORM objects one by one"""
+
+    catalog_table = CatalogEntrySchema.__table__
+    for batch_start in range(0, len(catalogs), CATALOG_INSERT_BATCH_SIZE):
+        db_session.execute(
+            catalog_table.insert(),
+            [
+                {
+                    "type": catalog.catalog_type.value,
+                    "driver_meta_id": driver_meta_id,
+                    "platform_uuid": catalog.data["uuid"],
+                    "data": prepare_data_for_db(catalog.data),
+                }
+                for catalog in catalogs[batch_start : batch_start + CATALOG_INSERT_BATCH_SIZE]
+            ],
         )
     db_session.commit()
 
 
+def count_catalogs_in_db(db_session: DBSessionWrapper, driver_meta_id: int, catalog_type: CatalogType) -> int:
+    return (
+        db_session.query(CatalogEntrySchema.id)
+        .filter_by(driver_meta_id=driver_meta_id, type=catalog_type.value)
+        .count()
+    )
+
+
 def populate_catalog_to_count_in_db(
     db_session: DBSessionWrapper,
     driver_meta_id: int,
     catalog_type: CatalogType,
     target_count: int,
     current_ts: datetime,
+    existing_count: Optional[int] = None,
 ) -> List[CatalogEvent]:
     assert isinstance(driver_meta_id, int)
     from synthetic.catalog.generator import create_random_catalog_events_for_type
 
-    existing_catalog_ids = db_session.query(CatalogEntrySchema.id, CatalogEntrySchema.type).filter_by(
-        driver_meta_id=driver_meta_id, type=catalog_type.value
-    )
-    existing_count = existing_catalog_ids.count()
+    if existing_count is None:
+        existing_count = count_catalogs_in_db(db_session, driver_meta_id, catalog_type)
 
     new_catalogs = []
     if existing_count == 0:
@@ -105,8 +121,8 @@ def populate_catalog_to_count_in_db(
                         catalog_type,
                         current_ts,
                         {
-                            "uuid": str(uuid.uuid4()),
-                            "name": fake.sentence(),
+                            "uuid": generate_id(),
+                            "name": fake_text.sentence(),
                             "required_score": required_level_score,
                         },
                     )
@@ -0,0 +1,127 @@
+import hashlib
+import os
+from typing import Optional
+
+import numpy as np
+
+from synthetic.conf import global_conf
+
+# Number of ids generated from each read of random bytes
+ID_BATCH_SIZE = 4096
+
+UUID_BYTE_COUNT = 16
+
+
+def _format_uuid_hex(uuid_hex: str) -> str:
+    return "%s-%s-%s-%s-%s" % (uuid_hex[:8], uuid_hex[8:12], uuid_hex[12:16], uuid_hex[16:20], uuid_hex[20:32])
+
+
+def _mark_as_uuid4(uuid_bytes: np.ndarray):
+    """Sets the version and variant bits of rows of 16 bytes in place, as uuid.uuid4 does"""
+
+    uuid_bytes[:, 6] = (uuid_bytes[:, 6] & 0x0F) | 0x40
+    uuid_bytes[:, 8] = (uuid_bytes[:, 8] & 0x3F) | 0x80
+
+
+class IdGenerator:
+    """Hands out random version 4 UUID strings, like str(uuid.uuid4()) but from batches of random bytes.
+
+    Once seeded, ids are instead derived from the seed and a counter, so runs with the same seed get the same ids in the
+    same order.
+
+    """
+
+    def __init__(self, batch_size: int = ID_BATCH_SIZE):
+        self._batch_size = batch_size
+
+        self._batch_hex = ""
+        self._batch_offset = 0
+
+        self._seed: Optional[int] = None
+        self._seed_key = b""
+        self._counter = 0
+
+    def seed(self, seed: Optional[int]):
+        """Switches to deterministic ids for the given seed, or back to random ones if None"""
+
+        self._seed = seed
+        self._seed_key = b"" if seed is None else str(seed).encode("utf-8")
+        self._counter = 0
+
+    def get_seed(self) -> Optional[int]:
+        return self._seed
+
+    def get_seeded_count(self) -> int:
+        """Returns how many seeded ids were handed out since the generator was seeded"""
+
+        return self._counter
+
+    def skip_seeded(self, count: int):
+        """Continues the seeded ids after the first `count`, which were already handed out"""
+
+        self._counter = max(self._counter, count)
+
+    def _refill(self):
+        uuid_bytes = np.frombuffer(os.urandom(self._batch_size * UUID_BYTE_COUNT), dtype=np.uint8)
+        uuid_bytes = uuid_bytes.reshape((self._batch_size, UUID_BYTE_COUNT)).copy()
+        _mark_as_uuid4(uuid_bytes)
+
+        self._batch_hex = uuid_bytes.tobytes().hex()
+        self._batch_offset = 0
+
+    def _generate_seeded(self) -> str:
+        self._counter += 1
+        digest = hashlib.blake2b(
+            self._counter.to_bytes(8, "big"), key=self._seed_key, digest_size=UUID_BYTE_COUNT
+        ).digest()
+
+        uuid_bytes = np.frombuffer(digest, dtype=np.uint8).reshape((1, UUID_BYTE_COUNT)).copy()
+        _mark_as_uuid4(uuid_bytes)
+        return _format_uuid_hex(uuid_bytes.tobytes().hex())
+
+    def generate(self) -> str:
+        if self._seed is not None:
+            return self._generate_seeded()
+
+        if self._batch_offset >= len(self._batch_hex):
+            self._refill()
+
+        batch_offset = self._batch_offset
+        self._batch_offset += 2 * UUID_BYTE_COUNT
+        return _format_uuid_hex(self._batch_hex[batch_offset : batch_offset + 2 * UUID_BYTE_COUNT])
+
+
+id_generator = IdGenerator()
+_id_generator_revision: Optional[int] = None
+
+
+def _get_id_generator() -> IdGenerator:
+    """Returns the id generator, seeded with global_conf.deterministic_id_seed. Seeded ids start over whenever the
+    configuration is reset or reloaded, e.g. in a new process, so a resumed run continues them with skip_generated_ids.
+
+    """
+    global _id_generator_revision
+
+    if _id_generator_revision != global_conf.revision or id_generator.get_seed() != global_conf.deterministic_id_seed:
+        id_generator.seed(global_conf.deterministic_id_seed)
+        _id_generator_revision = global_conf.revision
+
+    return id_generator
+
+
+def generate_id() -> str:
+    """Returns a new UUID-formatted id, deterministic if global_conf.deterministic_id_seed is set"""
+
+    return _get_id_generator().generate()
+
+
+def get_generated_id_count() -> int:
+    """Returns how many seeded ids were generated since the configuration was loaded, to be persisted with the run"""
+
+    return _get_id_generator().get_seeded_count()
+
+
+def skip_generated_ids(count: int):
+    """Skips the seeded ids a previous run already handed out, so a resumed run doesn't generate them again"""
+
+    _get_id_generator().skip_seeded(count)
@@ -1,18 +1,305 @@
 import logging
 import random
-from typing import Dict, Any, List
+from bisect import bisect
+from collections import Counter
+from itertools import accumulate
+from typing import Dict, Any, List, Tuple, Hashable, Optional, Callable, Iterator
 
-from synthetic.conf import ProfileConfig
+import numpy as np
+
+from synthetic.conf import ProfileConfig, global_conf
 from synthetic.constants import SECONDS_IN_DAY
 
 logger = logging.getLogger(__name__)
 
 
+def _get_weight(name_conf: Any) -> float:
+    if isinstance(name_conf, float):
+        return name_conf
+
+    return name_conf.occurrence_probability
+
+
+class WeightedSampler:
+    """Samples keys of a weighted dict, with the names and cumulative weights compiled once up front. The values of
+    the dict are either float weights or configs with an occurrence_probability.
+
+    """
+
+    def __init__(self, data: Dict[Any, Any]):
+        names = []
+        weights = []
+
+        for name, name_conf in data.items():
+            names.append(name)
+            weights.append(_get_weight(name_conf))
+
+        if len(names) == 0 or sum(weights) < 10e-5:
+            raise ValueError("Nothing to sample in config! %s" % (data,))
+
+        self._names = names
+        self._cum_weights = list(accumulate(weights))
+        self._total_weight = self._cum_weights[-1] + 0.0
+        self._max_index = len(names) - 1
+
+    def sample(self) -> Any:
+        # Same draw as random.choices(..., k=1), without rebuilding anything
+        return self._names[bisect(self._cum_weights, random.random() * self._total_weight, 0, self._max_index)]
+
+    @property
+    def names(self) -> List[Any]:
+        return self._names
+
+    def sample_indices(self, generator: np.random.Generator, count: int) -> np.ndarray:
+        """Draws `count` keys with NumPy, as indices into `names`"""
+
+        return np.minimum(
+            np.searchsorted(self._cum_weights, generator.random(count) * self._total_weight, side="right"),
+            self._max_index,
+        )
+
+    def sample_many(self, count: int) -> List[Any]:
+        return random.choices(self._names, cum_weights=self._cum_weights, k=count)
+
+    def sample_counts(self, count: int) -> Dict[Any, int]:
+        """Draws `count` keys in a single multinomial step and returns how often each key was drawn. Keys that were
+        never drawn are left out.
+
+        """
+        if count <= 0:
+            return {}
+
+        return dict(Counter(self.sample_many(count)))
+
+
+class StartHourSampler:
+    """Samples session start times in the 24 hours after a start hour, given the start probability per hour of day.
+    One cumulative table is compiled per start hour, rotated so that its first entry is the start hour itself.
+
+    """
+
+    def __init__(self, hour_probabilities: List[float]):
+        assert len(hour_probabilities) == 24
+        if sum(hour_probabilities) < 10e-5:
+            raise ValueError("Nothing to sample in hourly probabilities! %s" % (hour_probabilities,))
+
+        self._cum_weights_by_start_hour = [
+            list(accumulate(hour_probabilities[start_hour:] + hour_probabilities[:start_hour]))
+            for start_hour in range(0, 24)
+        ]
+
+    def sample_offsets_seconds(self, start_hour: int, count: int) -> List[float]:
+        """Draws the hour offset and the second within that hour of `count` sessions in one go, sorted ascending"""
+
+        cum_weights = self._cum_weights_by_start_hour[start_hour]
+        total_weight = cum_weights[-1]
+        return sorted(
+            [
+                bisect(cum_weights, random.random() * total_weight, 0, 23) * 3600 + random.random() * 3600
+                for _ in range(0, count)
+            ]
+        )
+
+
+_cached_samplers: Dict[Tuple[Hashable, Hashable], Any] = {}
+_cached_samplers_revision: Optional[int] = None
+
+
+def clear_sampler_cache():
+    global _cached_samplers_revision
+
+    _cached_samplers.clear()
+    _cached_samplers_revision = None
+
+
+def _get_table_key(table: Any) -> Hashable:
+    """Returns what a sampler compiled from the table depends on, so tables edited in place get a new sampler"""
+
+    if isinstance(table, dict):
+        return tuple([(name, _get_weight(name_conf)) for name, name_conf in table.items()])
+
+    return tuple(table)
+
+
+def _get_cached_sampler(table: Any, variant: Hashable, build_sampler: Callable[[], Any]) -> Any:
+    global _cached_samplers_revision
+
+    if _cached_samplers_revision != global_conf.revision:
+        _cached_samplers.clear()
+        _cached_samplers_revision = global_conf.revision
+
+    key = (_get_table_key(table), variant)
+    sampler = _cached_samplers.get(key, None)
+    if sampler is None:
+        sampler = build_sampler()
+        _cached_samplers[key] = sampler
+
+    return sampler
+
+
+def get_weighted_sampler(
+    table: Any, variant: Hashable = None, build_data: Optional[Callable[[], Dict[Any, Any]]] = None
+) -> WeightedSampler:
+    """Returns the compiled sampler for a static probability table from the configuration, e.g.
+    event_probabilities. Samplers are cached per table contents (and variant, if the sampled dict is derived from the
+    table by `build_data`) and are dropped whenever the configuration is reloaded.
+
+    """
+    return _get_cached_sampler(
+        table, variant, lambda: WeightedSampler(build_data() if build_data is not None else table)
+    )
+
+
+def get_start_hour_sampler(hour_probabilities: List[float]) -> StartHourSampler:
+    """Returns the compiled sampler for hourly start probabilities from the configuration, cached like
+    get_weighted_sampler
+
+    """
+    return _get_cached_sampler(hour_probabilities, StartHourSampler, lambda: StartHourSampler(hour_probabilities))
+
+
+def create_numpy_random_generator() -> np.random.Generator:
+    """Creates a NumPy generator seeded from the random module, so seeding random keeps vectorised draws repeatable"""
+
+    return np.random.default_rng(random.getrandbits(64))
+
+
+# Number of values drawn per NumPy call whenever a pool of buffered random values runs dry
+RANDOM_BLOCK_SIZE = 4096
+
+
+class BufferedRandom:
+    """Serves ints in a range and normals from blocks of values drawn with NumPy, which is several times cheaper per
+    value than randrange and normalvariate. Each block is drawn from a generator seeded from the random module when
+    the previous block runs dry.
+
+    The blocks are dropped whenever the configuration is reset or reloaded and whenever a Driver is created, so seeding
+    random before either repeats a run. Code that reseeds random in between, without reloading the configuration, has
+    to call reset() itself.
+
+    Plain uniform floats are cheapest straight from random.random, so they are only pooled to derive ints from.
+
+    """
+
+    def __init__(self, block_size: int = RANDOM_BLOCK_SIZE):
+        self._block_size = block_size
+        self._revision: Optional[int] = None
+
+        self._uniforms: Iterator[float] = iter(())
+        self._normals: Iterator[float] = iter(())
+        self._generator: Optional[np.random.Generator] = None
+
+    def reset(self):
+        """Drops the drawn blocks, so the next draws follow the current state of the random module"""
+
+        self._uniforms = iter(())
+        self._normals = iter(())
+        self._generator = None
+
+    def get_generator(self) -> np.random.Generator:
+        """Returns a NumPy generator for vectorised draws that are not pooled, e.g. binomials over varying counts"""
+
+        if self._revision != global_conf.revision:
+            self.reset()
+            self._revision = global_conf.revision
+
+        if self._generator is None:
+            self._generator = create_numpy_random_generator()
+
+        return self._generator
+
+    def _next_uniform(self) -> float:
+        if self._revision != global_conf.revision:
+            self.reset()
+            self._revision = global_conf.revision
+
+        try:
+            return next(self._uniforms)
+        except StopIteration:
+            self._uniforms = iter(create_numpy_random_generator().random(self._block_size).tolist())
+            return next(self._uniforms)
+
+    def _next_normal(self) -> float:
+        if self._revision != global_conf.revision:
+            self.reset()
+            self._revision = global_conf.revision
+
+        try:
+            return next(self._normals)
+        except StopIteration:
+            self._normals = iter(create_numpy_random_generator().standard_normal(self._block_size).tolist())
+            return next(self._normals)
+
+    def randrange(self, start: int, stop: int) -> int:
+        """Same as random.randrange(start, stop), for ranges well below 2^53 values"""
+
+        return start + int(self._next_uniform() * (stop - start))
+
+    def randint(self, a: int, b: int) -> int:
+        return self.randrange(a, b + 1)
+
+    def normalvariate(self, mu: float, sigma: float) -> float:
+        return mu + sigma * self._next_normal()
+
+
+buffered_random = BufferedRandom()
+
+
+def draw_int_ranges(generator: np.random.Generator, min_value: int, max_value: int, count: int) -> np.ndarray:
+    """Draws `count` ints as get_random_int_in_range does, with NumPy"""
+
+    if max_value <= min_value:
+        return np.full(count, min_value, dtype=np.int64)
+
+    return generator.integers(min_value, max_value, size=count)
+
+
+def draw_float_ranges(generator: np.random.Generator, min_value: float, max_value: float, count: int) -> np.ndarray:
+    """Draws `count` floats as get_random_float_in_range does, with NumPy"""
+
+    return min_value + generator.random(count) * (max_value - min_value)
+
+
+# Rounds of redrawing groups with repeated values before draw_unique_indices falls back to random.sample
+UNIQUE_DRAW_ROUNDS = 8
+
+
+def draw_unique_indices(generator: np.random.Generator, counts: np.ndarray, population_size: int) -> np.ndarray:
+    """Draws `counts[i]` distinct indices below `population_size` for each group i, as random.sample does per group,
+    and returns the indices of all groups one after the other. Groups are drawn with repeats allowed, and only those
+    that repeated a value are redrawn.
+
+    """
+    counts = np.minimum(counts, population_size)
+    group_count = len(counts)
+    max_count = int(counts.max()) if group_count > 0 else 0
+    if max_count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    slots = np.arange(max_count)
+    used_slots = slots < counts[:, None]
+    indices = generator.integers(0, population_size, size=(group_count, max_count))
+    for _ in range(0, UNIQUE_DRAW_ROUNDS):
+        # Unused slots are set past the population, one value each, so only used slots can repeat
+        sorted_indices = np.sort(np.where(used_slots, indices, population_size + slots), axis=1)
+        repeating = np.flatnonzero(np.any(sorted_indices[:, 1:] == sorted_indices[:, :-1], axis=1))
+        if len(repeating) == 0:
+            break
+
+        indices[repeating] = generator.integers(0, population_size, size=(len(repeating), max_count))
+    else:
+        for group_index in repeating.tolist():
+            count = int(counts[group_index])
+            indices[group_index, :count] = random.sample(range(0, population_size), k=count)
+
+    return indices[used_slots]
+
+
 def get_random_delivery_delay_seconds(delivery_delay_max_days: int, is_urgent: bool) -> float:
     # Cannot deliver faster than 1 day
     if not is_urgent:
-        delay = SECONDS_IN_DAY + delivery_delay_max_days * SECONDS_IN_DAY * abs(random.normalvariate(0, 0.1))
-        delay -= SECONDS_IN_DAY * abs(random.normalvariate(0, 0.2))
+        delay = SECONDS_IN_DAY + delivery_delay_max_days * SECONDS_IN_DAY * abs(buffered_random.normalvariate(0, 0.1))
+        delay -= SECONDS_IN_DAY * abs(buffered_random.normalvariate(0, 0.2))
     else:
         delay = 3600 * (1.0 + abs(random.random() * 4.0))
 
@@ -27,25 +314,22 @@ def get_random_int_in_range(min_value: int, max_value: int):
     if max_value <= min_value:
         return min_value
 
-    return random.randrange(min_value, max_value)
+    return buffered_random.randrange(min_value, max_value)
 
 
 def select_random_keys_from_dict(data: Dict[Any, Any], count: int = 1) -> List[Any]:
-    names = []
-    weights = []
+    return WeightedSampler(data).sample_many(count)
+
 
-    for name, name_conf in data.items():
-        names.append(name)
-        if isinstance(name_conf, float):
-            weights.append(name_conf)
-        else:
-            weights.append(name_conf.occurrence_probability)
+def select_random_key_counts_from_dict(data: Dict[Any, Any], count: int) -> Dict[Any, int]:
+    """Draws `count` keys from the weighted dict in a single multinomial step and returns how often each key was
+    drawn. Keys that were never drawn are left out.
 
-    if len(names) == 0 or sum(weights) < 10e-5:
-        raise ValueError("Nothing to sample in config! %s" % (data,))
+    """
+    if count <= 0:
+        return {}
 
-    result = random.choices(names, weights=weights, k=count)
-    return result
+    return WeightedSampler(data).sample_counts(count)
 
 
 def normalise_probabilities(probabilities):
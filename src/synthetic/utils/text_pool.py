@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import random
+from bisect import bisect
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from faker import Faker
+
+from synthetic.conf import global_conf
+
+logger = logging.getLogger(__name__)
+
+TEXT_POOL_SIZE = 4096
+TEXT_POOL_SEED = 0
+
+# The Faker providers that are pooled, which double as the method names on FakeTextPools
+TEXT_POOL_KINDS = ["sentence", "name", "email", "url"]
+
+
+class TextPool:
+    """A fixed list of pre-generated texts that are drawn from at random"""
+
+    def __init__(self, texts: List[str]):
+        assert len(texts) > 0, "Empty text pool!"
+        self._texts = texts
+
+        # Cumulative Zipf weights over the pool ranks, per exponent
+        self._zipf_cum_weights: Dict[float, List[float]] = {}
+
+    def draw(self, rng: Optional[random.Random] = None) -> str:
+        """Draws a text, using the given random generator instead of the random module if set"""
+
+        return self._texts[int((rng or random).random() * len(self._texts))]
+
+    def draw_zipf(self, exponent: float, rng: Optional[random.Random] = None) -> str:
+        """Draws texts such that the n-th text in the pool is drawn proportionally to 1 / n^exponent"""
+
+        if exponent <= 0.0:
+            return self.draw(rng)
+
+        if exponent not in self._zipf_cum_weights:
+            self._zipf_cum_weights[exponent] = list(
+                accumulate([1.0 / (rank**exponent) for rank in range(1, len(self._texts) + 1)])
+            )
+
+        cum_weights = self._zipf_cum_weights[exponent]
+        return self._texts[bisect(cum_weights, (rng or random).random() * cum_weights[-1], 0, len(cum_weights) - 1)]
+
+
+class FakeTextPools:
+    """Serves Faker-like fake text from pools that are generated once, since Faker is slow per call. Both the pool
+    contents and the draws are seeded. Like Faker, the draws come from a generator of their own, so drawing text
+    leaves the random module stream that the rest of the generation follows untouched.
+
+    If global_conf.text_pool_filename is set, the pools are loaded from that file, or written to it once generated. A
+    file missing a pool or holding pools of another size is overwritten with freshly generated pools. The pools are
+    rebuilt and their draws restarted whenever the configuration is reset or reloaded, reusing the texts generated
+    before.
+    """
+
+    def __init__(self, size: int = TEXT_POOL_SIZE, seed: int = TEXT_POOL_SEED):
+        self._size = size
+        self._seed = seed
+        self._pools: Dict[str, TextPool] = {}
+        self._revision: Optional[int] = None
+        self._generated_texts: Optional[Dict[str, List[str]]] = None
+        self._random = random.Random(seed)
+
+    def clear(self):
+        self._pools = {}
+        self._revision = None
+
+    def _generate_texts(self) -> Dict[str, List[str]]:
+        if self._generated_texts is None:
+            logger.debug("Generating text pools of size %s...", self._size)
+            faker = Faker()
+            faker.seed_instance(self._seed)
+            self._generated_texts = dict(
+                [(kind, [getattr(faker, kind)() for _ in range(0, self._size)]) for kind in TEXT_POOL_KINDS]
+            )
+
+        return self._generated_texts
+
+    def _load_texts(self, pool_filename: str) -> Optional[Dict[str, List[str]]]:
+        """Loads the pools written to the file, or returns None if it holds other kinds or sizes than generated here"""
+
+        try:
+            with open(pool_filename, "r") as pool_file:
+                texts = json.load(pool_file)
+        except ValueError:
+            logger.warning("Ignoring unreadable text pool file %s!", pool_filename)
+            return None
+
+        for kind in TEXT_POOL_KINDS:
+            kind_texts = texts.get(kind, None) if isinstance(texts, dict) else None
+            if not isinstance(kind_texts, list) or len(kind_texts) != self._size:
+                logger.warning(
+                    "Ignoring text pool file %s, which has no %s pool of size %s!", pool_filename, kind, self._size
+                )
+                return None
+
+        return texts
+
+    def _build_pools(self):
+        pool_filename = global_conf.text_pool_filename
+        texts = None
+        if pool_filename is not None and os.path.exists(pool_filename):
+            texts = self._load_texts(pool_filename)
+
+        if texts is None:
+            texts = self._generate_texts()
+            if pool_filename is not None:
+                with open(pool_filename, "w") as pool_file:
+                    json.dump(texts, pool_file)
+
+        self._pools = dict([(kind, TextPool(texts[kind])) for kind in TEXT_POOL_KINDS])
+        self._random = random.Random(self._seed)
+        self._revision = global_conf.revision
+
+    def _get_pool(self, kind: str) -> TextPool:
+        if self._revision != global_conf.revision:
+            self._build_pools()
+
+        return self._pools[kind]
+
+    def sentence(self, rng: Optional[random.Random] = None) -> str:
+        return self._get_pool("sentence").draw(rng or self._random)
+
+    def name(self, rng: Optional[random.Random] = None) -> str:
+        return self._get_pool("name").draw(rng or self._random)
+
+    def email(self, rng: Optional[random.Random] = None) -> str:
+        return self._get_pool("email").draw(rng or self._random)
+
+    def url(self, rng: Optional[random.Random] = None) -> str:
+        return self._get_pool("url").draw(rng or self._random)
+
+    def query(self, zipf_exponent: float = 0.0) -> str:
+        """Returns a search query - with a positive exponent a few queries are far more popular than the rest"""
+
+        return self._get_pool("sentence").draw_zipf(zipf_exponent, self._random)
+
+
+fake_text = FakeTextPools()
@@ -1,23 +1,74 @@
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List, Optional
 
+import numpy as np
 from rfc3339 import _timedelta_to_seconds
 
 from synthetic.constants import LOG_DATETIME_FORMAT
 
 
+# Timestamps are naive throughout, so epoch offsets are taken from a naive epoch rather than through the local timezone
+NAIVE_EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Events of a flush fall within a few hours, so a few thousand seconds cover most of them
+PAYLOAD_PREFIX_CACHE_SIZE = 8192
+
+
 def total_difference_seconds(first_ts: datetime, last_ts: datetime) -> int:
     return _timedelta_to_seconds(last_ts - first_ts)
 
 
+@lru_cache(maxsize=PAYLOAD_PREFIX_CACHE_SIZE)
+def _get_payload_second_prefix(year: int, month: int, day: int, hour: int, minute: int, second: int) -> str:
+    return "%04d-%02d-%02dT%02d:%02d:%02d." % (year, month, day, hour, minute, second)
+
+
 def datetime_to_payload_str(t: Optional[datetime]) -> str:
+    """Formats as LOG_DATETIME_FORMAT does, reusing the formatted date and time of each second"""
+
     if t is None:
         raise ValueError("Cannot format None datetime!")
-    return t.strftime(LOG_DATETIME_FORMAT)
+    return "%s%06dZ" % (
+        _get_payload_second_prefix(t.year, t.month, t.day, t.hour, t.minute, t.second),
+        t.microsecond,
+    )
 
 
 def datetime_from_payload_str(t_str: str) -> datetime:
+    if t_str.endswith("Z"):
+        try:
+            return datetime.fromisoformat(t_str[:-1])
+        except ValueError:
+            pass
+
     try:
         return datetime.strptime(t_str, LOG_DATETIME_FORMAT)
     except ValueError:
         return datetime.strptime(t_str, "%Y-%m-%dT%H:%M:%SZ")
+
+
+def epoch_microseconds_to_payload_strs(epoch_microseconds: Iterable[int]) -> List[str]:
+    """Formats many naive epoch timestamps as LOG_DATETIME_FORMAT does, at once"""
+
+    timestamps = np.asarray(epoch_microseconds, dtype=np.int64).astype("datetime64[us]")
+    return [t_str + "Z" for t_str in np.datetime_as_string(timestamps, unit="us").tolist()]
+
+
+def payload_strs_to_epoch_microseconds(t_strs: Iterable[str]) -> np.ndarray:
+    """Parses many payload timestamps into naive epoch microseconds at once, accepting what datetime_from_payload_str
+    accepts
+
+    """
+    return np.array([t_str[:-1] if t_str.endswith("Z") else t_str for t_str in t_strs], dtype="datetime64[us]").astype(
+        np.int64
+    )
+
+
+def datetime_to_epoch_microseconds(t: datetime) -> int:
+    return (t - NAIVE_EPOCH) // ONE_MICROSECOND
+
+
+def datetime_from_epoch_microseconds(epoch_microseconds: int) -> datetime:
+    return NAIVE_EPOCH + timedelta(microseconds=epoch_microseconds)
@@ -1,11 +1,11 @@
 import random
-import uuid
-from typing import Any, Dict, Optional, Tuple
-from uuid import uuid4
-
-from faker import Faker
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from synthetic.constants import MAX_UUID_LENGTH, PROFILE_NAME_LENGTH_LIMIT
+from synthetic.utils.id_generator import generate_id
+from synthetic.utils.text_pool import fake_text
 
 LOCATION_DATA: Dict[str, Any] = {
     "CN": {
@@ -36,56 +36,78 @@ LOCATION_DATA: Dict[str, Any] = {
 }
 
 
+# Choice tables precomputed from LOCATION_DATA, so that drawing locations doesn't rebuild the key lists every time
+LOCATION_COUNTRIES: List[str] = list(LOCATION_DATA.keys())
+LOCATION_REGION_STATES: Dict[str, List[str]] = dict(
+    [(country, list(location_data["region_states"].keys())) for country, location_data in LOCATION_DATA.items()]
+)
+LOCATION_CITIES: Dict[Tuple[str, str], List[str]] = dict(
+    [
+        ((country, region_state), list(region_state_data["cities"]))
+        for country, location_data in LOCATION_DATA.items()
+        for region_state, region_state_data in location_data["region_states"].items()
+    ]
+)
+
+# The number of users whose demographic data is kept around, see get_user_data_for_platform_uuid
+USER_DATA_CACHE_SIZE = 16384
+
+# The user data that identify events carry when SEND_USER_DATA_IN_LOGS is set
+LOGGED_USER_DATA_NAMES = [
+    "country",
+    "region_state",
+    "city",
+    "workplace",
+    "timezone",
+    "profession",
+    "zipcode",
+    "language",
+    "experience",
+    "education_level",
+]
+
+
 def create_user_platform_uuid(profile_name: str):
     if len(profile_name) > PROFILE_NAME_LENGTH_LIMIT:
         profile_name = profile_name[0:PROFILE_NAME_LENGTH_LIMIT]
 
-    platform_uuid = f"{profile_name}-{str(uuid4())}"
+    platform_uuid = f"{profile_name}-{generate_id()}"
     assert len(platform_uuid) <= MAX_UUID_LENGTH
 
     return platform_uuid
 
 
-def generate_random_location_data_for_country(country: str) -> Tuple[str, str, int]:
-    location_data = LOCATION_DATA[country]
-    timezone = location_data["timezone"]
-    region_state = random.choice(list(location_data["region_states"].keys()))
-    city = random.choice(list(location_data["region_states"][region_state]["cities"]))
+def generate_random_location_data_for_country(country: str, rng: Any = random) -> Tuple[str, str, int]:
+    timezone = LOCATION_DATA[country]["timezone"]
+    region_state = rng.choice(LOCATION_REGION_STATES[country])
+    city = rng.choice(LOCATION_CITIES[(country, region_state)])
 
     return region_state, city, timezone
 
 
-def generate_random_user_data(platform_uuid: Optional[str] = None, country: Optional[str] = None) -> Dict[str, str]:
-    """We don't want to store this in the db, it's a lot of useless information... So don't actually add it to the
-    cache!
-
-    :param platform_uuid:
-    :param country:
-    :return:
-    """
+def _generate_user_data(
+    platform_uuid: str, country: Optional[str], rng: Any, text_rng: Optional[random.Random]
+) -> Dict[str, str]:
     if country is None:
-        country = random.choice(list(LOCATION_DATA.keys()))
-
-    region_state, city, timezone = generate_random_location_data_for_country(country)
+        country = rng.choice(LOCATION_COUNTRIES)
 
-    if platform_uuid is None:
-        platform_uuid = str(uuid.uuid4())
+    region_state, city, timezone = generate_random_location_data_for_country(country, rng=rng)
 
     return {
         "platform_uuid": platform_uuid,
-        "email": fake.email(),
-        "name": fake.name(),
+        "email": fake_text.email(text_rng),
+        "name": fake_text.name(text_rng),
         "country": country,
         "timezone": str(timezone),
         "region_state": region_state,
         "city": city,
-        "language": random.choice(["de", "en", "es", "fr", "ru", "zh"]),
-        "zipcode": str(hash(city)),
-        "profession": random.choice(["health worker", "student", "doctor", "nurse"]),
-        "workplace": random.choice(["hospital", "primary healthcare center", "secondary healthcare center"]),
-        "experience": random.choice(["student", "amateur", "professional"]),
-        "organization": fake.name(),
-        "education_level": random.choice(
+        "language": rng.choice(["de", "en", "es", "fr", "ru", "zh"]),
+        "zipcode": str(zlib.crc32(city.encode("utf-8"))),
+        "profession": rng.choice(["health worker", "student", "doctor", "nurse"]),
+        "workplace": rng.choice(["hospital", "primary healthcare center", "secondary healthcare center"]),
+        "experience": rng.choice(["student", "amateur", "professional"]),
+        "organization": fake_text.name(text_rng),
+        "education_level": rng.choice(
             [
                 "primary",
                 "lower_secondary",
@@ -100,4 +122,38 @@ def generate_random_user_data(platform_uuid: Optional[str] = None, country: Opti
     }
 
 
-fake = Faker()
+def generate_random_user_data(platform_uuid: Optional[str] = None, country: Optional[str] = None) -> Dict[str, str]:
+    """We don't want to store this in the db, it's a lot of useless information... So don't actually add it to the
+    cache!
+
+    :param platform_uuid:
+    :param country:
+    :return:
+    """
+    if platform_uuid is None:
+        platform_uuid = generate_id()
+
+    return _generate_user_data(platform_uuid, country, rng=random, text_rng=None)
+
+
+@lru_cache(maxsize=USER_DATA_CACHE_SIZE)
+def _get_cached_user_data_for_platform_uuid(platform_uuid: str, country: Optional[str]) -> Dict[str, str]:
+    rng = random.Random(platform_uuid)
+
+    # Always draw the country, so that passing in the user's own country yields the exact same data
+    drawn_country = rng.choice(LOCATION_COUNTRIES)
+    return _generate_user_data(platform_uuid, country or drawn_country, rng=rng, text_rng=rng)
+
+
+def get_user_data_for_platform_uuid(platform_uuid: str, country: Optional[str] = None) -> Dict[str, str]:
+    """Returns demographic data that is always the same for a given user, so it never has to be stored or regenerated
+
+    :param platform_uuid: The user to get the data for, which seeds the data
+    :param country: The country to place the user in, drawn from the platform uuid if not set
+    :return: A copy of the cached data, so callers can update it freely
+    """
+    return _get_cached_user_data_for_platform_uuid(platform_uuid, country).copy()
+
+
+def get_logged_user_data(user_data: Dict[str, str]) -> Dict[str, str]:
+    return dict([(name, user_data[name]) for name in LOGGED_USER_DATA_NAMES])
@@ -7,7 +7,7 @@ import logging
 from typing import Dict, List, Tuple
 
 from synthetic.conf import global_conf
-from synthetic.utils.time_utils import datetime_from_payload_str
+from synthetic.utils.time_utils import datetime_from_payload_str, payload_strs_to_epoch_microseconds
 
 logger = logging.getLogger(__name__)
 
@@ -144,7 +144,14 @@ def validate_generated_data(log_data: List[Dict], catalog_data: List[Dict], plot
     all_profile_names_set = set()
     logs_per_user: Dict[str, List[Dict]] = {}
     types_per_day: Dict[date, Dict[str, List[Dict]]] = {}
-    for log_row in log_data:
+    # All timestamps are parsed in one go rather than row by row
+    log_dates: List[date] = (
+        payload_strs_to_epoch_microseconds([log_row["ts"] for log_row in log_data])
+        .astype("datetime64[us]")
+        .astype("datetime64[D]")
+        .tolist()
+    )
+    for log_row, dt_date in zip(log_data, log_dates):
         user_id = log_row["u_id"]
         if user_id not in logs_per_user:
             logs_per_user[user_id] = []
@@ -152,8 +159,6 @@ def validate_generated_data(log_data: List[Dict], catalog_data: List[Dict], plot
 
         profile_name = user_id.split('-')[0]
         all_profile_names_set.add(profile_name)
-        dt = dt_from_log(log_row)
-        dt_date = dt.date()
         if dt_date not in types_per_day:
             types_per_day[dt_date] = {}
         if profile_name not in types_per_day[dt_date]:
@@ -163,7 +168,7 @@ def validate_generated_data(log_data: List[Dict], catalog_data: List[Dict], plot
 
     logger.info("%s users seen in logs", len(logs_per_user))
 
-    all_dates = sorted(list(set([dt_from_log(log).date() for log in log_data])))
+    all_dates = sorted(list(set(log_dates)))
     all_plot_dates = [all_dates[0]]
     current_date = all_dates[0]
     while current_date <= all_dates[-1]:
@@ -1,6 +1,5 @@
 import os
 import random
-import uuid
 
 import pytest
 from sqlalchemy import create_engine
@@ -15,15 +14,7 @@ from synthetic.catalog.cache import CatalogCache
 @pytest.fixture()
 def fixed_seed():
     random.seed(0)
-
-    old_uuid4 = uuid.uuid4
-    rd = random.Random()
-    rd.seed(0)
-    uuid.uuid4 = lambda: uuid.UUID(int=rd.getrandbits(128))
-
-    yield
-
-    uuid.uuid4 = old_uuid4
+    global_conf.deterministic_id_seed = 0
 
 
 @pytest.fixture(autouse=True)
@@ -12,7 +12,7 @@ from datetime import datetime, timedelta, date
 from mock import mock
 
 from synthetic.catalog.cache import CatalogCache
-from synthetic.constants import CatalogType
+from synthetic.constants import CatalogType, SECONDS_IN_DAY
 from synthetic.conf import CatalogConfig, EngagementConfig, PopulationConfig, ProfileConfig, global_conf, NudgeConfig
 from synthetic.database.schemas import SyntheticUserSchema, CatalogEntrySchema
 from synthetic.driver.driver import Driver
@@ -26,9 +26,11 @@ from synthetic.event.log.general.rate import RateEvent
 from synthetic.event.log.loyalty.promo import PromoEvent, PromoAction
 from synthetic.event.log.nudge.nudge_response import NudgeResponseEvent
 from synthetic.event.log.payment.payment_method import PaymentMethodEvent
+from synthetic.event.meta.profile_data_update_event import ProfileDataUpdateEvent
 from synthetic.event.meta.receive_nudge import ReceiveNudges
 from synthetic.user.constants import SyntheticUserType
 from synthetic.utils.database import create_db_session
+from synthetic.utils.id_generator import generate_id
 from synthetic.user.factory import load_users_from_db
 from synthetic.utils.nudge_utils import Nudge
 from synthetic.utils.test_utils import assert_dicts_equal_partial, assert_events_have_correct_schema
@@ -237,6 +239,116 @@ def test_resumed_events_memory():
         assert len(user.get_profile_data()["active_dates"]) <= 3
 
 
+def test_resumed_seeded_ids():
+    global_conf.deterministic_id_seed = 0
+    global_conf.end_ts = datetime(2000, 1, 3, 0, 0, 0)
+    Driver().run()
+
+    db_session = create_db_session()
+    stored_ids = set([user.platform_uuid for user in db_session.query(SyntheticUserSchema).all()])
+    stored_ids.update([catalog.platform_uuid for catalog in db_session.query(CatalogEntrySchema).all()])
+    assert len(stored_ids) > 1
+
+    # A new process loads the configuration again, which starts the seeded ids over, so the resumed driver skips the
+    # ids the first run handed out
+    global_conf.bump_revision()
+    global_conf.end_ts = datetime(2000, 1, 5, 0, 0, 0)
+    resumed_driver = Driver()
+    resumed_driver.initialize_from_db()
+    assert set([generate_id() for _ in range(0, 10)]).isdisjoint(stored_ids)
+
+
+def test_resumed_engagement_steps_per_day():
+    global_conf.profiles["boring_guy"].session_engagement = EngagementConfig(
+        change_probability=1.0,
+        initial_min=1.0,
+        initial_max=1.0,
+        boost_probability=0.0,
+        decay_probability=1.0,
+        change_min=0.05,
+        change_max=0.05,
+    )
+
+    first_end_ts = datetime(2000, 1, 3, 0, 0, 0)
+    global_conf.end_ts = first_end_ts
+    driver = Driver(clear_cache_after_flush=False)
+    driver.run()
+
+    engagement_data = driver.get_active_users()[0].get_profile_data()["managers"]["session_engagement"].copy()
+
+    # A single step of the resumed run covers ten days, each of which still gets its own engagement level
+    global_conf.end_ts = first_end_ts + timedelta(days=10)
+    resumed_driver = Driver(clear_cache_after_flush=False, time_increment_interval_seconds=10 * SECONDS_IN_DAY)
+    resumed_driver.run()
+
+    levels_by_ts = {}
+    for event in resumed_driver.get_cached_meta_events():
+        if not isinstance(event, ProfileDataUpdateEvent):
+            continue
+
+        writes = {}
+        event.update.add_to_writes(writes)
+        if ("managers", "session_engagement", "engagement_level") in writes:
+            levels_by_ts[event.ts] = writes[("managers", "session_engagement", "engagement_level")]
+
+    resumed_ts = datetime.fromtimestamp(engagement_data["last_seen_ts"])
+    step_count = round((global_conf.end_ts - resumed_ts).total_seconds() / SECONDS_IN_DAY)
+    assert step_count >= 10
+    assert sorted(levels_by_ts.keys())[:step_count] == [
+        resumed_ts + timedelta(days=day_count) for day_count in range(1, step_count + 1)
+    ]
+    for day_count in range(1, step_count + 1):
+        assert levels_by_ts[resumed_ts + timedelta(days=day_count)] == pytest.approx(
+            engagement_data["engagement_level"] - 0.05 * day_count
+        )
+
+
+def get_manager_update_count(events: List[ProfileDataUpdateEvent]) -> int:
+    update_count = 0
+    for event in events:
+        if not isinstance(event, ProfileDataUpdateEvent):
+            continue
+
+        writes = {}
+        event.update.add_to_writes(writes)
+        if ("managers", "session_engagement", "engagement_level") in writes:
+            update_count += 1
+
+    return update_count
+
+
+def test_resumed_coalesced_manager_updates():
+    global_conf.population = PopulationConfig(initial_count=3, target_max_count=3, target_min_count=3)
+    global_conf.profiles["boring_guy"].session_engagement = EngagementConfig(
+        change_probability=1.0,
+        initial_min=1.0,
+        initial_max=1.0,
+        boost_probability=0.0,
+        decay_probability=1.0,
+        change_min=0.005,
+        change_max=0.005,
+    )
+    global_conf.coalesce_manager_updates = True
+
+    first_end_ts = datetime(2000, 1, 3, 0, 0, 0)
+    global_conf.end_ts = first_end_ts
+    Driver(clear_cache_after_flush=False).run()
+
+    # The sixty days of the resumed run are caught up on at once, so each manager emits its checkpoints and the update
+    # of the last day instead of sixty updates
+    global_conf.end_ts = first_end_ts + timedelta(days=60)
+    resumed_driver = Driver(clear_cache_after_flush=False, time_increment_interval_seconds=SECONDS_IN_DAY)
+    resumed_driver.run()
+
+    resumed_users = resumed_driver.get_active_users()
+    assert len(resumed_users) == 3
+    assert get_manager_update_count(resumed_driver.get_cached_meta_events()) == 3 * 4
+    for user in resumed_users:
+        engagement_data = user.get_profile_data()["managers"]["session_engagement"]
+        assert engagement_data["last_seen_ts"] == global_conf.end_ts.timestamp()
+        assert engagement_data["engagement_level"] == pytest.approx(1.0 - 0.005 * 62)
+
+
 def test_normal_resurrection_memory():
     global_conf.profiles["boring_guy"].session_engagement = EngagementConfig(
         initial_min=1.0,
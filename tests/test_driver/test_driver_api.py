@@ -18,6 +18,7 @@ from synthetic.event.catalog.user_catalog import UserCatalogEvent
 from synthetic.event.event_collection import EventCollection
 from synthetic.event.log.general.page import PageEvent
 from synthetic.user.session_engagement_user import SessionEngagementUser
+from synthetic.utils.random import get_random_int_in_range
 from synthetic.utils.test_utils import assert_events_have_correct_schema
 
 
@@ -230,3 +231,14 @@ def test_send_drug_catalog_event(mocker, synthetic_user, last_seen_ts):
         data=json.dumps(expected_call_data),
         headers={'Authorization': 'Bearer test key', 'Content-Type': 'application/json'},
     )
+
+
+def test_new_driver_follows_random_seed():
+    random.seed(1)
+    Driver()
+    drawn_ints = [get_random_int_in_range(0, 1000) for _ in range(0, 100)]
+
+    # Values drawn ahead of time by the first driver's run don't leak into the next one
+    random.seed(1)
+    Driver()
+    assert [get_random_int_in_range(0, 1000) for _ in range(0, 100)] == drawn_ints
@@ -1,3 +1,4 @@
+import pickle
 import random
 import pytest
 
@@ -8,7 +9,7 @@ from synthetic.conf import EngagementConfig, ProfileConfig, global_conf
 from synthetic.constants import ProductUserType
 from synthetic.event.constants import EventType
 from synthetic.event.log.general.rate import RateEvent
-from synthetic.event.log.navigation.app import AppEvent
+from synthetic.event.log.navigation.app import AppAction, AppEvent
 from synthetic.user.session_engagement_user import SessionEngagementUser
 from synthetic.utils.test_utils import assert_events_have_correct_schema
 
@@ -64,3 +65,25 @@ def test_single_session_with_app(db_session, registration_ts, mobile_user):
 
     rate_events = [event for event in log_events if isinstance(event, RateEvent)]
     assert len(rate_events) > 0
+
+
+def test_log_events_are_compact(registration_ts, mobile_user):
+    events = [
+        AppEvent(mobile_user, registration_ts + timedelta(seconds=offset), True, AppAction.OPEN)
+        for offset in range(0, 2)
+    ]
+
+    for event in events:
+        assert not hasattr(event, "__dict__")
+        assert event.user is mobile_user.get_event_reference()
+        assert event.device_id == mobile_user.get_current_device_id()
+        assert event.as_payload_dict()["u_id"] == mobile_user.get_platform_uuid()
+    assert events[0].event_type is events[1].event_type
+
+    # Forcing another device only affects later events
+    mobile_user.set_device_id("other-device")
+    assert AppEvent(mobile_user, registration_ts, True, AppAction.CLOSE).device_id == "other-device"
+    assert events[0].device_id != "other-device"
+
+    restored_event = pickle.loads(pickle.dumps(events[0]))
+    assert restored_event.as_payload_dict() == events[0].as_payload_dict()
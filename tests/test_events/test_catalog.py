@@ -1,7 +1,15 @@
+import os
 from datetime import datetime
 
+from mock import mock
+
+from synthetic.catalog.cache import CatalogCache, clean_promo_catalogs
+from synthetic.catalog.snapshot import SnapshotCatalogs, get_catalog_snapshot_filename
 from synthetic.catalog.generator import create_random_catalog_events_for_type
+from synthetic.conf import CatalogConfig, global_conf
 from synthetic.constants import CatalogType
+from synthetic.utils.database import populate_catalog_to_count_in_db
+from synthetic.event.log.commerce.constants import ItemType
 from synthetic.utils.test_utils import assert_dicts_equal_partial
 
 
@@ -19,3 +27,109 @@ def test_media_catalog(fixed_seed):
             'lang': 'en',
         },
     )
+
+
+def test_catalogs_by_properties_index_tracks_changes():
+    for index in range(0, 6):
+        CatalogCache.add_catalog_for_uuid(
+            CatalogType.QUESTION, str(index), {"uuid": str(index), "exam_uuid": "exam_%s" % (index % 2,)}
+        )
+
+    matches = CatalogCache.get_catalogs_by_properties(CatalogType.QUESTION, {"exam_uuid": "exam_0"})
+    assert [match["uuid"] for match in matches] == ["0", "2", "4"]
+
+    CatalogCache.add_catalog_for_uuid(CatalogType.QUESTION, "6", {"uuid": "6", "exam_uuid": "exam_0"})
+    CatalogCache.add_catalog_for_uuid(CatalogType.QUESTION, "2", {"uuid": "2", "exam_uuid": "exam_1"})
+    CatalogCache.remove_catalog_for_uuid(CatalogType.QUESTION, "4")
+
+    matches = CatalogCache.get_catalogs_by_properties(CatalogType.QUESTION, {"exam_uuid": "exam_0"})
+    assert [match["uuid"] for match in matches] == ["0", "6"]
+
+    matches = CatalogCache.get_catalogs_by_properties(CatalogType.QUESTION, {"exam_uuid": "exam_1", "uuid": "2"})
+    assert [match["uuid"] for match in matches] == ["2"]
+
+
+def test_current_promotions_follow_added_and_expired_promotions():
+    CatalogCache.update_current_promotions()
+    for index, end_day in enumerate([3, 2, 5]):
+        promo_uuid = "promo_%s" % (index,)
+        CatalogCache.add_catalog_for_uuid(
+            CatalogType.PROMO,
+            promo_uuid,
+            {
+                "uuid": promo_uuid,
+                "cost_adjustment_ratio": 0.5,
+                "promoted_item_uuids": ["drug_0", "drug_%s" % (index + 1,)],
+                "promoted_item_types": [ItemType.DRUG.value, ItemType.DRUG.value],
+                "start_timestamp": datetime(2001, 1, 1).timestamp(),
+                "end_timestamp": datetime(2001, 1, end_day).timestamp(),
+            },
+        )
+
+    drug_promotions = CatalogCache.current_promotions[ItemType.DRUG]
+    assert [promo[0] for promo in drug_promotions["drug_0"]] == ["promo_0", "promo_1", "promo_2"]
+
+    clean_promo_catalogs(datetime(2001, 1, 4))
+
+    assert list(CatalogCache.cached_catalog[CatalogType.PROMO].keys()) == ["promo_2"]
+    assert [promo[0] for promo in drug_promotions["drug_0"]] == ["promo_2"]
+    assert sorted(drug_promotions.keys()) == ["drug_0", "drug_3"]
+
+    CatalogCache.update_current_promotions()
+    assert CatalogCache.current_promotions == {ItemType.DRUG: drug_promotions}
+
+
+def test_generated_catalogs_cached_like_stored_catalogs(db_session, driver_meta):
+    for catalog_type in [CatalogType.DRUG, CatalogType.MEDIA_VIDEO, CatalogType.EXAM]:
+        global_conf.catalogs[catalog_type] = CatalogConfig(target_count=5)
+
+    CatalogCache.warm_up(db_session, driver_meta_id=driver_meta.id)
+    generated_catalogs = dict(CatalogCache.cached_catalog)
+    assert len(generated_catalogs[CatalogType.DRUG]) == 5
+    assert len(generated_catalogs[CatalogType.QUESTION]) > 0
+
+    CatalogCache.warm_up(db_session, driver_meta_id=driver_meta.id)
+    assert CatalogCache.cached_catalog == generated_catalogs
+
+
+def warm_up_and_get_populated_types(db_session, driver_meta_id: int):
+    with mock.patch(
+        "synthetic.catalog.cache.populate_catalog_to_count_in_db", wraps=populate_catalog_to_count_in_db
+    ) as populate_mock:
+        CatalogCache.warm_up(db_session, driver_meta_id=driver_meta_id)
+
+    return [call.kwargs["catalog_type"] for call in populate_mock.call_args_list]
+
+
+def test_catalog_snapshot_used_until_stale(db_session, driver_meta, temp_dir):
+    global_conf.catalog_snapshot_dirname = os.path.join(temp_dir, "snapshots")
+    snapshot_filename = get_catalog_snapshot_filename(global_conf.catalog_snapshot_dirname, driver_meta.id)
+    if os.path.exists(snapshot_filename):
+        os.remove(snapshot_filename)
+
+    for catalog_type in [CatalogType.DRUG, CatalogType.MEDIA_VIDEO, CatalogType.EXAM]:
+        global_conf.catalogs[catalog_type] = CatalogConfig(target_count=5)
+
+    CatalogCache.warm_up(db_session, driver_meta_id=driver_meta.id)
+    generated_catalogs = dict(CatalogCache.cached_catalog)
+    assert os.path.exists(snapshot_filename)
+
+    assert warm_up_and_get_populated_types(db_session, driver_meta.id) == [CatalogType.PROMO]
+
+    # Catalogs loaded from the snapshot are only decoded once they are drawn
+    snapshot_drugs = CatalogCache.cached_catalog[CatalogType.DRUG]
+    assert isinstance(snapshot_drugs, SnapshotCatalogs)
+    assert snapshot_drugs.get_decoded_count() == 0
+    drawn_drugs = CatalogCache.get_random_unique_catalogs_for_type(CatalogType.DRUG, 2)
+    assert snapshot_drugs.get_decoded_count() == 2
+    assert [generated_catalogs[CatalogType.DRUG][drug["uuid"]] for drug in drawn_drugs] == drawn_drugs
+
+    assert CatalogCache.cached_catalog == generated_catalogs
+
+    # Growing a catalog makes the snapshot stale for that type only
+    global_conf.catalogs[CatalogType.DRUG] = CatalogConfig(target_count=6)
+    assert warm_up_and_get_populated_types(db_session, driver_meta.id) == [CatalogType.DRUG, CatalogType.PROMO]
+    assert len(CatalogCache.cached_catalog[CatalogType.DRUG]) == 6
+
+    assert warm_up_and_get_populated_types(db_session, driver_meta.id) == [CatalogType.PROMO]
+    assert len(CatalogCache.cached_catalog[CatalogType.DRUG]) == 6
@@ -0,0 +1,170 @@
+import pytest
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from synthetic.conf import ProfileConfig, global_conf
+from synthetic.constants import BlockType
+from synthetic.event.event_batch import EventBatch, SessionEventColumns
+from synthetic.event.event_collection import EventCollection
+from synthetic.event.log.commerce.checkout import CheckoutEvent
+from synthetic.event.log.commerce.constants import ShopItem, ItemType
+from synthetic.event.log.log_base import LogEvent
+from synthetic.event.log.navigation.app import AppAction, AppEvent, build_app_props
+from synthetic.event.log.serialiser import encode_log_events_json
+from synthetic.sink.csv_flush_sink import CSVFlushSink
+from synthetic.user.session_engagement_user import SessionEngagementUser
+from synthetic.utils.time_utils import datetime_to_epoch_microseconds
+
+
+@pytest.fixture(autouse=True)
+def configure_profiles():
+    global_conf.profiles = {"random_guy": ProfileConfig()}
+
+
+@pytest.fixture
+def registration_ts():
+    return datetime(2000, 1, 1, 0, 0, 0)
+
+
+@pytest.fixture
+def batch_users(driver_meta, registration_ts):
+    return [
+        SessionEngagementUser.create_random_user(driver_meta.id, registration_ts, profile_name="random_guy")
+        for _ in range(0, 2)
+    ]
+
+
+@pytest.fixture
+def batch_events(batch_users, registration_ts):
+    return [
+        AppEvent(batch_users[0], registration_ts + timedelta(microseconds=1), True, AppAction.OPEN),
+        CheckoutEvent(
+            batch_users[1],
+            registration_ts + timedelta(seconds=10),
+            online=False,
+            order_id="order_id",
+            total_price=246.0,
+            order=[ShopItem(id="item", item_type=ItemType.DRUG, item_price=123.0, quantity=2)],
+            is_urgent=True,
+        ),
+        AppEvent(batch_users[0], registration_ts + timedelta(seconds=20), True, AppAction.CLOSE),
+    ]
+
+
+def test_event_batch_round_trip(batch_events):
+    batch = EventBatch.from_events(batch_events)
+    assert len(batch) == 3
+    assert len(batch.users) == 2
+
+    assert batch.as_payload_dicts() == [event.as_payload_dict() for event in batch_events]
+    assert batch.encode_json() == encode_log_events_json(batch_events)
+    assert batch.encode_json(1, 3) == encode_log_events_json(batch_events[1:3])
+
+    restored_events = batch.to_events()
+    for event, restored_event in zip(batch_events, restored_events):
+        assert type(restored_event) is type(event)
+        assert restored_event.ts == event.ts
+        assert restored_event.as_payload_dict() == event.as_payload_dict()
+    assert restored_events[1]._is_urgent
+    assert restored_events[1]._order == batch_events[1]._order
+
+
+def test_event_batch_append(batch_users, registration_ts):
+    batch = EventBatch()
+    batch.append(
+        batch_users[0], datetime_to_epoch_microseconds(registration_ts), True, "page", {"block": BlockType.CORE}
+    )
+
+    events = batch.to_events()
+    assert type(events[0]) is LogEvent
+    assert events[0].ts == registration_ts
+    assert events[0].as_payload_dict()["props"] == {"block": "core"}
+
+
+def test_csv_sink_writes_batches_like_events(tmp_path, batch_events):
+    global_conf.filter_log_events_for_csv = False
+
+    output_filenames = []
+    for flush_batch in [False, True]:
+        global_conf.log_events_filename = str(tmp_path / ("logs_%s.csv" % (flush_batch,)))
+        output_filenames.append(global_conf.log_events_filename)
+
+        sink = CSVFlushSink()
+        if flush_batch:
+            sink.flush_event_batch(EventBatch.from_events(batch_events))
+        else:
+            sink.flush_log_events(batch_events)
+
+    with open(output_filenames[0], "r") as event_file, open(output_filenames[1], "r") as batch_file:
+        assert event_file.read() == batch_file.read()
+
+
+def test_event_batch_collection_schedule(batch_users, batch_events, registration_ts):
+    later_batch = EventBatch()
+    later_batch.append(
+        batch_users[1], datetime_to_epoch_microseconds(registration_ts + timedelta(seconds=15)), True, "page", {}
+    )
+    later_batch.append(
+        batch_users[0], datetime_to_epoch_microseconds(registration_ts + timedelta(seconds=5)), True, "page", {}
+    )
+
+    schedule = EventCollection(log_batch=EventBatch.from_events(batch_events))
+    schedule.insert_events(EventCollection(log_batch=later_batch))
+    assert len(schedule.log_batch.users) == 2
+    assert schedule.get_latest_ts() == registration_ts + timedelta(seconds=20)
+
+    popped_events = schedule.pop_events_before(registration_ts + timedelta(seconds=15))
+    assert [event.ts for event in popped_events.log_batch.to_events()] == [
+        registration_ts + timedelta(microseconds=1),
+        registration_ts + timedelta(seconds=5),
+        registration_ts + timedelta(seconds=10),
+    ]
+    assert [event.user for event in popped_events.log_batch.to_events()] == [
+        batch_events[0].user,
+        batch_events[0].user,
+        batch_events[1].user,
+    ]
+    assert [event.ts for event in schedule.log_batch.to_events()] == [
+        registration_ts + timedelta(seconds=15),
+        registration_ts + timedelta(seconds=20),
+    ]
+
+
+def test_session_event_columns(batch_users, registration_ts):
+    columns = SessionEventColumns()
+    columns.add(
+        np.array([1, 0]),
+        np.array([20.0, 10.0]),
+        "app",
+        [build_app_props(AppAction.OPEN), build_app_props(AppAction.CLOSE)],
+        event_class=AppEvent,
+    )
+    columns.add(np.array([0]), np.array([5.0]), "page", [{}], online=True)
+
+    batch = EventBatch()
+    session_user_indices = batch.add_users([batch_users[0].get_event_reference(), batch_users[1].get_event_reference()])
+    assert columns.append_to(batch, registration_ts, session_user_indices, np.array([False, True])).tolist() == [
+        1,
+        0,
+        0,
+    ]
+
+    # Events gathered in columns serialise like the events their constructors create
+    expected_events = [
+        AppEvent(batch_users[1], registration_ts + timedelta(seconds=20), True, AppAction.OPEN),
+        AppEvent(batch_users[0], registration_ts + timedelta(seconds=10), False, AppAction.CLOSE),
+        LogEvent(batch_users[0], registration_ts + timedelta(seconds=5), True, "page", {}),
+    ]
+    for event, expected_event in zip(batch.to_events(), expected_events):
+        assert type(event) is type(expected_event)
+        payload_dict = event.as_payload_dict()
+        expected_payload_dict = expected_event.as_payload_dict()
+        for field in ["u_id", "d_id", "ol", "ts", "type", "block", "props"]:
+            assert payload_dict[field] == expected_payload_dict[field], field
+
+    sorted_batch = batch.sorted_by_timestamp()
+    assert [event.ts for event in sorted_batch.to_events()] == [
+        registration_ts + timedelta(seconds=seconds) for seconds in [5, 10, 20]
+    ]
@@ -82,7 +82,7 @@ def test_single_module_completed(db_session, driver_meta, registration_ts, modul
 
     milestone_events = [event for event in log_events if event.event_type == "milestone"]
     assert len(milestone_events) > 0
-    assert len(module_user.get_profile_data()["milestone_achieved_uuids"]) == len(milestone_events)
+    assert len(module_user.milestone_achieved_uuids) == len(milestone_events)
 
     level_events = [event for event in log_events if event.event_type == "level"]
     assert len(level_events) == len(milestone_events)
@@ -7,6 +7,7 @@ from synthetic.catalog.cache import CatalogCache
 from synthetic.conf import EngagementConfig, ProfileConfig, global_conf, EventConfig
 from synthetic.event.catalog.user_catalog import UserCatalogEvent
 from synthetic.event.constants import EventType
+from synthetic.event.log.generator import generate_event_logs_for_periods
 from synthetic.event.log.navigation.identify import IdentifyEvent
 from synthetic.event.log.general.page import PageEvent
 from synthetic.user.session_engagement_user import SessionEngagementUser
@@ -116,3 +117,32 @@ def test_manage_schedule_end_ts(db_session, registration_ts, page_user):
     max_schedule_event = max([log_event.ts for log_event in page_user.get_scheduled_events().log_events])
     assert max_schedule_event > end_ts
     assert max_schedule_event <= page_user.get_schedule_end_ts()
+
+
+def test_page_events_for_periods(db_session, registration_ts, page_user):
+    global_conf.profiles["page_guy"].events[EventType.PAGE].properties["page_count_per_session_min"] = 3
+
+    random.seed(0)
+    CatalogCache.warm_up(db_session)
+
+    period_timestamps = [registration_ts + timedelta(seconds=1000 * period_index) for period_index in range(0, 4)]
+    event_types = [EventType.PAGE, EventType.VIDEO, EventType.PAGE, EventType.PAGE]
+    events = generate_event_logs_for_periods(page_user, period_timestamps, event_types, online=True)
+    assert_events_have_correct_schema(events)
+
+    # Pages are generated in one batch and videos one period at a time, but the events keep the order of the periods
+    assert [event.ts for event in events] == sorted([event.ts for event in events])
+    assert events[0].ts == registration_ts + timedelta(seconds=60)
+
+    page_events = [event for event in events if isinstance(event, PageEvent)]
+    assert len(page_events) == 9
+    for period_timestamp in [period_timestamps[0], period_timestamps[2], period_timestamps[3]]:
+        period_page_events = [
+            event for event in page_events if period_timestamp < event.ts < period_timestamp + timedelta(seconds=1000)
+        ]
+        assert [event.ts - period_timestamp for event in period_page_events] == [
+            timedelta(seconds=60 * (page_index + 1)) for page_index in range(0, 3)
+        ]
+        assert len(set([event.props["path"] for event in period_page_events])) == 3
+
+    assert len([event for event in events if not isinstance(event, PageEvent)]) > 0
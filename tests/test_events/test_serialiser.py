@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from copy import deepcopy
+from datetime import datetime, timedelta
+
+import pytest
+
+from synthetic.conf import ProfileConfig, global_conf
+from synthetic.constants import BlockType
+from synthetic.event.log.commerce.checkout import CheckoutEvent
+from synthetic.event.log.commerce.constants import ShopItem, ItemType
+from synthetic.event.log.commerce.schedule_delivery import ScheduleDeliveryAction, ScheduleDeliveryEvent
+from synthetic.event.log.log_base import LogEvent
+from synthetic.event.log.navigation.app import AppAction, AppEvent
+from synthetic.event.log.serialiser import encode_log_events_json, write_log_events_csv_rows
+from synthetic.user.session_engagement_user import SessionEngagementUser
+from synthetic.utils.data_utils import prepare_data_for_db
+from synthetic.utils.time_utils import datetime_to_payload_str
+
+
+@pytest.fixture(autouse=True)
+def configure_profiles():
+    global_conf.profiles = {"random_guy": ProfileConfig()}
+
+
+@pytest.fixture
+def serialised_events(driver_meta):
+    registration_ts = datetime(2000, 1, 1, 0, 0, 0)
+    user = SessionEngagementUser.create_random_user(driver_meta.id, registration_ts, profile_name="random_guy")
+    return [
+        AppEvent(user, registration_ts, False, AppAction.OPEN),
+        CheckoutEvent(
+            user,
+            registration_ts + timedelta(seconds=1, microseconds=5),
+            online=True,
+            order_id="order_id",
+            total_price=246.0,
+            order=[ShopItem(id="item", item_type=ItemType.DRUG, item_price=123.0, quantity=2)],
+            is_urgent=True,
+        ),
+        ScheduleDeliveryEvent(
+            user,
+            registration_ts + timedelta(seconds=2),
+            online=True,
+            order_id="order_id",
+            is_urgent=False,
+            action=ScheduleDeliveryAction.SCHEDULE,
+            delivery_ts=registration_ts + timedelta(days=1),
+        ),
+        LogEvent(
+            user,
+            registration_ts + timedelta(seconds=3),
+            True,
+            "custom",
+            {"nested": {"block": BlockType.LOYALTY, "label": "quoted \"label\""}, "count": 3},
+        ),
+    ]
+
+
+def build_legacy_payload_dict(event: LogEvent):
+    return {
+        "u_id": event.user.get_platform_uuid(),
+        "d_id": event.device_id,
+        "os": "android",
+        "ol": event.online,
+        "ts": datetime_to_payload_str(event.ts),
+        "type": event.event_type,
+        "ip": "0.0.0.0",
+        "up": event._up,
+        "dn": event._dn,
+        "block": event.block.value,
+        "props": prepare_data_for_db(deepcopy(event.props)),
+    }
+
+
+def test_serialisers_keep_the_wire_format(serialised_events):
+    legacy_payload_dicts = [build_legacy_payload_dict(event) for event in serialised_events]
+
+    assert [event.as_payload_dict() for event in serialised_events] == legacy_payload_dicts
+    assert encode_log_events_json(serialised_events) == json.dumps(legacy_payload_dicts)
+
+    legacy_csv_file = io.StringIO()
+    writer = csv.DictWriter(legacy_csv_file, list(legacy_payload_dicts[0].keys()))
+    writer.writeheader()
+    for payload_dict in legacy_payload_dicts:
+        writer.writerow(payload_dict)
+
+    csv_file = io.StringIO()
+    write_log_events_csv_rows(serialised_events, csv_file, write_header=True)
+    assert csv_file.getvalue() == legacy_csv_file.getvalue()
+
+    # Serialising leaves the props of the events alone
+    assert serialised_events[-1].props["nested"]["block"] == BlockType.LOYALTY
@@ -1,7 +1,14 @@
+import random
 from datetime import datetime, timedelta
+
+import mock
+import pytest
+
 from synthetic.conf import EngagementConfig, global_conf
-from synthetic.managers.engagement import EngagementManager
+from synthetic.managers.engagement import EngagementManager, EngagementSteps
 from synthetic.managers.managed_object import ManagedObject
+from synthetic.utils.event_utils import generate_engagement_delta
+from synthetic.utils.random import buffered_random
 
 
 def test_basic_limits():
@@ -124,3 +131,93 @@ def test_basic_limits():
 
     # pyplot.legend()
     # pyplot.show()
+
+
+def test_engagement_steps_match_scalar_deltas():
+    config = EngagementConfig(
+        change_probability=0.5,
+        boost_probability=0.4,
+        decay_probability=0.6,
+        change_min=0.02,
+        change_max=0.1,
+    )
+
+    random.seed(0)
+    scalar_deltas = [generate_engagement_delta(config) for _ in range(0, 10000)]
+    engagement_steps = EngagementSteps(block_size=1000)
+    pooled_deltas = [engagement_steps.next_delta(config) for _ in range(0, 10000)]
+
+    for deltas in [scalar_deltas, pooled_deltas]:
+        assert all([delta == 0.0 or 0.02 <= abs(delta) <= 0.1 for delta in deltas])
+    assert abs(len([d for d in pooled_deltas if d == 0.0]) - len([d for d in scalar_deltas if d == 0.0])) < 300
+    assert abs(len([d for d in pooled_deltas if d > 0.0]) - len([d for d in scalar_deltas if d > 0.0])) < 300
+    assert abs(sum(pooled_deltas) - sum(scalar_deltas)) / 10000 < 0.005
+
+    # Configs with the same walk parameters share their steps, which are dropped along with buffered_random's blocks
+    same_config = EngagementConfig(**config.__dict__)
+    random.seed(1)
+    buffered_random.reset()
+    deltas = [engagement_steps.next_delta(config if index % 2 == 0 else same_config) for index in range(0, 10)]
+    random.seed(1)
+    buffered_random.reset()
+    assert [engagement_steps.next_delta(config) for _ in range(0, 10)] == deltas
+
+
+def test_engagement_steps_applied_per_day():
+    start_ts = datetime(2000, 1, 1)
+    config = EngagementConfig(
+        initial_min=0.5,
+        initial_max=0.5,
+        change_probability=1.0,
+        boost_probability=0.0,
+        decay_probability=1.0,
+        change_min=0.01,
+        change_max=0.01,
+    )
+    manager = EngagementManager(stored_data={}, config=config, variable_name="engagement", initial_ts=start_ts)
+    manager.initialize()
+
+    updates = manager.update(start_ts + timedelta(days=20))
+    assert len(updates) == 20
+    for day_count in range(1, 21):
+        profile_data = {}
+        updates[start_ts + timedelta(days=day_count)].apply_to_user(mock.Mock(get_profile_data=lambda: profile_data))
+        assert profile_data["managers"]["engagement"]["engagement_level"] == pytest.approx(0.5 - 0.01 * day_count)
+
+
+def test_advance_with_checkpoints():
+    start_ts = datetime(2000, 1, 1)
+    config = EngagementConfig(
+        initial_min=0.5,
+        initial_max=0.5,
+        change_probability=0.5,
+        boost_probability=0.5,
+        decay_probability=0.5,
+        change_min=0.01,
+        change_max=0.02,
+    )
+    manager = EngagementManager(stored_data={}, config=config, variable_name="engagement", initial_ts=start_ts)
+    manager.initialize()
+
+    end_ts = start_ts + timedelta(days=100, hours=12)
+    assert manager.get_pending_step_count(end_ts) == 100
+
+    updates = manager.advance(end_ts, checkpoint_step_count=30)
+    assert list(updates.keys()) == [start_ts + timedelta(days=day_count) for day_count in [30, 60, 90, 99, 100]]
+    assert manager.get_pending_step_count(end_ts) == 0
+    assert manager.data["last_seen_ts"] == (start_ts + timedelta(days=100)).timestamp()
+    assert manager.advance(end_ts) is None
+
+    profile_data = {}
+    updates[start_ts + timedelta(days=100)].apply_to_user(mock.Mock(get_profile_data=lambda: profile_data))
+    assert profile_data["managers"]["engagement"] == manager.data
+
+    # Lagging managers of a managed object are coalesced when enabled, up to date ones still update per increment
+    managed_object = ManagedObject()
+    managed_object.add_manager(manager)
+    with mock.patch.object(global_conf, "coalesce_manager_updates", True):
+        assert len(managed_object.update_managers(end_ts + timedelta(days=1))) == 1
+
+        with mock.patch.object(global_conf, "manager_checkpoint_step_count", None):
+            assert len(managed_object.update_managers(end_ts + timedelta(days=50))) == 2
+    assert len(managed_object.update_managers(end_ts + timedelta(days=60))) == 10
@@ -0,0 +1,36 @@
+import pickle
+
+from synthetic.user.profile_data_overlay import ProfileDataOverlay
+from synthetic.user.profile_data_update import set_variable_in_path
+
+
+def test_overlay_writes_do_not_reach_profile_data():
+    profile_data = {
+        "profile_name": "some_guy",
+        "item_interests": {"drug": {"a": 1.0}},
+        "active_dates": ["2000-01-01"],
+        "untouched": {"b": 2.0},
+    }
+
+    overlay = ProfileDataOverlay(profile_data)
+    overlay["item_interests"]["drug"]["a"] = 0.5
+    overlay["active_dates"].append("2000-01-02")
+    overlay.setdefault("level_score", {})["core"] = 1.0
+    set_variable_in_path(overlay, "managers/engagement/last_seen_ts", 10.0)
+    del overlay["profile_name"]
+
+    assert profile_data == {
+        "profile_name": "some_guy",
+        "item_interests": {"drug": {"a": 1.0}},
+        "active_dates": ["2000-01-01"],
+        "untouched": {"b": 2.0},
+    }
+    assert overlay["item_interests"] == {"drug": {"a": 0.5}}
+    assert overlay["active_dates"] == ["2000-01-01", "2000-01-02"]
+    assert overlay["managers"] == {"engagement": {"last_seen_ts": 10.0}}
+    assert "profile_name" not in overlay
+
+    # Subtrees that were never accessed are shared rather than copied
+    assert dict.__getitem__(overlay, "untouched") is profile_data["untouched"]
+
+    assert pickle.loads(pickle.dumps(overlay))["item_interests"] == {"drug": {"a": 0.5}}
@@ -0,0 +1,40 @@
+import mock
+
+from synthetic.user.profile_data_update import ProfileDataUpdate, ProfileDataUpdateBatch
+
+
+def test_update_batch_keeps_last_write_per_path():
+    first_profile_data = {"managers": {"engagement": {"engagement_level": 1.0}}}
+    second_profile_data = {}
+    first_user = mock.Mock(get_profile_data=lambda: first_profile_data)
+    second_user = mock.Mock(get_profile_data=lambda: second_profile_data)
+
+    updates = [
+        (first_user, ProfileDataUpdate.create_variable_set_update("managers/engagement/engagement_level", 0.5)),
+        (second_user, ProfileDataUpdate.create_variable_set_update("interests/brand", {"a": 1})),
+        (first_user, ProfileDataUpdate.create_variable_set_update("managers/engagement/engagement_level", 0.25)),
+        (second_user, ProfileDataUpdate.create_variable_set_update("interests/brand/b", 2)),
+        (second_user, ProfileDataUpdate.create_variable_set_update("interests", {"brand": {}})),
+        (second_user, ProfileDataUpdate.create_variable_set_update("interests/brand/c", 3)),
+    ]
+
+    batch = ProfileDataUpdateBatch()
+    for user, update in updates:
+        batch.add_update(user, update)
+    assert len(batch) == 6
+    assert batch.get_write_count() == 5
+
+    # Applying one after the other ends up at the same data
+    expected_first_profile_data = {"managers": {"engagement": {"engagement_level": 1.0}}}
+    expected_second_profile_data = {}
+    expected_users = {
+        id(first_user): mock.Mock(get_profile_data=lambda: expected_first_profile_data),
+        id(second_user): mock.Mock(get_profile_data=lambda: expected_second_profile_data),
+    }
+    for user, update in updates:
+        update.apply_to_user(expected_users[id(user)])
+
+    batch.apply()
+    assert first_profile_data == expected_first_profile_data
+    assert second_profile_data == expected_second_profile_data == {"interests": {"brand": {"c": 3}}}
+    assert len(batch) == 0
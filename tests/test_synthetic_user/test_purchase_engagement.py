@@ -301,7 +301,7 @@ def test_generate_commerce_logs(db_session, driver_meta, profile_name, catalog_t
             assert len(milestone_events) > 0
             for milestone_event in milestone_events:
                 assert milestone_event.block == BlockType.LOYALTY
-            assert len(user.get_profile_data()["milestone_achieved_uuids"]) == len(milestone_events)
+            assert len(user.milestone_achieved_uuids) == len(milestone_events)
 
             level_events = [event for event in log_events if event.event_type == "level"]
             assert len(level_events) == len(milestone_events)
@@ -9,13 +9,23 @@ from synthetic.catalog.cache import CatalogCache
 from synthetic.conf import global_conf, ProfileConfig, EventConfig, EngagementConfig
 from synthetic.constants import ProductUserType
 from synthetic.event.constants import EventType
-from synthetic.event.log.navigation.app import AppAction
+from synthetic.event.log.navigation.app import AppAction, AppEvent
 from synthetic.event.log.navigation.identify import IdentifyAction
 from synthetic.event.meta.receive_nudge import ReceiveNudges
+from synthetic.user.active_days import (
+    encode_active_day,
+    get_active_day,
+    get_active_day_slot_key,
+    is_legacy_active_days,
+    migrate_legacy_active_days,
+)
 from synthetic.user.factory import store_user_in_db, load_user_from_db
 from synthetic.user.session_engagement_user import SessionEngagementUser
+from synthetic.user.session_enrichment import BackgroundingStage
+from synthetic.user.user_reference import UserReference
 from synthetic.utils.event_utils import calculate_bonus_session_count
 from synthetic.utils.nudge_utils import Nudge
+from synthetic.utils.random import buffered_random
 from synthetic.utils.test_utils import assert_events_have_correct_schema, assert_dicts_equal_partial
 
 
@@ -80,7 +90,9 @@ def test_generate_batch_page_logs_new_user(db_session, driver_meta, profile_name
     assert_dicts_equal_partial(
         user.get_profile_data(),
         {
-            "active_dates": {"2000-01-01": True},
+            "active_dates": {
+                get_active_day_slot_key(start_ts.toordinal()): encode_active_day(start_ts.toordinal(), True)
+            },
             "managers": {
                 "session_engagement": {
                     "engagement_level": 0.8,
@@ -422,3 +434,86 @@ def test_bonus_session_count():
         )
         == 0
     )
+
+
+def test_backgrounding_stage():
+    user = UserReference("some_user", "some_device", None)
+    start_ts = datetime(2000, 1, 1)
+    session_events = [
+        AppEvent(user, start_ts + timedelta(seconds=seconds), True, AppAction.OPEN) for seconds in [0, 30, 600, 7200]
+    ]
+
+    assert BackgroundingStage(0.0).enrich(session_events, True) == session_events
+
+    enriched_events = BackgroundingStage(0.5).enrich(session_events, True)
+    assert [event for event in enriched_events if event in session_events] == session_events
+
+    background_events = [
+        event
+        for event in enriched_events
+        if event.event_type == "app" and event.props["action"] == AppAction.BACKGROUND.value
+    ]
+    assert 0 < len(background_events) <= 10 + 110
+    assert len(enriched_events) == len(session_events) + 3 * len(background_events)
+
+    # Backgrounds come in sorted batches between the checked events that bound their gap
+    for event_index, event in enumerate(enriched_events):
+        if event in background_events:
+            next_session_event = next(e for e in enriched_events[event_index:] if e in session_events)
+            assert start_ts <= event.ts <= next_session_event.ts
+    assert all([background_events[i].ts <= background_events[i + 1].ts for i in range(0, len(background_events) - 1)])
+
+
+def test_active_days():
+    day_ordinal = datetime(2000, 1, 10).toordinal()
+
+    active_days = migrate_legacy_active_days(
+        {"2000-01-06": True, "2000-01-08": False, "2000-01-09": True, "2000-01-10": True}, day_ordinal
+    )
+    assert len(active_days) == 3
+    assert not is_legacy_active_days(active_days)
+    assert is_legacy_active_days({"2000-01-06": True})
+
+    assert get_active_day(active_days, day_ordinal) is True
+    assert get_active_day(active_days, day_ordinal - 1) is True
+    assert get_active_day(active_days, day_ordinal - 2) is False
+    assert get_active_day(active_days, day_ordinal - 4) is None
+
+    # The next day takes the slot of the oldest one
+    active_days[get_active_day_slot_key(day_ordinal + 1)] = encode_active_day(day_ordinal + 1, False)
+    assert len(active_days) == 3
+    assert get_active_day(active_days, day_ordinal + 1) is False
+    assert get_active_day(active_days, day_ordinal - 2) is None
+
+
+def test_schedule_horizon_matches_daily_fills(db_session, driver_meta, profile_name):
+    CatalogCache.warm_up(db_session)
+
+    start_ts = datetime(2000, 1, 1)
+    end_ts = datetime(2000, 1, 8)
+
+    generated_events = []
+    for schedule_horizon_days in [1, 7]:
+        global_conf.schedule_horizon_days = schedule_horizon_days
+        random.seed(0)
+        buffered_random.reset()
+
+        user = SessionEngagementUser(
+            driver_meta.id,
+            "horizon_user",
+            profile_data={
+                "profile_name": profile_name,
+                "registration_timestamp": start_ts.timestamp(),
+            },
+        )
+        events = user.generate_events(end_ts)
+        generated_events.append(
+            (
+                [(event.ts, event.event_type) for event in events.log_events],
+                [(event.ts, type(event)) for event in events.meta_events],
+                user.get_profile_data(),
+            )
+        )
+
+    assert len(generated_events[0][0]) > 0
+    assert generated_events[0] == generated_events[1]
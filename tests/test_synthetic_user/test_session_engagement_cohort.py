@@ -0,0 +1,201 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from synthetic.catalog.cache import CatalogCache
+from synthetic.conf import global_conf, ProfileConfig, EngagementConfig
+from synthetic.constants import ProductUserType
+from synthetic.event.catalog.user_catalog import UserCatalogEvent
+from synthetic.event.constants import EventType
+from synthetic.event.event_collection import EventCollection
+from synthetic.event.log.log_base import LogEvent
+from synthetic.event.log.navigation.identify import IdentifyAction
+from synthetic.user.constants import SyntheticUserType
+from synthetic.user.factory import create_random_user, load_user_from_db, store_user_in_db
+from synthetic.user.session_engagement_cohort_user import SessionEngagementCohortUser
+from synthetic.utils.test_utils import assert_events_have_correct_schema
+
+
+@pytest.fixture(autouse=True)
+def configure_profiles():
+    global_conf.profiles = {
+        "cohort": ProfileConfig(
+            user_type=SyntheticUserType.SESSION_ENGAGEMENT_COHORT,
+            product_user_type=ProductUserType.MOBILE,
+            occurrence_probability=1.0,
+            cohort_size=20,
+            session_min_count=2,
+            session_max_count=2,
+            session_engagement=EngagementConfig(
+                initial_min=1.0,
+                initial_max=1.0,
+                change_min=0.2,
+                change_max=0.2,
+                change_probability=1.0,
+                decay_probability=1.0,
+                boost_probability=0.0,
+            ),
+            event_probabilities={EventType.PAGE: 1.0},
+        )
+    }
+
+
+def test_cohort_events(db_session, driver_meta):
+    CatalogCache.warm_up(db_session)
+
+    start_ts = datetime(2000, 1, 1)
+    global_conf.start_ts = start_ts
+
+    cohort = create_random_user(driver_meta.id, start_ts, "cohort")
+    assert isinstance(cohort, SessionEngagementCohortUser)
+    assert cohort.get_member_count() == 20
+
+    events = cohort.generate_events(start_ts + timedelta(days=3))
+
+    # The events of the members are only written to the batch
+    assert len(events.log_events) == 0
+    log_events = events.log_batch.to_events()
+    assert_events_have_correct_schema(log_events)
+    assert [event.ts for event in log_events] == sorted([event.ts for event in log_events])
+
+    # Every member registers once, on the first day
+    member_platform_uuids = set([reference.get_platform_uuid() for reference in cohort.get_member_references()])
+    identify_events = [event for event in log_events if event.event_type == "identify"]
+    register_events = [event for event in identify_events if event.props["action"] == IdentifyAction.REGISTER.value]
+    assert len(register_events) == 20
+    assert set([event.user.get_platform_uuid() for event in register_events]) == member_platform_uuids
+    assert len([event for event in events.catalog_events if isinstance(event, UserCatalogEvent)]) == 20
+
+    # Members log in twice a day while engaged, and their engagement decays by a step a day
+    login_events = [event for event in identify_events if event.props["action"] == IdentifyAction.LOGIN.value]
+    assert len(login_events) > 0
+    assert set([event.user.get_platform_uuid() for event in login_events]) <= member_platform_uuids
+    assert all(level < 1.0 for level in cohort.get_member_engagement_levels())
+
+    store_user_in_db(db_session, driver_meta.id, cohort)
+    db_session.commit()
+
+    loaded_cohort = load_user_from_db(db_session, driver_meta.id, cohort.get_platform_uuid())
+    assert isinstance(loaded_cohort, SessionEngagementCohortUser)
+    assert [reference.get_platform_uuid() for reference in loaded_cohort.get_member_references()] == [
+        reference.get_platform_uuid() for reference in cohort.get_member_references()
+    ]
+
+
+def get_written_cohort_keys(events: EventCollection) -> List[str]:
+    writes: Dict = {}
+    for meta_event in events.meta_events:
+        meta_event.update.add_to_writes(writes)
+
+    return sorted(["/".join(keys) for keys in writes])
+
+
+def test_cohort_writes_changed_state(db_session, driver_meta):
+    CatalogCache.warm_up(db_session)
+
+    start_ts = datetime(2000, 1, 1)
+    global_conf.start_ts = start_ts
+
+    cohort = create_random_user(driver_meta.id, start_ts, "cohort")
+    assert get_written_cohort_keys(cohort.generate_events(start_ts + timedelta(days=1))) == [
+        "cohort/active_day_flags",
+        "cohort/active_day_ordinal",
+        "cohort/engagement_levels",
+        "cohort/registered_until",
+    ]
+
+    # Once every member registered, the registrations aren't tracked any further. The flags are only written when the
+    # members engaged on the day differ from the day before
+    written_keys = get_written_cohort_keys(cohort.generate_events(start_ts + timedelta(days=3)))
+    assert "cohort/active_day_ordinal" in written_keys
+    assert "cohort/engagement_levels" in written_keys
+    assert "cohort/registered_until" not in written_keys
+
+    # Nothing changes for a churned cohort
+    cohort.force_churn()
+    cohort.generate_events(start_ts + timedelta(days=4))
+    assert get_written_cohort_keys(cohort.generate_events(start_ts + timedelta(days=6))) == []
+
+    store_user_in_db(db_session, driver_meta.id, cohort)
+    db_session.commit()
+
+    loaded_cohort = load_user_from_db(db_session, driver_meta.id, cohort.get_platform_uuid())
+    assert isinstance(loaded_cohort, SessionEngagementCohortUser)
+    assert loaded_cohort.get_member_engagement_levels().tolist() == cohort.get_member_engagement_levels().tolist()
+
+
+def test_cohort_rejects_stateful_event_types(driver_meta):
+    global_conf.profiles["cohort"].event_probabilities = {EventType.PAGE: 0.5, EventType.MODULE: 0.5}
+
+    with pytest.raises(ValueError):
+        create_random_user(driver_meta.id, datetime(2000, 1, 1), "cohort")
+
+
+def get_event_type_ratios(log_events: List[LogEvent]) -> Dict[str, float]:
+    event_type_counts = Counter([event.event_type for event in log_events])
+    return dict([(event_type, count / len(log_events)) for event_type, count in event_type_counts.items()])
+
+
+def get_session_count(log_events: List[LogEvent]) -> int:
+    return len([event for event in log_events if event.event_type == "app" and event.props["action"] == "open"])
+
+
+def test_cohort_matches_session_engagement_users(db_session, driver_meta):
+    CatalogCache.warm_up(db_session)
+
+    start_ts = datetime(2000, 1, 1)
+    end_ts = start_ts + timedelta(days=8)
+    global_conf.start_ts = start_ts
+
+    member_count = 300
+    for profile_name, user_type in [
+        ("cohort", SyntheticUserType.SESSION_ENGAGEMENT_COHORT),
+        ("user", SyntheticUserType.SESSION_ENGAGEMENT),
+    ]:
+        global_conf.profiles[profile_name] = ProfileConfig(
+            user_type=user_type,
+            product_user_type=ProductUserType.MOBILE,
+            occurrence_probability=1.0,
+            cohort_size=member_count,
+            session_min_count=1,
+            session_max_count=4,
+            background_per_minute_probability=0.05,
+            session_engagement=EngagementConfig(
+                initial_min=0.5,
+                initial_max=1.0,
+                change_min=0.05,
+                change_max=0.15,
+                change_probability=0.8,
+                decay_probability=0.7,
+                boost_probability=0.3,
+            ),
+            event_probabilities={EventType.PAGE: 0.7, EventType.VIDEO: 0.3},
+        )
+
+    cohort = create_random_user(driver_meta.id, start_ts, "cohort")
+    users = [create_random_user(driver_meta.id, start_ts, "user") for _ in range(0, member_count)]
+
+    # Members register over the first day, so only the days after it are compared
+    compared_start_ts = start_ts + timedelta(days=1)
+    cohort_events = [
+        event for event in cohort.generate_events(end_ts).log_batch.to_events() if event.ts >= compared_start_ts
+    ]
+    user_events = [
+        event for user in users for event in user.generate_events(end_ts).log_events if event.ts >= compared_start_ts
+    ]
+
+    assert get_session_count(cohort_events) == pytest.approx(get_session_count(user_events), rel=0.05)
+
+    cohort_ratios = get_event_type_ratios(cohort_events)
+    user_ratios = get_event_type_ratios(user_events)
+    assert set(cohort_ratios.keys()) == set(user_ratios.keys())
+    for event_type, user_ratio in user_ratios.items():
+        assert cohort_ratios[event_type] == pytest.approx(user_ratio, abs=0.02), event_type
+
+    cohort_levels = cohort.get_member_engagement_levels()
+    user_levels = np.array([user.get_manager("session_engagement").get_engagement() for user in users])
+    assert np.mean(cohort_levels) == pytest.approx(np.mean(user_levels), abs=0.05)
+    assert np.std(cohort_levels) == pytest.approx(np.std(user_levels), abs=0.05)
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+
+from synthetic.catalog.cache import CatalogCache
+from synthetic.conf import global_conf, ProfileConfig
+from synthetic.constants import CatalogType
+from synthetic.event.constants import EventType
+from synthetic.user.constants import SyntheticUserType
+from synthetic.user.factory import create_random_user
+from synthetic.user.state_compaction import get_milestone_index, get_profile_data_size
+
+
+@pytest.fixture(autouse=True)
+def configure_profiles():
+    global_conf.profiles = {
+        "session_guy": ProfileConfig(occurrence_probability=1.0, event_probabilities={EventType.PAGE: 1.0}),
+        "purchase_guy": ProfileConfig(
+            user_type=SyntheticUserType.PURCHASE_ENGAGEMENT,
+            occurrence_probability=1.0,
+            event_probabilities={EventType.PAGE: 1.0},
+        ),
+    }
+
+
+@pytest.fixture(autouse=True)
+def milestone_catalog():
+    for index in range(0, 10):
+        CatalogCache.add_catalog_for_uuid(
+            CatalogType.MILESTONE,
+            f"milestone-{index}",
+            {"uuid": f"milestone-{index}", "required_score": 50.0 * 1.5**index},
+        )
+
+
+def test_milestone_bitset(driver_meta):
+    current_ts = datetime(2000, 1, 1)
+    user = create_random_user(driver_meta.id, current_ts, "session_guy")
+
+    # Users stored before the bitset read as converted, but are only written once they are compacted
+    user.get_profile_data()["milestone_achieved_uuids"] = ["milestone-0", "milestone-1"]
+    assert sorted(user.milestone_achieved_uuids) == ["milestone-0", "milestone-1"]
+    assert "milestones" not in user.get_profile_data()
+
+    user.start_event_generation()
+    user.compact_profile_data(current_ts)
+    user.finish_event_generation()
+    assert user.get_profile_data()["milestones"] == {"index": get_milestone_index().key, "bits": "3"}
+
+    user.start_event_generation()
+    user.set_milestone_achieved("milestone-9", current_ts)
+    user.compact_profile_data(current_ts)
+    user.finish_event_generation()
+    assert user.get_profile_data()["milestones"]["bits"] == "203"
+    assert user.get_profile_data()["milestone_achieved_uuids"] == []
+
+    # A changed milestone catalog re-indexes the bits, leaving the new milestone to be awarded
+    user.get_profile_data()["level_score"] = {"core": 80.0}
+    CatalogCache.add_catalog_for_uuid(
+        CatalogType.MILESTONE, "milestone-10", {"uuid": "milestone-10", "required_score": 1.0}
+    )
+    assert sorted(user.milestone_achieved_uuids) == ["milestone-0", "milestone-1", "milestone-9"]
+
+    # Replacing a milestone in place keeps the catalog size, but still re-indexes
+    CatalogCache.remove_catalog_for_uuid(CatalogType.MILESTONE, "milestone-9")
+    CatalogCache.add_catalog_for_uuid(
+        CatalogType.MILESTONE, "milestone-11", {"uuid": "milestone-11", "required_score": 2.0}
+    )
+    assert sorted(user.milestone_achieved_uuids) == ["milestone-0", "milestone-1"]
+
+    user.start_event_generation()
+    user.set_milestone_achieved("milestone-11", current_ts)
+    user.finish_event_generation()
+    assert sorted(user.milestone_achieved_uuids) == ["milestone-0", "milestone-1", "milestone-11"]
+
+    # The index is only rebuilt when the milestone catalogs change
+    assert get_milestone_index() is get_milestone_index()
+    milestone_index = get_milestone_index()
+    CatalogCache.add_catalog_for_uuid(CatalogType.DRUG, "drug", {"uuid": "drug"})
+    assert get_milestone_index() is milestone_index
+
+
+def test_compaction_bounds_state(driver_meta):
+    current_ts = datetime(2000, 1, 1)
+    user = create_random_user(driver_meta.id, current_ts, "purchase_guy")
+    CatalogCache.cached_catalog[CatalogType.DRUG] = {"kept-item": {"uuid": "kept-item"}}
+    global_conf.profiles["purchase_guy"].behaviour.purchase.item_interest_max_count = 2
+
+    profile_data = user.get_profile_data()
+    profile_data["active_modules"] = {
+        "finished-module": {"remaining_duration": 0},
+        "active-module": {"remaining_duration": 10},
+    }
+    profile_data["item_interests"] = {
+        "kept-item": {"catalog_type": CatalogType.DRUG.value, "interest_ratio": 0.5, "remaining_view_count": 1},
+        "removed-item": {"catalog_type": CatalogType.DRUG.value, "interest_ratio": 0.9, "remaining_view_count": 1},
+        "weak-item": {"catalog_type": CatalogType.BLOOD.value, "interest_ratio": 0.1, "remaining_view_count": 1},
+        "strong-item": {"catalog_type": CatalogType.BLOOD.value, "interest_ratio": 0.8, "remaining_view_count": 1},
+    }
+    uncompacted_size = get_profile_data_size(profile_data)
+
+    user.start_event_generation()
+    user.compact_profile_data(current_ts)
+    events = user.finish_event_generation()
+
+    assert list(user.get_profile_data()["active_modules"].keys()) == ["active-module"]
+    assert sorted(user.get_profile_data()["item_interests"].keys()) == ["kept-item", "strong-item"]
+    assert get_profile_data_size(user.get_profile_data()) < uncompacted_size
+
+    # Compaction is written through profile data updates, so it also reaches the stored users
+    assert len(events.meta_events) == 2
@@ -1,4 +1,4 @@
-from synthetic.utils.user_utils import generate_random_user_data
+from synthetic.utils.user_utils import generate_random_user_data, get_user_data_for_platform_uuid
 
 
 def test_generate_random_user_data(fixed_seed):
@@ -19,3 +19,18 @@ def test_generate_random_user_data(fixed_seed):
         'workplace',
         'zipcode',
     ]
+
+
+def test_user_data_for_platform_uuid_is_deterministic():
+    data = get_user_data_for_platform_uuid("some_user")
+    assert sorted(data.keys()) == sorted(generate_random_user_data().keys())
+    assert data["platform_uuid"] == "some_user"
+
+    # Changing the returned data must not leak into later calls
+    data["city"] = "Nowhere"
+    assert get_user_data_for_platform_uuid("some_user")["city"] != "Nowhere"
+
+    # Resumed users pass in their persisted country, which must not change the rest of their data
+    data = get_user_data_for_platform_uuid("some_user")
+    assert get_user_data_for_platform_uuid("some_user", country=data["country"]) == data
+    assert get_user_data_for_platform_uuid("other_user") != data
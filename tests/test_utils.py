@@ -1,9 +1,38 @@
+import json
+import os
+import random
+from collections import Counter
+from datetime import datetime
+from uuid import UUID
+
+import numpy as np
 import pytest
 
 from synthetic.conf import (
     ProfileConfig,
+    global_conf,
+    reset_configuration,
+)
+from synthetic.utils.random import (
+    BufferedRandom,
+    build_need_based_profile_probabilities,
+    create_numpy_random_generator,
+    draw_unique_indices,
+    select_random_key_counts_from_dict,
+    get_start_hour_sampler,
+    get_weighted_sampler,
+    select_random_keys_from_dict,
+)
+from synthetic.constants import LOG_DATETIME_FORMAT
+from synthetic.utils.id_generator import IdGenerator, generate_id, get_generated_id_count, skip_generated_ids
+from synthetic.utils.text_pool import FakeTextPools, TextPool
+from synthetic.utils.time_utils import (
+    datetime_from_payload_str,
+    datetime_to_epoch_microseconds,
+    datetime_to_payload_str,
+    epoch_microseconds_to_payload_strs,
+    payload_strs_to_epoch_microseconds,
 )
-from synthetic.utils.random import build_need_based_profile_probabilities
 
 desired_population_count = 100
 
@@ -81,3 +110,212 @@ def test_realistic_need_based_profile_probabilities():
         'one_time': 0.8125,
         'short': 0.0,
     }
+
+
+def test_select_random_key_counts_from_dict():
+    random.seed(0)
+
+    key_counts = select_random_key_counts_from_dict({"a": 1.0, "b": 3.0, "never": 0.0}, count=1000)
+    assert sum(key_counts.values()) == 1000
+    assert "never" not in key_counts
+    assert key_counts["b"] > key_counts["a"]
+
+    assert select_random_key_counts_from_dict({"a": 1.0}, count=0) == {}
+
+
+def test_weighted_sampler_matches_uncompiled_sampling():
+    probabilities = {"a": 0.2, "b": 0.5, "c": 0.3}
+    sampler = get_weighted_sampler(probabilities)
+
+    random.seed(0)
+    expected_keys = [select_random_keys_from_dict(probabilities)[0] for _ in range(0, 100)]
+    random.seed(0)
+    assert [sampler.sample() for _ in range(0, 100)] == expected_keys
+    random.seed(0)
+    assert sampler.sample_many(100) == expected_keys
+
+
+def test_weighted_sampler_cache_invalidated_on_config_reload():
+    global_conf.profiles["other_guy"] = ProfileConfig(occurrence_probability=1.0)
+    profiles = global_conf.profiles
+    sampler = get_weighted_sampler(profiles)
+    assert get_weighted_sampler(profiles) is sampler
+
+    reset_configuration()
+    assert get_weighted_sampler(profiles) is not sampler
+
+
+def test_weighted_sampler_cache_follows_table_contents():
+    probabilities = {"a": 1.0, "b": 0.0}
+    sampler = get_weighted_sampler(probabilities)
+    assert get_weighted_sampler(dict(probabilities)) is sampler
+
+    probabilities["a"] = 0.0
+    probabilities["b"] = 1.0
+    assert get_weighted_sampler(probabilities) is not sampler
+    assert get_weighted_sampler(probabilities).sample_many(10) == ["b"] * 10
+
+
+def test_text_pool_zipf_draws_favour_first_texts():
+    texts = ["text_%s" % (index,) for index in range(0, 100)]
+
+    text_pool = TextPool(texts)
+    uniform_counts = Counter([text_pool.draw() for _ in range(0, 1000)])
+    assert len(uniform_counts) > 50
+
+    zipf_counts = Counter([text_pool.draw_zipf(1.5) for _ in range(0, 1000)])
+    assert zipf_counts.most_common(1)[0][0] == "text_0"
+    assert zipf_counts["text_0"] > zipf_counts["text_1"] > zipf_counts["text_9"]
+
+
+def test_text_pools_loaded_from_file(temp_dir):
+    global_conf.text_pool_filename = os.path.join(temp_dir, "text_pools.json")
+    if os.path.exists(global_conf.text_pool_filename):
+        os.remove(global_conf.text_pool_filename)
+
+    generated_pools = FakeTextPools(size=10)
+    generated_names = [generated_pools.name() for _ in range(0, 20)]
+    assert os.path.exists(global_conf.text_pool_filename)
+
+    # Draws are seeded and leave the random module alone
+    random_state = random.getstate()
+    loaded_pools = FakeTextPools(size=10)
+    assert [loaded_pools.name() for _ in range(0, 20)] == generated_names
+    assert random.getstate() == random_state
+    assert [loaded_pools.name() for _ in range(0, 20)] != generated_names
+
+    # Reloading the configuration restarts the draws
+    reset_configuration()
+    global_conf.text_pool_filename = os.path.join(temp_dir, "text_pools.json")
+    assert [loaded_pools.name() for _ in range(0, 20)] == generated_names
+    assert "@" in loaded_pools.email()
+
+    # Pools of another size, or missing a kind, are regenerated instead of failing mid generation
+    with open(global_conf.text_pool_filename, "w") as pool_file:
+        json.dump({"name": ["Only Name"]}, pool_file)
+    regenerated_pools = FakeTextPools(size=10)
+    assert "@" in regenerated_pools.email()
+    assert regenerated_pools.name() != "Only Name"
+    with open(global_conf.text_pool_filename, "r") as pool_file:
+        assert len(json.load(pool_file)["email"]) == 10
+
+
+def test_payload_timestamp_codec():
+    timestamps = [
+        datetime(2001, 1, 1),
+        datetime(2001, 1, 1, 23, 59, 59, 999999),
+        datetime(1999, 12, 31, 1, 2, 3, 45),
+    ]
+
+    t_strs = [datetime_to_payload_str(t) for t in timestamps]
+    assert t_strs == [t.strftime(LOG_DATETIME_FORMAT) for t in timestamps]
+    assert [datetime_from_payload_str(t_str) for t_str in t_strs] == timestamps
+    assert datetime_from_payload_str("2001-01-01T01:02:03Z") == datetime(2001, 1, 1, 1, 2, 3)
+
+    epoch_microseconds = [datetime_to_epoch_microseconds(t) for t in timestamps]
+    assert epoch_microseconds_to_payload_strs(epoch_microseconds) == t_strs
+    assert payload_strs_to_epoch_microseconds(t_strs).tolist() == epoch_microseconds
+    assert payload_strs_to_epoch_microseconds(["2001-01-01T01:02:03Z"]).tolist() == [
+        datetime_to_epoch_microseconds(datetime(2001, 1, 1, 1, 2, 3))
+    ]
+
+
+def test_id_generation():
+    id_generator = IdGenerator(batch_size=8)
+    generated_ids = [id_generator.generate() for _ in range(0, 20)]
+    assert len(set(generated_ids)) == len(generated_ids)
+    for generated_id in generated_ids:
+        parsed_id = UUID(generated_id)
+        assert str(parsed_id) == generated_id
+        assert parsed_id.version == 4
+        assert parsed_id.variant == "specified in RFC 4122"
+
+    global_conf.deterministic_id_seed = 5
+    seeded_ids = [generate_id() for _ in range(0, 10)]
+    assert len(set(seeded_ids)) == len(seeded_ids)
+    assert UUID(seeded_ids[0]).version == 4
+
+    global_conf.deterministic_id_seed = 6
+    assert generate_id() != seeded_ids[0]
+
+    global_conf.deterministic_id_seed = 5
+    assert [generate_id() for _ in range(0, 10)] == seeded_ids
+
+    global_conf.deterministic_id_seed = None
+    assert generate_id() not in seeded_ids
+
+    # A reloaded configuration with the same seed starts the ids over
+    global_conf.deterministic_id_seed = 5
+    generate_id()
+    reset_configuration()
+    global_conf.deterministic_id_seed = 5
+    assert [generate_id() for _ in range(0, 10)] == seeded_ids
+
+    # A resumed run skips the ids it handed out before
+    reset_configuration()
+    global_conf.deterministic_id_seed = 5
+    skip_generated_ids(5)
+    assert generate_id() == seeded_ids[5]
+    assert get_generated_id_count() == 6
+
+
+def test_buffered_random():
+    buffered_random = BufferedRandom(block_size=16)
+
+    random.seed(0)
+    ints = [buffered_random.randrange(3, 7) for _ in range(0, 100)]
+    assert set(ints) == set([3, 4, 5, 6])
+    assert set([buffered_random.randint(1, 2) for _ in range(0, 100)]) == set([1, 2])
+
+    normals = [buffered_random.normalvariate(10.0, 0.5) for _ in range(0, 1000)]
+    assert abs(sum(normals) / len(normals) - 10.0) < 0.1
+
+    # Drawn blocks outlive reseeding random, until they are reset
+    random.seed(0)
+    assert [buffered_random.randrange(3, 7) for _ in range(0, 100)] != ints
+    random.seed(0)
+    buffered_random.reset()
+    assert [buffered_random.randrange(3, 7) for _ in range(0, 100)] == ints
+
+    # Reloading the configuration drops the drawn blocks as well
+    reset_configuration()
+    random.seed(0)
+    assert [buffered_random.randrange(3, 7) for _ in range(0, 100)] == ints
+
+
+def test_draw_unique_indices():
+    random.seed(0)
+    generator = create_numpy_random_generator()
+
+    counts = np.array([3, 0, 5, 1, 8, 12])
+    indices = draw_unique_indices(generator, counts, 8)
+    group_ends = np.cumsum(np.minimum(counts, 8)).tolist()
+    assert len(indices) == group_ends[-1]
+    for group_start, group_end in zip([0] + group_ends[:-1], group_ends):
+        group_indices = indices[group_start:group_end].tolist()
+        assert len(set(group_indices)) == len(group_indices)
+        assert all([0 <= index < 8 for index in group_indices])
+
+    # Every index is as likely
+    index_counts = Counter(draw_unique_indices(generator, np.full(2000, 2), 4).tolist())
+    assert all([abs(index_count / 4000 - 0.25) < 0.03 for index_count in index_counts.values()])
+
+
+def test_start_hour_sampler():
+    hour_probabilities = [0.0] * 24
+    hour_probabilities[3] = 1.0
+    hour_probabilities[4] = 1.0
+
+    start_hour_sampler = get_start_hour_sampler(hour_probabilities)
+    assert get_start_hour_sampler(hour_probabilities) is start_hour_sampler
+
+    offsets_seconds = start_hour_sampler.sample_offsets_seconds(5, 100)
+    assert offsets_seconds == sorted(offsets_seconds)
+    assert all([22 * 3600 <= offset_seconds < 24 * 3600 for offset_seconds in offsets_seconds])
+
+    offsets_seconds = start_hour_sampler.sample_offsets_seconds(3, 100)
+    assert all([0 <= offset_seconds < 2 * 3600 for offset_seconds in offsets_seconds])
+    assert len([offset_seconds for offset_seconds in offsets_seconds if offset_seconds < 3600]) > 0
+
+    with pytest.raises(ValueError):
+        get_start_hour_sampler([0.0] * 24)